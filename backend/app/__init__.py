@@ -5,29 +5,56 @@ This module provides the Flask application factory pattern for creating
 and configuring the API application with proper extensions and blueprints.
 """
 import os
-from pathlib import Path
 
 import logging
+import threading
+import time
 import uuid
-from flask import Flask, request, g
+from flask import Flask, current_app, has_app_context, request, g
 from flask_cors import CORS
 from flask_caching import Cache
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flasgger import Swagger, swag_from
-from owlready2 import get_ontology, default_world
+from owlready2 import World, get_ontology, default_world
 
 from backend.config import get_config
+from backend.app.services import ontology_source
+from backend.app.services.recipe_index import RecipeIndex
+from backend.app.services.recipe_view import RecipeView
+from backend.app.utils.prefetch import Prefetcher
+from backend.app.utils.tiered_cache import TieredCache
 
 
 # Initialize extensions
 cache = Cache()
+# In-process LRU in front of the shared cache, used to cache responses
+response_cache = TieredCache(cache)
+# Background pool computing the next page of searches into response_cache
+prefetcher = Prefetcher()
 # Limiter will be initialized in create_app() after config is loaded
 limiter = None
 
 # Global ontology instance
 onto = None
 
+# Generation of the loaded ontology, see ontology_source
+ontology_generation = None
+# Shared generation counter the loaded ontology was loaded at
+ontology_counter = 0
+# Configured ONTOLOGY_URL, located again when another worker uploads
+ontology_url = None
+
+# Seconds between reads of the shared generation counter
+GENERATION_CHECK_INTERVAL = 1.0
+_generation_checked = 0.0
+# Held while this worker loads an ontology uploaded by another one
+_reload_lock = threading.Lock()
+
+# Materialized recipe view and in-memory index built from the loaded ontology
+recipe_view = None
+recipe_index = None
+
 
 def setup_logging(app):
     """Configure application logging."""
@@ -45,37 +72,165 @@ def setup_logging(app):
 
 
 def load_ontology(app):
-    """Load the ontology at application startup."""
-    global onto
+    """
+    Load the ontology at application startup.
+
+    This is the current upload if an ontology was uploaded, so workers
+    started after an upload serve the same graph as the others, and
+    ONTOLOGY_URL otherwise.
+    """
+    global onto, ontology_generation, ontology_counter, ontology_url
 
     ontology_path = app.config.get('ONTOLOGY_URL')
     if not ontology_path:
-        app.logger.info("ONTOLOGY_URL not set, using default 'data/feinschmecker.nt'")
-        ontology_path = 'data/feinschmecker.nt'
+        app.logger.info(f"ONTOLOGY_URL not set, using default '{ontology_source.DEFAULT_ONTOLOGY}'")
 
     try:
-        # If it's not a URL, treat it as a local file path.
-        if not (ontology_path.startswith('http://') or ontology_path.startswith('https://')):
-            # app.root_path is /app/backend/app, so project root is two levels up.
-            project_root = Path(app.root_path).parent.parent
-            absolute_path = (project_root / ontology_path).resolve()
-            
-            if not absolute_path.exists():
-                app.logger.error(f"Ontology file not found at resolved path: {absolute_path}")
-                raise FileNotFoundError(f"Ontology file not found: {absolute_path}")
-            ontology_uri = absolute_path.as_uri()
-        else:
-            ontology_uri = ontology_path
-
+        location = ontology_source.ontology_location(ontology_path)
+        if not ontology_source.is_remote(location) and not os.path.exists(location):
+            app.logger.error(f"Ontology file not found at resolved path: {location}")
+            raise FileNotFoundError(f"Ontology file not found: {location}")
+        ontology_uri = ontology_source.ontology_uri(location)
+
+        # The counter is read before the upload record, which uploads write
+        # first, so the ontology is at least as new as the counter
+        counter = ontology_source.shared_generation(cache)
         app.logger.info(f"Loading ontology from {ontology_uri}")
-        onto = get_ontology(ontology_uri).load()
+        content, digest = ontology_source.read_ontology(location)
+        onto = get_ontology(ontology_uri).load(fileobj=content)
         app.logger.info("Ontology loaded successfully")
+        ontology_generation = ontology_source.ontology_generation(counter, digest)
+        ontology_counter, ontology_url = counter, ontology_path
+        load_recipe_index(onto)
         return onto
     except Exception as e:
         app.logger.error(f"Failed to load ontology from {ontology_path}: {str(e)}", exc_info=True)
         raise
 
 
+def build_recipe_index(ontology, previous=None):
+    """
+    Build the recipe view and in-memory index of an ontology.
+
+    The flat SQLite view is materialized from the ontology first, then the
+    NumPy index is loaded from it. The index of the previous ontology, if
+    any, lets its similarity table be updated instead of rebuilt. Failures
+    are logged and return neither, in which case searches fall back to
+    SPARQL queries against the ontology.
+
+    Args:
+        ontology: Loaded ontology instance
+        previous: Optional RecipeIndex of the ontology being replaced
+
+    Returns:
+        Tuple of (RecipeView, RecipeIndex), or (None, None) if building failed
+    """
+    try:
+        view = RecipeView.build(ontology)
+        return view, RecipeIndex.from_view(view, previous)
+    except Exception as e:
+        logging.getLogger(__name__).error(
+            f"Failed to build recipe index, falling back to SPARQL: {str(e)}", exc_info=True
+        )
+        return None, None
+
+
+def load_recipe_index(ontology):
+    """
+    Build the recipe view and in-memory index for a freshly loaded ontology.
+
+    Args:
+        ontology: Loaded ontology instance
+
+    Returns:
+        The built RecipeIndex, or None if building failed
+    """
+    global recipe_index, recipe_view
+
+    recipe_view, recipe_index = build_recipe_index(ontology, recipe_index)
+    return recipe_index
+
+
+def replace_ontology(ontology, counter, digest):
+    """
+    Replace the loaded ontology, e.g. with an uploaded one.
+
+    The view and index of the new ontology are built before anything is
+    swapped, the three are then swapped in together and the generation is
+    set last. Until then, responses are computed from the previous
+    ontology and keyed by its generation, so no response of one ontology is
+    ever cached or tagged under the generation of the other.
+
+    Args:
+        ontology: Loaded ontology instance replacing the current one
+        counter: Shared generation counter the ontology was loaded at
+        digest: Digest of the ontology's content, see ontology_source
+
+    Returns:
+        The generation of the new ontology
+    """
+    global onto, recipe_index, recipe_view, ontology_generation, ontology_counter
+    from backend.app.services.match_cache import match_cache
+    from backend.app.services.prepared_queries import prepared_queries
+
+    view, index = build_recipe_index(ontology, recipe_index)
+    onto, recipe_view, recipe_index = ontology, view, index
+    generation = ontology_source.ontology_generation(counter, digest)
+    ontology_generation, ontology_counter = generation, counter
+
+    # Drop the queries and matches computed from the previous ontology
+    prepared_queries.clear()
+    match_cache.clear()
+    logging.getLogger(__name__).info(f"Ontology generation {generation}")
+    return generation
+
+
+def check_ontology_generation():
+    """
+    Load the current ontology once another worker has uploaded a newer one.
+
+    The shared generation counter is read at most every
+    GENERATION_CHECK_INTERVAL seconds. The ontology is loaded in a
+    background thread; until it is swapped in, this worker keeps serving
+    its previous ontology under the previous generation.
+    """
+    global _generation_checked
+
+    now = time.monotonic()
+    if now - _generation_checked < GENERATION_CHECK_INTERVAL or not has_app_context():
+        return
+    _generation_checked = now
+
+    counter = ontology_source.shared_generation(cache)
+    if counter <= ontology_counter or not _reload_lock.acquire(blocking=False):
+        return
+    threading.Thread(
+        target=_reload_current_ontology,
+        args=(current_app._get_current_object(), counter),
+        name="ontology-reload",
+        daemon=True,
+    ).start()
+
+
+def _reload_current_ontology(app, counter):
+    """Load the current ontology into a world of its own and swap it in."""
+    global ontology_counter
+
+    try:
+        with app.app_context():
+            location = ontology_source.ontology_location(ontology_url)
+            app.logger.info(f"Reloading ontology generation {counter} from {location}")
+            content, digest = ontology_source.read_ontology(location)
+            ontology = World().get_ontology(ontology_source.ontology_uri(location)).load(fileobj=content)
+            replace_ontology(ontology, counter, digest)
+    except Exception as e:
+        # Keep serving the previous ontology rather than retrying every check
+        app.logger.error(f"Failed to reload ontology generation {counter}: {str(e)}", exc_info=True)
+        ontology_counter = counter
+    finally:
+        _reload_lock.release()
+
+
 def create_app(config_name=None):
     """
     Application factory for creating Flask app instances.
@@ -117,9 +272,12 @@ def create_app(config_name=None):
         origins=app.config["CORS_ORIGINS"],
         methods=app.config["CORS_METHODS"],
         allow_headers=app.config["CORS_ALLOW_HEADERS"],
+        expose_headers=app.config["CORS_EXPOSE_HEADERS"],
     )
 
     cache.init_app(app)
+    response_cache.init_app(app)
+    prefetcher.init_app(app)
 
     # Initialize limiter after config is loaded so we can use storage URI
     global limiter
@@ -211,3 +369,38 @@ def get_ontology_instance():
         The loaded ontology object
     """
     return onto
+
+
+def get_ontology_generation():
+    """
+    Get the generation of the loaded ontology.
+
+    Cache keys and ETags are built from it, so it is also where this worker
+    notices an ontology uploaded by another one, see
+    check_ontology_generation.
+
+    Returns:
+        Generation string, 0 before an ontology was loaded
+    """
+    check_ontology_generation()
+    return ontology_generation or 0
+
+
+def get_recipe_index():
+    """
+    Get the in-memory recipe index for the loaded ontology.
+
+    Returns:
+        The RecipeIndex instance, or None if it is not available
+    """
+    return recipe_index
+
+
+def get_recipe_view():
+    """
+    Get the materialized recipe view for the loaded ontology.
+
+    Returns:
+        The RecipeView instance, or None if it is not available
+    """
+    return recipe_view
@@ -10,5 +10,5 @@ from flask import Blueprint
 api_bp = Blueprint('api', __name__)
 
 # Import routes to register them with the blueprint
-from backend.app.api import recipes, ontology
+from backend.app.api import recipes, ontology, mealplans, ingredients
 
@@ -0,0 +1,72 @@
+"""
+Ingredient API endpoints.
+
+This module defines the ingredient autocomplete endpoint, suggesting
+canonical ingredients for a typed prefix.
+"""
+
+import logging
+from flask import request, current_app
+from flasgger import swag_from
+
+from backend.app.api import api_bp
+from backend.app import (
+    limiter,
+    get_ontology_instance,
+    get_recipe_index,
+    get_recipe_view,
+)
+from backend.app.services.recipe_service import RecipeService
+from backend.app.utils.validators.recipe_validator import (
+    validate_suggest_params,
+    ValidationError,
+)
+from backend.app.utils.response import (
+    success_response,
+    validation_error_response,
+    internal_error_response,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@api_bp.route("/ingredients/suggest", methods=["GET"])
+@limiter.limit(lambda: current_app.config.get("RATELIMIT_DEFAULT", "100 per minute"))
+@swag_from("swagger_specs/ingredients_suggest_get.yml")
+def suggest_ingredients():
+    """
+    Suggest ingredients for a typed prefix.
+
+    An ingredient matches if a word of its name starts with the prefix.
+    Suggestions are answered from a sorted prefix array built with the
+    recipe index and ranked by how many recipes use the ingredient. Their
+    ids can be passed to `/recipes` in a JSON list as `ingredient_ids` for
+    exact matching.
+
+    Query Parameters:
+        - q (str): Typed prefix, e.g. "chick" (required)
+        - limit (int): Number of suggestions (default: 10, max: 50)
+
+    Response Format:
+        {
+            "data": [
+                {"id": "chicken_breasts", "name": "chicken breasts", "recipes": 6},
+                ...
+            ]
+        }
+    """
+    try:
+        try:
+            params = validate_suggest_params(request.args.to_dict())
+        except ValidationError as e:
+            logger.warning(f"Validation error: {e.errors}")
+            return validation_error_response(e.errors)
+
+        service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+        return success_response(data=service.suggest_ingredients(params["q"], params["limit"]))
+
+    except Exception as e:
+        logger.error(f"Error suggesting ingredients: {str(e)}", exc_info=True)
+        return internal_error_response(
+            "An error occurred while processing your request"
+        )
@@ -0,0 +1,93 @@
+"""
+Meal plan API endpoints.
+
+This module defines the meal plan search endpoint, combining one recipe per
+meal type to hit daily nutrient targets.
+"""
+
+import logging
+from flask import request, current_app
+from flasgger import swag_from
+
+from backend.app.api import api_bp
+from backend.app import (
+    limiter,
+    response_cache,
+    get_ontology_instance,
+    get_recipe_index,
+    get_recipe_view,
+)
+from backend.app.services.recipe_service import RecipeService
+from backend.app.utils.validators.recipe_validator import (
+    validate_meal_plan_params,
+    ValidationError,
+)
+from backend.app.utils.cache_keys import request_cache_key
+from backend.app.utils.response import (
+    success_response,
+    validation_error_response,
+    internal_error_response,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def make_mealplans_cache_key():
+    """Generate cache key for meal plans from the validated parameters."""
+    return request_cache_key("mealplans", validate_meal_plan_params)
+
+
+@api_bp.route("/mealplans", methods=["GET"])
+@limiter.limit(lambda: current_app.config.get("RATELIMIT_DEFAULT", "100 per minute"))
+@response_cache.cached(key_prefix=make_mealplans_cache_key)
+@swag_from("swagger_specs/mealplans_get.yml")
+def get_meal_plans():
+    """
+    Find breakfast, lunch and dinner combinations hitting nutrient targets.
+
+    Query Parameters:
+        - calories (float): Daily calorie target
+        - protein (float): Daily protein target (grams)
+        - fat (float): Daily fat target (grams)
+        - carbohydrates (float): Daily carbohydrate target (grams)
+        - tolerance (float): Largest relative deviation from every target
+          (default: 0.05, i.e. ±5%)
+        - limit (int): Number of plans to return (default: 10, max: 50)
+        - vegan (bool): Only use vegan recipes
+        - vegetarian (bool): Only use vegetarian recipes
+        - time (int): Maximum preparation time of every recipe in minutes
+
+    At least one target is required. On large catalogs, each recipe of one
+    meal type is only paired with the recipes of another that leave a
+    typical budget for the third, so the plans are the best of those
+    combinations rather than of all of them.
+
+    Response Format:
+        {
+            "data": [
+                {
+                    "meals": {"Breakfast": {...}, "Lunch": {...}, "Dinner": {...}},
+                    "totals": {"calories": 2207.5, "protein": 158.1},
+                    "deviation": 0.0119
+                }
+            ]
+        }
+    """
+    try:
+        try:
+            params = validate_meal_plan_params(request.args.to_dict())
+        except ValidationError as e:
+            logger.warning(f"Validation error: {e.errors}")
+            return validation_error_response(e.errors)
+
+        service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+        plans = service.get_meal_plans(
+            params["filters"], params["targets"], params["tolerance"], params["limit"]
+        )
+        return success_response(data=plans)
+
+    except Exception as e:
+        logger.error(f"Error searching meal plans: {str(e)}", exc_info=True)
+        return internal_error_response(
+            "An error occurred while processing your request"
+        )
@@ -11,10 +11,11 @@ import logging
 from werkzeug.utils import secure_filename
 from flask import request, current_app
 from rdflib import Graph
-from owlready2 import get_ontology, default_world
+from owlready2 import World
 
 from backend.app.api import api_bp
-from backend.app import limiter
+from backend.app import cache, limiter
+from backend.app.services.ontology_source import UPLOAD_FOLDER, bump_generation, read_ontology, record_upload
 from backend.app.utils.response import (
     success_response,
     validation_error_response,
@@ -24,11 +25,6 @@ from backend.app.utils.response import (
 logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {'rdf', 'owl', 'ttl', 'n3', 'nt', 'jsonld', 'xml'}
-UPLOAD_FOLDER = os.path.join(
-    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
-    'data',
-    'uploads'
-)
 
 # Ensure upload folder exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -59,6 +55,10 @@ def reload_ontology(ontology_file):
     """
     Reload the application ontology from a new file.
     
+    The file is then recorded as the current upload and the shared
+    generation counter incremented, so the other web workers, Celery
+    workers and workers started later load it too.
+    
     Args:
         ontology_file: Path to the new ontology file
     
@@ -66,17 +66,21 @@ def reload_ontology(ontology_file):
         Tuple of (success: bool, error_message: str)
     """
     try:
-        # Clear existing ontology
-        default_world.ontologies.clear()
-        
-        # Load new ontology
+        # Load the new ontology into a world of its own, so the current one
+        # keeps serving requests until it is replaced
         logger.info(f"Loading new ontology from {ontology_file}")
         file_url = f"file://{ontology_file.replace(os.sep, '/')}"
-        new_onto = get_ontology(file_url).load()
+        content, digest = read_ontology(ontology_file)
+        new_onto = World().get_ontology(file_url).load(fileobj=content)
+        
+        # The record is written before the counter is incremented, so a
+        # worker seeing the new counter reads the new record
+        record_upload(ontology_file)
+        counter = bump_generation(cache)
         
-        # Update global ontology instance
+        # Swap in the new ontology with its view and index
         import backend.app as app_module
-        app_module.onto = new_onto
+        app_module.replace_ontology(new_onto, counter, digest)
         
         logger.info("Ontology reloaded successfully")
         return True, None
@@ -5,8 +5,10 @@ This module defines the recipe search endpoint with filtering, pagination,
 validation, and caching support.
 """
 
+import functools
+import json
 import logging
-from flask import request, current_app
+from flask import request, current_app, Response, stream_with_context
 from flasgger import swag_from
 from celery.result import AsyncResult
 
@@ -19,32 +21,206 @@ from celery.exceptions import TimeoutError as CeleryTimeoutError, SoftTimeLimitE
 from backend.app.api import api_bp
 # from backend.app import limiter, cache, get_ontology_instance
 # from backend.app.services.recipe_service import RecipeService
-from backend.app import limiter, cache, get_ontology_instance
+from backend.app import (
+    cache,
+    limiter,
+    prefetcher,
+    response_cache,
+    get_ontology_instance,
+    get_recipe_index,
+    get_recipe_view,
+)
 from backend.app.services.recipe_service import RecipeService
 
 from backend.app.utils.validators.recipe_validator import (
     validate_recipe_filters,
+    validate_similar_params,
     ValidationError,
 )
+from backend.app.utils.cache_keys import canonical_key, request_cache_key
+from backend.app.utils.pagination import decode_cursor
 from backend.app.utils.response import (
     success_response,
+    conditional_response,
+    error_response,
+    not_found_response,
+    pagination_meta,
     validation_error_response,
     internal_error_response,
 )
 
 logger = logging.getLogger(__name__)
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Parameters that page, order or project a search without changing its matches
+PAGE_PARAMETERS = ("page", "per_page", "cursor", "sort", "pantry", "fields")
+
+
+def wants_ndjson():
+    """Check whether the client asked for a streamed NDJSON response."""
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def search_defaults():
+    """Get the values of the pagination parameters a search leaves out."""
+    return {"page": 1, "per_page": current_app.config["DEFAULT_PAGE_SIZE"]}
+
+
+def split_search(search, default_per_page):
+    """
+    Split a validated search into its filters and page parameters.
+
+    Args:
+        search: Validated search parameters, left unchanged
+        default_per_page: Page size when the search sets none
+
+    Returns:
+        Tuple of (filters, page, per_page, cursor, sort, pantry, fields)
+    """
+    filters = dict(search)
+    return (
+        filters,
+        filters.pop("page", 1),
+        filters.pop("per_page", default_per_page),
+        filters.pop("cursor", None),
+        filters.pop("sort", None),
+        filters.pop("pantry", None),
+        filters.pop("fields", None),
+    )
+
+
+def paged_response(recipes, page, per_page, total, next_cursor, cursor=None):
+    """
+    Create the response to a page of a search answered synchronously.
+
+    The next cursor is also sent in the X-Next-Cursor header, which tells
+    prefetches_next_page there is a next page to prefetch. A page read
+    from a cursor has no page number in its metadata.
+
+    Returns:
+        Tuple of (response, status_code)
+    """
+    response, status_code = success_response(
+        data=recipes,
+        page=page if cursor is None else None,
+        per_page=per_page,
+        total=total,
+        next_cursor=next_cursor,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response, status_code
+
+
+def prefetch_next_page(search, next_cursor):
+    """
+    Compute the response to the next page of a search in the background.
+
+    The next page is requested the way the served one was: with the next
+    cursor when the search had a cursor, with the next page number
+    otherwise. Its response is stored in the response cache under the key
+    that request will have, unless it is cached already.
+
+    Args:
+        search: Validated search parameters of the served page
+        next_cursor: Cursor of the page after the served one
+    """
+    search = dict(search)
+    if "cursor" in search:
+        search["cursor"] = decode_cursor(next_cursor)
+    else:
+        search["page"] = search.get("page", 1) + 1
+    key = canonical_key("recipes", search, search_defaults())
+    app = current_app._get_current_object()
+
+    def respond():
+        filters, page, per_page, cursor, sort, pantry, fields = split_search(
+            search, app.config["DEFAULT_PAGE_SIZE"]
+        )
+        service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+        recipes, total, next_cursor = service.get_recipe_page(
+            filters, page, per_page, cursor, sort, pantry, fields
+        )
+        return paged_response(recipes, page, per_page, total, next_cursor, cursor)
+
+    def prefetch():
+        with app.app_context():
+            response_cache.get_or_compute(key, respond)
+
+    prefetcher.schedule(key, prefetch)
+
+
+def prefetches_next_page(f):
+    """
+    Decorate the search view to prefetch the page after each page it serves.
+
+    Most users turn the page, so the next one is computed in the background
+    while they read. Applied outside the response cache, pages served from
+    the cache, prefetched ones included, schedule their next page as well.
+    """
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        rv = f(*args, **kwargs)
+        response = rv[0] if isinstance(rv, tuple) else rv
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor and prefetcher.enabled and not wants_ndjson():
+            try:
+                prefetch_next_page(validate_recipe_filters(request.args.to_dict()), next_cursor)
+            except ValidationError:
+                pass
+        return rv
+    return decorated_function
+
+
+def claim_task_submission(search_key):
+    """
+    Claim the submission of the Celery task of a search.
+
+    Celery reports a queued task as PENDING, just like an unknown one, so
+    its state cannot tell whether the task still has to be submitted. The
+    first request for a search claims it with an atomic marker in the
+    shared cache; the others, queued behind it, do not submit it again.
+
+    Args:
+        search_key: Canonical key and task id of the search
+
+    Returns:
+        Whether this request should submit the task
+    """
+    try:
+        return bool(cache.add(
+            f"submitted:{search_key}", True,
+            timeout=current_app.config["CACHE_DEFAULT_TIMEOUT"],
+        ))
+    except Exception as e:
+        # Without the shared cache, submitting twice beats never submitting
+        logger.warning(f"Failed to claim task submission {search_key}: {str(e)}")
+        return True
+
 
 def make_cache_key():
-    """Generate cache key based on request parameters."""
-    # Sort parameters for consistent cache keys
-    params = sorted(request.args.items())
-    return f"recipes:{str(params)}"
+    """Generate cache key from the canonical form of the validated search."""
+    return request_cache_key("recipes", validate_recipe_filters, search_defaults())
+
+
+def make_facets_cache_key():
+    """Generate cache key for facet counts from the validated filters."""
+    return request_cache_key("facets", validate_recipe_filters, ignored=PAGE_PARAMETERS)
+
+
+def make_similar_cache_key():
+    """Generate cache key for similar recipes based on the recipe and parameters."""
+    return request_cache_key(
+        f"similar:{request.view_args.get('recipe_id')}", validate_similar_params
+    )
 
 
 @api_bp.route("/recipes", methods=["GET"])
 @limiter.limit(lambda: current_app.config.get("RATELIMIT_DEFAULT", "100 per minute"))
-@cache.cached(timeout=None, key_prefix=make_cache_key)  # Use config timeout
+@prefetches_next_page
+@response_cache.cached(key_prefix=make_cache_key, unless=wants_ndjson)
 @swag_from("swagger_specs/recipes_get.yml")
 def get_recipes():
     """
@@ -52,6 +228,8 @@ def get_recipes():
 
     Query Parameters:
         - ingredients (str): Comma-separated or JSON list of ingredient names
+        - ingredient_ids (str): JSON list of canonical ingredient ids from
+          /ingredients/suggest, matched exactly; ids may contain commas
         - vegan (bool): Filter for vegan recipes
         - vegetarian (bool): Filter for vegetarian recipes
         - meal_type (str): Type of meal (Breakfast, Lunch, Dinner)
@@ -67,9 +245,26 @@ def get_recipes():
         - carbohydrates_smaller/carbohydrates_max (float): Maximum carbs (grams)
         - page (int): Page number (default: 1)
         - per_page (int): Items per page (default: 20, max: 100)
+        - cursor (str): Opaque cursor from a previous response's meta.next_cursor;
+          takes precedence over page, and its response's meta has no page
+        - sort (str): Sort expression: time, difficulty, calories, protein, fat,
+          carbohydrates or a ratio of two of them (e.g. protein/calories),
+          prefixed with '-' for descending order (default: by name)
+        - pantry (str): Comma-separated or JSON list of ingredients on hand;
+          returns only recipes using at least one of them, ranked by coverage
+          then fewest missing ingredients, each with its coverage and missing
+          count. Cannot be combined with sort
+        - fields (str): Comma-separated or JSON list of recipe fields to
+          return, e.g. name,image_link,time for a card grid (default: all);
+          fields not requested are neither fetched nor parsed. Every recipe
+          has its `id` for /recipes/<id>
 
     Returns:
-        JSON response with recipe data and pagination metadata
+        JSON response with recipe data and pagination metadata, or with
+        `Accept: application/x-ndjson` a stream of one recipe per line
+        (per_page may be raised up to MAX_STREAM_PAGE_SIZE; total
+        and next cursor are sent in the X-Total-Count and X-Next-Cursor
+        headers)
 
     Response Format:
         {
@@ -78,7 +273,8 @@ def get_recipes():
                 "total": 150,
                 "page": 1,
                 "per_page": 20,
-                "total_pages": 8
+                "total_pages": 8,
+                "next_cursor": "eyJhZnRlciI6WyJCYWtlZCBlZ2dzIl19"
             }
         }
 
@@ -96,10 +292,12 @@ def get_recipes():
     try:
         # Get raw filters from request
         raw_filters = request.args.to_dict()
+        stream = wants_ndjson()
+        max_page_size = current_app.config["MAX_STREAM_PAGE_SIZE"] if stream else None
 
         # Validate and normalize filters
         try:
-            validated_filters = validate_recipe_filters(raw_filters)
+            validated_filters = validate_recipe_filters(raw_filters, max_page_size)
         except ValidationError as e:
             logger.warning(f"Validation error: {e.errors}")
             return validation_error_response(e.errors)
@@ -112,17 +310,44 @@ def get_recipes():
         # if "force_soft_timeout" in raw_filters:
         #     validated_filters["force_soft_timeout"] = raw_filters["force_soft_timeout"]
 
+        # The canonical search keys both the response cache and the Celery
+        # result of the search
+        search_key = canonical_key("recipes", validated_filters, search_defaults())
+
         # Extract pagination parameters
-        page = validated_filters.pop("page", 1)
-        per_page = validated_filters.pop(
-            "per_page", current_app.config["DEFAULT_PAGE_SIZE"]
+        validated_filters, page, per_page, cursor, sort, pantry, fields = split_search(
+            validated_filters, current_app.config["DEFAULT_PAGE_SIZE"]
         )
 
+        # Streamed responses are always served synchronously
+        if stream:
+            return stream_recipes(validated_filters, page, per_page, cursor, sort, pantry, fields)
+
+        # Searches the in-memory index can answer are cheap enough to serve
+        # synchronously; only the remaining ones are sent to Celery.
+        service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+        if service.can_use_index(validated_filters):
+            recipes, total, next_cursor = service.get_recipe_page(
+                validated_filters, page, per_page, cursor, sort, pantry, fields
+            )
+            return paged_response(recipes, page, per_page, total, next_cursor, cursor)
+
         # Prefer async processing via Celery, but gracefully fallback to
         # synchronous processing with clear error information when Celery
         # submission fails (e.g. broker down) – helps debugging and UX.
         try:
-            task = search_recipes_async.delay(validated_filters, page, per_page)
+            # Equivalent searches share a task id, so a search that already
+            # ran, or is queued, is answered from its task instead of running
+            # again; failed and revoked searches are submitted again
+            task = AsyncResult(search_key, app=celery)
+            state = task.state
+            if state in ("FAILURE", "REVOKED") or (
+                state == "PENDING" and claim_task_submission(search_key)
+            ):
+                task = search_recipes_async.apply_async(
+                    (validated_filters, page, per_page, cursor, sort, pantry, fields),
+                    task_id=search_key,
+                )
 
             logger.info(
                 f"Submitted async recipe search task {task.id} for "
@@ -149,8 +374,10 @@ def get_recipes():
                 if ontology is None:
                     raise RuntimeError("Ontology is not loaded in application context")
 
-                service = RecipeService(ontology)
-                recipes, total = service.get_recipes(validated_filters, page, per_page)
+                service = RecipeService(ontology, get_recipe_index(), get_recipe_view())
+                recipes, total, next_cursor = service.get_recipe_page(
+                    validated_filters, page, per_page, cursor, sort, pantry, fields
+                )
 
                 logger.warning(
                     "Celery submission failed; returning synchronous results as fallback"
@@ -158,9 +385,10 @@ def get_recipes():
 
                 return success_response(
                     data=recipes,
-                    page=page,
+                    page=page if cursor is None else None,
                     per_page=per_page,
                     total=total,
+                    next_cursor=next_cursor,
                     message=(
                         "Returned synchronous results after Celery submission failure."
                     ),
@@ -192,6 +420,317 @@ def get_recipes():
             "An error occurred while processing your request"
         )
         
+def stream_recipes(filters, page, per_page, cursor, sort=None, pantry=None, fields=None):
+    """
+    Stream a page of recipes as newline-delimited JSON.
+
+    Recipes are serialized one per line as they are read and transformed,
+    so memory stays bounded by the chunk size rather than the page size.
+
+    Args:
+        filters: Validated filter parameters without pagination
+        page: Page number (1-indexed)
+        per_page: Number of recipes to stream
+        cursor: Decoded sort key to start after, or None
+        sort: Sort expression, or None for name order
+        pantry: Ingredients on hand to rank by coverage, or None
+        fields: Recipe fields to return, or None for all of them
+
+    Returns:
+        Streaming NDJSON response
+    """
+    service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+    recipes, total, next_cursor = service.iter_recipe_page(
+        filters, page, per_page, cursor, sort, pantry, fields
+    )
+
+    def generate():
+        try:
+            for recipe in recipes:
+                yield json.dumps(recipe, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # Headers are already sent, so the stream can only be cut short
+            logger.error(f"Error streaming recipes: {str(e)}", exc_info=True)
+            raise
+
+    headers = {"X-Total-Count": str(total)}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(
+        stream_with_context(generate()), mimetype=NDJSON_MIMETYPE, headers=headers
+    )
+
+
+@api_bp.route("/recipes/batch", methods=["POST"])
+@limiter.limit(lambda: current_app.config.get("RATELIMIT_DEFAULT", "100 per minute"))
+@swag_from("swagger_specs/recipes_batch_post.yml")
+def batch_recipes():
+    """
+    Run several recipe searches in one request.
+
+    Each search takes the same parameters as `/recipes`, including page,
+    per_page and cursor, and is validated on its own. The searches are
+    answered together and synchronously: identical filter sets are matched
+    once and filters shared between searches are evaluated once.
+
+    Request Body:
+        {
+            "searches": [
+                {"meal_type": "Breakfast", "vegan": true},
+                {"meal_type": "Lunch", "vegan": true, "per_page": 5}
+            ]
+        }
+
+    Response Format:
+        {
+            "data": [
+                {"data": [...], "meta": {"total": 3, "page": 1, ...}},
+                ...
+            ]
+        }
+    """
+    body = request.get_json(silent=True)
+    searches = body.get("searches") if isinstance(body, dict) else None
+
+    if not isinstance(searches, list) or not searches:
+        return validation_error_response(
+            {"searches": ["searches must be a non-empty list of filter objects"]}
+        )
+
+    max_batch_size = current_app.config["MAX_BATCH_SIZE"]
+    if len(searches) > max_batch_size:
+        return validation_error_response(
+            {"searches": [f"at most {max_batch_size} searches are allowed per batch"]}
+        )
+
+    errors = {}
+    parsed_searches = []
+    for i, raw_filters in enumerate(searches):
+        if not isinstance(raw_filters, dict):
+            errors[f"searches[{i}]"] = ["search must be an object of filter parameters"]
+            continue
+
+        try:
+            validated_filters = validate_recipe_filters(raw_filters)
+        except ValidationError as e:
+            for field, messages in e.errors.items():
+                errors[f"searches[{i}].{field}"] = messages
+            continue
+
+        parsed_searches.append(
+            split_search(validated_filters, current_app.config["DEFAULT_PAGE_SIZE"])
+        )
+
+    if errors:
+        logger.warning(f"Validation error: {errors}")
+        return validation_error_response(errors)
+
+    try:
+        service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+        results = service.get_recipe_pages(parsed_searches)
+    except Exception as e:
+        logger.error(f"Error processing batch recipe request: {str(e)}", exc_info=True)
+        return internal_error_response(
+            "An error occurred while processing your request"
+        )
+
+    return success_response(
+        data=[
+            {
+                "data": recipes,
+                "meta": pagination_meta(
+                    page if cursor is None else None, per_page, total, next_cursor
+                ),
+            }
+            for (_, page, per_page, cursor, _, _, _), (recipes, total, next_cursor)
+            in zip(parsed_searches, results)
+        ]
+    )
+
+
+@api_bp.route("/recipes/facets", methods=["GET"])
+@limiter.limit(lambda: current_app.config.get("RATELIMIT_DEFAULT", "100 per minute"))
+@response_cache.cached(key_prefix=make_facets_cache_key)
+@swag_from("swagger_specs/recipes_facets_get.yml")
+def get_recipe_facets():
+    """
+    Count the recipes matching a search per filter option.
+
+    Accepts the same filter parameters as `/recipes`. Every facet is counted
+    under all filters except its own, so each option shows how many recipes
+    selecting it would give.
+
+    Response Format:
+        {
+            "data": {
+                "total": 34,
+                "facets": {
+                    "vegan": {"true": 5, "false": 29},
+                    "vegetarian": {"true": 12, "false": 22},
+                    "meal_type": {"Breakfast": 12, "Dinner": 9, "Lunch": 13},
+                    "difficulty": {"1": 10, "2": 15, "3": 9}
+                }
+            }
+        }
+    """
+    try:
+        try:
+            validated_filters = validate_recipe_filters(request.args.to_dict())
+        except ValidationError as e:
+            logger.warning(f"Validation error: {e.errors}")
+            return validation_error_response(e.errors)
+
+        # Pagination, ordering and projection do not change the counts
+        for key in PAGE_PARAMETERS:
+            validated_filters.pop(key, None)
+
+        service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+        return success_response(data=service.get_facet_counts(validated_filters))
+
+    except Exception as e:
+        logger.error(f"Error counting recipe facets: {str(e)}", exc_info=True)
+        return internal_error_response(
+            "An error occurred while processing your request"
+        )
+
+
+@api_bp.route("/recipes/<recipe_id>", methods=["GET"])
+@limiter.limit(lambda: current_app.config.get("RATELIMIT_DEFAULT", "100 per minute"))
+@swag_from("swagger_specs/recipes_detail_get.yml")
+def get_recipe(recipe_id):
+    """
+    Retrieve a single recipe by its id.
+
+    The id is resolved through a dictionary built when the ontology is
+    loaded. The response carries a strong ETag; sending it back in
+    If-None-Match gives an empty 304 while the recipe is unchanged.
+
+    Path Parameters:
+        - recipe_id (str): Local name of the recipe's IRI, as in the `id`
+          field of search results, e.g. air_fryer_bacon
+
+    Response Format:
+        {
+            "data": {"id": "air_fryer_bacon", "name": "Air fryer bacon", ...}
+        }
+    """
+    try:
+        service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+        recipe = service.get_recipe(recipe_id)
+        if recipe is None:
+            return not_found_response("Recipe")
+        return conditional_response(success_response(data=recipe))
+
+    except Exception as e:
+        logger.error(f"Error retrieving recipe: {str(e)}", exc_info=True)
+        return internal_error_response(
+            "An error occurred while processing your request"
+        )
+
+
+@api_bp.route("/recipes/<recipe_id>/similar", methods=["GET"])
+@limiter.limit(lambda: current_app.config.get("RATELIMIT_DEFAULT", "100 per minute"))
+@response_cache.cached(key_prefix=make_similar_cache_key)
+@swag_from("swagger_specs/recipes_similar_get.yml")
+def get_similar_recipes(recipe_id):
+    """
+    Find the recipes most similar to a recipe.
+
+    Similarity blends the TF-IDF cosine of the recipes' ingredient words
+    with the closeness of their nutrient values. Neighbours are read from a
+    table precomputed when the ontology is loaded.
+
+    Path Parameters:
+        - recipe_id (str): Local name of the recipe's IRI, e.g. air_fryer_bacon
+
+    Query Parameters:
+        - limit (int): Number of similar recipes (default: 10, max: 20)
+
+    Response Format:
+        {
+            "data": [
+                {"id": "breakfast_hash", "name": "Breakfast hash", ...,
+                 "similarity": 0.4062},
+                ...
+            ]
+        }
+    """
+    try:
+        try:
+            params = validate_similar_params(request.args.to_dict())
+        except ValidationError as e:
+            logger.warning(f"Validation error: {e.errors}")
+            return validation_error_response(e.errors)
+
+        if get_recipe_index() is None:
+            return error_response(
+                "Similar recipes are unavailable while the recipe index is not loaded",
+                code="SERVICE_UNAVAILABLE",
+                status_code=503,
+            )
+
+        service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+        recipes = service.get_similar_recipes(recipe_id, params["limit"])
+        if recipes is None:
+            return not_found_response("Recipe")
+        return success_response(data=recipes)
+
+    except Exception as e:
+        logger.error(f"Error finding similar recipes: {str(e)}", exc_info=True)
+        return internal_error_response(
+            "An error occurred while processing your request"
+        )
+
+
+@api_bp.route("/recipes/explain", methods=["GET"])
+@limiter.limit(lambda: current_app.config.get("RATELIMIT_DEFAULT", "100 per minute"))
+def explain_recipes():
+    """
+    Explain how a recipe search would be executed.
+
+    Accepts the same filter parameters as `/recipes`. For searches answered
+    by the in-memory index, returns the plan steps in evaluation order (most
+    selective first) with their access method ("range scan" for bounds
+    answered by a range index, "index lookup" for exact ingredient ids,
+    "filter" otherwise) and their estimated and actual cardinalities.
+
+    Response Format:
+        {
+            "data": {
+                "engine": "index",
+                "recipe_count": 87,
+                "total": 4,
+                "steps": [
+                    {"predicate": "vegan", "condition": "vegan = true",
+                     "access": "filter", "estimated": 5, "input": 87,
+                     "actual": 5},
+                    ...
+                ],
+                "statistics": {...}
+            }
+        }
+    """
+    try:
+        try:
+            validated_filters = validate_recipe_filters(request.args.to_dict())
+        except ValidationError as e:
+            logger.warning(f"Validation error: {e.errors}")
+            return validation_error_response(e.errors)
+
+        # Pagination, ordering and projection do not change the plan
+        for key in PAGE_PARAMETERS:
+            validated_filters.pop(key, None)
+
+        service = RecipeService(get_ontology_instance(), get_recipe_index(), get_recipe_view())
+        return success_response(data=service.explain(validated_filters))
+
+    except Exception as e:
+        logger.error(f"Error explaining recipe search: {str(e)}", exc_info=True)
+        return internal_error_response(
+            "An error occurred while explaining your request"
+        )
+
+
 @api_bp.route("/recipes/tasks/<task_id>", methods=["GET"])
 def get_recipes_task_status(task_id):
     """
@@ -217,6 +756,7 @@ def get_recipes_task_status(task_id):
     if result.state == "SUCCESS":
         payload = result.result or {}
         recipes = payload.get("recipes", [])
+        # Cursor pages are stored without a page number
         page = payload.get("page", 1)
         per_page = payload.get("per_page", len(recipes))
         total = payload.get("total", len(recipes))
@@ -225,7 +765,8 @@ def get_recipes_task_status(task_id):
             data=recipes,
             page=page,
             per_page=per_page,
-            total=total
+            total=total,
+            next_cursor=payload.get("next_cursor"),
         )
 
     # Task failed
@@ -0,0 +1,287 @@
+"""
+Inverted ingredient index for recipe filtering.
+
+This module maps ingredient names to the recipes that use them, with trigram
+postings over the normalized names so substring lookups ("egg" matches
+"large eggs") do not have to scan every ingredient name. The same mapping,
+held as a sparse recipe x ingredient incidence matrix, scores recipes by how
+many of their ingredients a pantry covers. A sorted array of the names'
+word-start suffixes answers autocomplete prefixes by binary search.
+"""
+
+import bisect
+import logging
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GRAM_SIZE = 3
+
+
+def normalize_ingredient(name: str) -> str:
+    """
+    Normalize an ingredient name or search term for case-insensitive matching.
+
+    Args:
+        name: Ingredient name or search term
+
+    Returns:
+        Normalized string
+    """
+    return str(name).lower()
+
+
+def ingredient_id(name: str) -> str:
+    """
+    Derive the canonical id of an ingredient from its name.
+
+    Ingredient individuals are named with onthologifyName, so this is the
+    local name of the ingredient's IRI; names differing only in case share
+    an individual and an id.
+
+    Args:
+        name: Ingredient name
+
+    Returns:
+        Canonical ingredient id
+    """
+    return normalize_ingredient(name).replace(" ", "_").replace("%", "percent").replace("&", "and")
+
+
+def word_starts(text: str) -> List[int]:
+    """Return the positions of a normalized string where a word starts."""
+    return [
+        i for i, char in enumerate(text)
+        if char.isalnum() and (i == 0 or not text[i - 1].isalnum())
+    ]
+
+
+def normalize_prefix(prefix: str) -> str:
+    """
+    Normalize a typed autocomplete prefix.
+
+    Prefixes are matched at word starts, so leading punctuation and spaces
+    are dropped.
+
+    Args:
+        prefix: Typed prefix
+
+    Returns:
+        Normalized prefix, empty if nothing is left to match
+    """
+    text = normalize_ingredient(prefix)
+    starts = word_starts(text)
+    return text[starts[0]:].rstrip() if starts else ''
+
+
+def has_word_prefix(name: str, prefix: str) -> bool:
+    """
+    Check whether a word of a normalized name starts with a prefix.
+
+    Args:
+        name: Normalized ingredient name
+        prefix: Normalized prefix; may span words
+
+    Returns:
+        True if the name has a word-start suffix beginning with the prefix
+    """
+    return any(name.startswith(prefix, start) for start in word_starts(name))
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Return the set of trigrams of a normalized string."""
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class IngredientIndex:
+    """
+    Inverted index from ingredient names to recipe ids.
+
+    Each distinct normalized ingredient name gets a dense name id, in name
+    order, and a canonical ingredient id. Trigram postings map to name ids;
+    every name id maps to the sorted recipe ids using that ingredient.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[int, str]], recipe_count: int):
+        """
+        Initialize the index from (recipe id, ingredient name) pairs.
+
+        Args:
+            pairs: Recipe id and raw ingredient name for every recipe ingredient
+            recipe_count: Number of recipes in the owning recipe index
+        """
+        self.recipe_count = recipe_count
+
+        recipes_by_name: Dict[str, Set[int]] = {}
+        for recipe_id, name in pairs:
+            recipes_by_name.setdefault(normalize_ingredient(name), set()).add(recipe_id)
+
+        self.names: List[str] = sorted(recipes_by_name)
+        self.name_recipes: List[np.ndarray] = [
+            np.array(sorted(recipes_by_name[name]), dtype=np.int32) for name in self.names
+        ]
+
+        postings: Dict[str, List[int]] = {}
+        for name_id, name in enumerate(self.names):
+            for gram in _trigrams(name):
+                postings.setdefault(gram, []).append(name_id)
+        self.postings = {
+            gram: np.array(name_ids, dtype=np.int32) for gram, name_ids in postings.items()
+        }
+
+        self.ids: List[str] = [ingredient_id(name) for name in self.names]
+        self.name_by_id = {ingredient: name_id for name_id, ingredient in enumerate(self.ids)}
+        self.recipe_counts = np.array([len(recipe_ids) for recipe_ids in self.name_recipes], dtype=np.int64)
+
+        # Every suffix of a name starting at a word, sorted, so the names
+        # with a word starting with a prefix form one contiguous run
+        suffixes = sorted(
+            (name[start:], name_id)
+            for name_id, name in enumerate(self.names)
+            for start in word_starts(name)
+        )
+        self.suffixes: List[str] = [suffix for suffix, _ in suffixes]
+        self.suffix_names = np.array([name_id for _, name_id in suffixes], dtype=np.int32)
+
+        # Recipe x ingredient incidence matrix in coordinate form, one entry
+        # per (recipe, distinct ingredient name)
+        self.entry_names = np.repeat(
+            np.arange(len(self.names), dtype=np.int32),
+            [len(recipe_ids) for recipe_ids in self.name_recipes],
+        )
+        self.entry_recipes = (
+            np.concatenate(self.name_recipes) if self.name_recipes else np.empty(0, dtype=np.int32)
+        )
+        self.recipe_totals = np.bincount(self.entry_recipes, minlength=recipe_count)
+
+    def __len__(self) -> int:
+        """Return the number of distinct ingredient names."""
+        return len(self.names)
+
+    def find_names(self, term: str) -> List[int]:
+        """
+        Find the ingredient names containing a search term.
+
+        Args:
+            term: Search term, matched as a case-insensitive substring
+
+        Returns:
+            List of matching name ids
+        """
+        term = normalize_ingredient(term)
+        grams = _trigrams(term)
+
+        if grams:
+            # Intersect postings from the rarest trigram upwards
+            postings = sorted(
+                (self.postings.get(gram, np.empty(0, dtype=np.int32)) for gram in grams),
+                key=len,
+            )
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if len(candidates) == 0:
+                    break
+                candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        else:
+            # Terms shorter than a trigram are checked against every name
+            candidates = range(len(self.names))
+
+        # Trigram hits are candidates only; confirm the actual substring
+        return [int(name_id) for name_id in candidates if term in self.names[name_id]]
+
+    def suggest(self, prefix: str, limit: int) -> List[int]:
+        """
+        Find the ingredient names with a word starting with a prefix.
+
+        Args:
+            prefix: Typed prefix, matched case-insensitively; may span words
+            limit: Maximum number of names to return
+
+        Returns:
+            Name ids, by most recipes using the ingredient, then by name
+        """
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.suffixes, prefix)
+        end = bisect.bisect_left(self.suffixes, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+
+        name_ids = np.unique(self.suffix_names[start:end])
+        counts = self.recipe_counts[name_ids]
+        if len(name_ids) > limit:
+            # Keep every name tied with the last one; ties are ordered by name below
+            threshold = -np.partition(-counts, limit - 1)[limit - 1]
+            name_ids, counts = name_ids[counts >= threshold], counts[counts >= threshold]
+        # lexsort takes its primary key last; name ids ascend in name order
+        order = np.lexsort((name_ids, -counts))[:limit]
+        return [int(name_id) for name_id in name_ids[order]]
+
+    def lookup(self, term: str) -> np.ndarray:
+        """
+        Find the recipes with at least one ingredient containing a term.
+
+        Args:
+            term: Search term, matched as a case-insensitive substring
+
+        Returns:
+            Boolean mask over recipe ids
+        """
+        return self.recipes_for_names(self.find_names(term))
+
+    def recipes_for_names(self, name_ids: List[int]) -> np.ndarray:
+        """
+        Find the recipes using any of a set of ingredient names.
+
+        Args:
+            name_ids: Ingredient name ids, as returned by find_names
+
+        Returns:
+            Boolean mask over recipe ids
+        """
+        mask = np.zeros(self.recipe_count, dtype=bool)
+        for name_id in name_ids:
+            mask[self.name_recipes[name_id]] = True
+        return mask
+
+    def coverage(self, terms: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count, per recipe, the ingredients covered by a set of pantry items.
+
+        The pantry becomes a vector over ingredient names (an ingredient is
+        on hand if any item is a substring of it), multiplied with the
+        incidence matrix in a single sparse matrix-vector product.
+
+        Args:
+            terms: Pantry items, each matched as a case-insensitive substring
+
+        Returns:
+            Tuple of (covered ingredients, total ingredients), both arrays
+            by recipe id
+        """
+        on_hand = np.zeros(len(self.names), dtype=np.float64)
+        for term in terms:
+            on_hand[self.find_names(term)] = 1.0
+
+        matched = np.bincount(
+            self.entry_recipes, weights=on_hand[self.entry_names], minlength=self.recipe_count
+        )
+        return matched, self.recipe_totals.astype(np.float64)
+
+    def match(self, terms: Iterable[str]) -> np.ndarray:
+        """
+        Find the recipes matching every search term.
+
+        Args:
+            terms: Search terms, each matched as a case-insensitive substring
+
+        Returns:
+            Boolean mask over recipe ids
+        """
+        mask = np.ones(self.recipe_count, dtype=bool)
+        for term in terms:
+            mask &= self.lookup(term)
+            if not mask.any():
+                break
+        return mask
@@ -0,0 +1,123 @@
+"""
+Cache of the recipes matching a filter set.
+
+Paging through a search used to run its filters again for every page. The
+matches of a filter set are kept here instead, in name order: the recipe
+ids matched by the index or view as a compact array('I'), four bytes per
+recipe, or the key rows of a SPARQL match. Every later page, whatever its
+number, cursor or ranking, is sliced from the cached matches, its total is
+their length and only its recipes are hydrated.
+
+Entries are keyed by the canonical filters alone and belong to the engine
+that matched them, so they are never used once a reload replaces it.
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from backend.app.utils.cache_keys import filters_key
+
+# Maximum number of filter sets whose matches are kept
+MATCH_CACHE_SIZE = 256
+
+
+class MatchCache:
+    """Bounded LRU cache of the matches of filter sets."""
+
+    def __init__(self, maxsize: int = MATCH_CACHE_SIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of filter sets to keep
+        """
+        self.maxsize = maxsize
+        self._matches = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_ids(self, engine: Any, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Get the cached ids matching a filter set.
+
+        Args:
+            engine: Index or view the ids belong to
+            filters: Dictionary of filter parameters
+
+        Returns:
+            Read-only sorted array of matching recipe ids, or None if not cached
+        """
+        ids = self._get(engine, filters)
+        return None if ids is None else np.frombuffer(ids, dtype=np.uint32)
+
+    def set_ids(self, engine: Any, filters: Dict[str, Any], ids: np.ndarray):
+        """
+        Cache the ids matching a filter set.
+
+        Args:
+            engine: Index or view the ids belong to
+            filters: Dictionary of filter parameters
+            ids: Sorted array of matching recipe ids
+        """
+        compact = array('I')
+        compact.frombytes(np.asarray(ids, dtype=np.uint32).tobytes())
+        self._set(engine, filters, compact)
+
+    def get_rows(self, ontology: Any, filters: Dict[str, Any]) -> Optional[tuple]:
+        """
+        Get the cached SPARQL key rows matching a filter set.
+
+        Args:
+            ontology: Ontology the rows were matched in
+            filters: Dictionary of filter parameters
+
+        Returns:
+            Tuple of key rows ordered by name, or None if not cached
+        """
+        return self._get(ontology, filters)
+
+    def set_rows(self, ontology: Any, filters: Dict[str, Any], rows):
+        """
+        Cache the SPARQL key rows matching a filter set.
+
+        Args:
+            ontology: Ontology the rows were matched in
+            filters: Dictionary of filter parameters
+            rows: Key rows ordered by name
+        """
+        self._set(ontology, filters, tuple(rows))
+
+    def _get(self, engine: Any, filters: Dict[str, Any]) -> Any:
+        """Get the matches of a filter set if they belong to engine."""
+        key = filters_key(filters)
+        with self._lock:
+            entry = self._matches.get(key)
+            if entry is None or entry[0] is not engine:
+                return None
+            self._matches.move_to_end(key)
+            return entry[1]
+
+    def _set(self, engine: Any, filters: Dict[str, Any], matches: Any):
+        """Store the matches of a filter set, evicting the least recently used ones."""
+        key = filters_key(filters)
+        with self._lock:
+            self._matches[key] = (engine, matches)
+            self._matches.move_to_end(key)
+            while len(self._matches) > self.maxsize:
+                self._matches.popitem(last=False)
+
+    def clear(self):
+        """Drop all matches, e.g. after the ontology was reloaded."""
+        with self._lock:
+            self._matches.clear()
+
+    def __len__(self) -> int:
+        """Return the number of filter sets held."""
+        return len(self._matches)
+
+
+# Shared cache used by RecipeService
+match_cache = MatchCache()
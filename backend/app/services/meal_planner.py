@@ -0,0 +1,356 @@
+"""
+Meal plan search over per-meal nutrient arrays.
+
+A meal plan is one recipe per meal (breakfast, lunch and dinner) whose
+nutrient totals are all within a relative tolerance of the targets. Plans are
+searched meet-in-the-middle: the totals of every pair of recipes from the two
+smallest meals are computed by NumPy broadcasting, and the recipes of the
+third meal completing a pair are looked up in a grid bucketing them by
+nutrient value, so no combination is enumerated in a Python loop.
+
+Plans are ranked by their largest relative deviation from a target. Windows
+narrower than the tolerance are searched first and only widened while fewer
+than the requested number of plans are found, so the best plans are found
+without expanding every plan the tolerance admits.
+
+Looking up every pair takes time quadratic in the recipes per meal, so a
+search looks up at most MAX_PAIRS pairs. Within that budget the best plans
+are exact; past it, each recipe of the first paired meal is paired with the
+recipes of the second whose combined totals leave the median recipe of the
+third meal, where completing recipes are densest, and the best of those
+plans are returned. Only if they are fewer than requested is every pair
+searched, so targets few plans come close to take longer.
+"""
+
+import itertools
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+# Meal types a plan has one recipe of
+MEALS = ['Breakfast', 'Lunch', 'Dinner']
+
+# Largest number of recipe pairs whose totals are computed at once
+PAIR_CHUNK_SIZE = 1 << 18
+
+# Number of windows searched, each twice as wide as the previous one
+WINDOW_LEVELS = 24
+
+# Most grid cells per recipe bucketed, and in all, bounding the grid of
+# narrow windows
+GRID_CELLS_PER_RECIPE = 256
+GRID_CELLS = 1 << 20
+
+# Most nutrients bucketed by a grid
+GRID_DIMS = 3
+
+# Cells per nutrient a window spans at most; finer cells make the cells
+# looked up hug the window, so fewer recipes outside it are checked
+CELLS_PER_WINDOW = 4
+
+# Most recipe pairs a search looks up, about 2000 recipes per paired meal
+MAX_PAIRS = 3 << 19
+
+
+class MealPlan(NamedTuple):
+    """A recipe per meal, with the plan's nutrient totals."""
+
+    positions: Tuple[int, ...]
+    totals: np.ndarray
+    deviation: float
+
+
+def _smallest_cells(values: np.ndarray) -> np.ndarray:
+    """
+    Get the smallest cell width per nutrient of a grid over recipes.
+
+    The grid's cell budget is shared by the bucketed nutrients, so a grid
+    over a single nutrient has as many cells as one over two.
+
+    Args:
+        values: Non-negative nutrient values per recipe, one column per
+            target
+
+    Returns:
+        Cell width per target
+    """
+    cells = min(GRID_CELLS, GRID_CELLS_PER_RECIPE * len(values)) ** (1 / min(values.shape[1], GRID_DIMS))
+    return np.maximum(values.max(axis=0), 1e-9) / cells
+
+
+class NutrientGrid:
+    """Recipes of one meal bucketed into cells a fraction of a window wide."""
+
+    def __init__(self, values: np.ndarray, widths: np.ndarray, span: int):
+        """
+        Build the grid.
+
+        Up to GRID_DIMS nutrients are bucketed; the others are checked on
+        the candidates a lookup returns. Cells are padded by two empty cells
+        below and a window's span above, so clipped lookups land on empty
+        cells.
+
+        Args:
+            values: Non-negative nutrient values per recipe, one column per
+                target
+            widths: Cell width per target
+            span: Cells per nutrient a window lies within
+        """
+        self.dims = min(values.shape[1], GRID_DIMS)
+        # Cells 1% wider leave room for the margin of window lookups
+        self.scales = 1 / (widths[:self.dims] * 1.01)
+        self.span = span
+
+        cells = (np.floor(values[:, :self.dims] * self.scales) + 2).astype(np.int64)
+        self.shape = tuple(int(size) for size in cells.max(axis=0) + self.span)
+        flat = np.ravel_multi_index(tuple(cells.T), self.shape)
+
+        self.order = np.argsort(flat, kind='stable')
+        counts = np.bincount(flat, minlength=int(np.prod(self.shape)))
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+
+        # Whether any recipe lies in the block of a window's span of cells
+        # per nutrient starting at each cell
+        box = counts.reshape(self.shape) > 0
+        for axis in range(self.dims):
+            block = np.moveaxis(box, axis, 0)
+            for _ in range(self.span - 1):
+                block[:-1] |= block[1:]
+        self.nonempty = box.ravel()
+
+    def windows(self, lower: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        Find the first cell of the window of every pair of lower bounds and values.
+
+        Args:
+            lower: Lower window bounds, one row per target
+            values: Values subtracted from the bounds, one row per target,
+                or one array of rows per bound
+
+        Returns:
+            Flat cell index per (bound, value) pair, a 2-D array
+        """
+        flat = None
+        for d in range(self.dims):
+            # Shifting a window back by a margin over rounding never drops
+            # a recipe; it may only look at one empty-handed cell more
+            bounds = lower[:, d] * self.scales[d] + (2 - 1e-3)
+            cells = bounds[:, np.newaxis] - values[..., d] * self.scales[d]
+            # Clipping before the cast makes the truncation a floor
+            np.clip(cells, 0, self.shape[d] - 1, out=cells)
+            cells = cells.astype(np.int32)
+            if flat is None:
+                flat = cells
+            else:
+                flat *= self.shape[d]
+                flat += cells
+        return flat
+
+    def occupied(self, windows: np.ndarray) -> np.ndarray:
+        """Return whether any recipe lies in the cells of each window."""
+        return self.nonempty[windows]
+
+    def candidates(self, windows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the recipes in the cells of each window.
+
+        Args:
+            windows: Flat cell index of occupied windows
+
+        Returns:
+            Tuple of (window index, recipe position) arrays, one entry per
+            candidate
+        """
+        first = np.unravel_index(windows, self.shape)
+        queries, recipes = [], []
+
+        # Cells are ordered by their last nutrient within a row, so the
+        # recipes of a window's span of cells along it are one slice
+        for offset in itertools.product(range(self.span), repeat=self.dims - 1):
+            flat = np.ravel_multi_index(
+                tuple(first[d] + offset[d] for d in range(self.dims - 1)) + (first[-1],), self.shape
+            )
+            starts = self.starts[flat]
+            counts = self.starts[flat + self.span] - starts
+            total = int(counts.sum())
+            if total == 0:
+                continue
+
+            # Expand every (window, cell) into the recipes of the cell
+            within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            queries.append(np.repeat(np.arange(len(windows)), counts))
+            recipes.append(self.order[np.repeat(starts, counts) + within])
+
+        if not queries:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+        return np.concatenate(queries), np.concatenate(recipes)
+
+
+def search_meal_plans(
+    meals: List[np.ndarray],
+    targets: np.ndarray,
+    tolerance: float,
+    limit: int
+) -> List[MealPlan]:
+    """
+    Find the meal plans closest to nutrient targets.
+
+    Args:
+        meals: Nutrient values per recipe of each of three meals, one column
+            per target, NaN where missing
+        targets: Target total per nutrient
+        tolerance: Largest relative deviation from a target, e.g. 0.05
+        limit: Maximum number of plans to return
+
+    Returns:
+        Up to ``limit`` plans, ordered by largest relative deviation, then
+        total relative deviation
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    upper = targets * (1 + tolerance)
+
+    # Nutrients are non-negative, so a recipe over a target on its own or
+    # missing a value can be dropped up front
+    candidates = [
+        np.flatnonzero(np.all(values <= upper, axis=1)) for values in meals
+    ]
+    if limit <= 0 or any(len(positions) == 0 for positions in candidates):
+        return []
+    # The paired meals are sorted by the first nutrient, so the recipes a
+    # run of rows can pair with form a contiguous slice
+    candidates = [
+        positions[np.argsort(meal[positions, 0], kind='stable')]
+        for meal, positions in zip(meals, candidates)
+    ]
+    values = [meal[positions] for meal, positions in zip(meals, candidates)]
+
+    # Pair the two smallest meals and look up the largest one
+    first, second, third = (int(meal) for meal in np.argsort([len(v) for v in values], kind='stable'))
+    ratios = tolerance / 2.0 ** np.arange(WINDOW_LEVELS - 1, -1, -1)
+    third_min, third_max = values[third][:, 0].min(), values[third][:, 0].max()
+
+    # Narrow windows share the grid of the smallest cells, searched with
+    # the widest of them; grids are built on first use
+    span = _smallest_cells(values[third])
+    keys = []
+    for ratio in ratios:
+        widths = np.maximum(2 * ratio * targets / CELLS_PER_WINDOW, span)[:GRID_DIMS]
+        # A window w cells wide lies within ceil(w) + 1 cells
+        cells = int(np.ceil((2 * ratio * targets[:GRID_DIMS] / widths).max() - 1e-9))
+        keys.append((tuple(widths), max(cells, 1) + 1))
+    widest = {key: ratio for key, ratio in zip(keys, ratios)}
+    grids: Dict[Tuple[Tuple[float, ...], int], NutrientGrid] = {}
+
+    def grid_for(key: Tuple[Tuple[float, ...], int]) -> NutrientGrid:
+        if key not in grids:
+            grids[key] = NutrientGrid(values[third], np.array(key[0]), key[1])
+        return grids[key]
+
+    # Past the pair budget, each recipe of the first meal is paired with the
+    # run of the second whose totals leave the median of the third meal;
+    # only if that finds fewer than limit plans is every pair searched
+    budget = min(len(values[second]), max(1, MAX_PAIRS // len(values[first])))
+    third_median = float(np.median(values[third][:, 0]))
+
+    for paired in sorted({budget, len(values[second])}):
+        runs = np.lib.stride_tricks.sliding_window_view(values[second], paired, axis=0)
+        found: List[Tuple[np.ndarray, np.ndarray]] = []
+        worst = np.inf
+        chunk_rows = max(1, PAIR_CHUNK_SIZE // paired)
+
+        for start in range(0, len(values[first]), chunk_rows):
+            rows = values[first][start:start + chunk_rows]
+            searched = None
+            if paired < len(values[second]):
+                run_starts = np.searchsorted(values[second][:, 0], targets[0] - rows[:, 0] - third_median)
+                run_starts = np.clip(run_starts - paired // 2, 0, len(values[second]) - paired)
+
+            for ratio, key in zip(ratios, keys):
+                # Once plans are kept, only a window reaching the worst of them
+                # can still improve on them
+                if np.isfinite(worst) and ratio < worst:
+                    continue
+                grid = grid_for(key)
+                if searched is None or searched[0] is not grid:
+                    lower = targets * (1 - widest[key])
+                    if paired < len(values[second]):
+                        # Runs are copied whole rather than gathered per pair
+                        windows = grid.windows(lower - rows, runs[run_starts].transpose(0, 2, 1))
+                        pair_rows, picked = np.nonzero(grid.occupied(windows))
+                        pair_cols = run_starts[pair_rows] + picked
+                    else:
+                        # Skip the recipes no recipe of the third meal completes
+                        # with any of the rows
+                        begin = int(np.searchsorted(
+                            values[second][:, 0], lower[0] - rows[-1, 0] - third_max, side='left'
+                        ))
+                        end = int(np.searchsorted(
+                            values[second][:, 0], targets[0] * (1 + widest[key]) - rows[0, 0] - third_min, side='right'
+                        ))
+                        windows = grid.windows(lower - rows, values[second][begin:end])
+                        pair_rows, picked = np.nonzero(grid.occupied(windows))
+                        pair_cols = picked + begin
+                    pairs, thirds = grid.candidates(windows[pair_rows, picked])
+                    pair_rows, pair_cols = pair_rows[pairs] + start, pair_cols[pairs]
+                    totals = values[first][pair_rows] + values[second][pair_cols] + values[third][thirds]
+                    deviations = np.abs(totals - targets) / targets
+                    plans = np.empty((len(thirds), 3), dtype=np.intp)
+                    plans[:, first] = candidates[first][pair_rows]
+                    plans[:, second] = candidates[second][pair_cols]
+                    plans[:, third] = candidates[third][thirds]
+                    searched = (grid, plans, deviations, deviations.max(axis=1))
+
+                _, plans, deviations, largest = searched
+                within = largest <= ratio
+
+                # Plans outside this window deviate more than every plan in it,
+                # and than the plans already kept once ratio reaches the worst
+                if within.sum() >= limit or ratio >= worst or ratio == ratios[-1]:
+                    # Plans deviating more than the worst kept cannot displace it
+                    kept = within & (largest <= worst)
+                    found = [_best_plans(found + [(plans[kept], deviations[kept])], limit)]
+                    if len(found[0][0]) >= limit:
+                        worst = found[0][1].max(axis=1).max()
+                    break
+
+        if np.isfinite(worst):
+            break
+
+    plans, deviations = _best_plans(found, limit)
+    results = []
+    for plan, deviation in zip(plans, deviations):
+        positions = tuple(int(position) for position in plan)
+        totals = sum(meal[position] for meal, position in zip(meals, positions))
+        results.append(MealPlan(positions, totals, float(deviation.max())))
+    return results
+
+
+def _best_plans(
+    found: List[Tuple[np.ndarray, np.ndarray]],
+    limit: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the best plans out of several batches.
+
+    Args:
+        found: Batches of (plans, deviations per target)
+        limit: Maximum number of plans to keep
+
+    Returns:
+        Tuple of (plans, deviations) of the best plans in rank order
+    """
+    if not found:
+        return np.empty((0, 3), dtype=np.intp), np.empty((0, 1))
+    plans = np.concatenate([batch[0] for batch in found])
+    deviations = np.concatenate([batch[1] for batch in found])
+    if len(plans) > limit:
+        # Only plans deviating at most as much as the limit-th best can rank
+        largest = deviations.max(axis=1)
+        ranked = largest <= np.partition(largest, limit - 1)[limit - 1]
+        plans, deviations = plans[ranked], deviations[ranked]
+    # lexsort takes its primary key last; plans tie-break on positions
+    order = np.lexsort(
+        (plans[:, 2], plans[:, 1], plans[:, 0], deviations.sum(axis=1), deviations.max(axis=1))
+    )[:limit]
+    return plans[order], deviations[order]
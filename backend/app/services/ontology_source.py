@@ -0,0 +1,197 @@
+"""
+Location and generation of the ontology every process loads.
+
+An uploaded ontology replaces the configured ONTOLOGY_URL for every
+process, web workers and Celery workers alike, including those started
+after the upload: the uploaded file is recorded in CURRENT_ONTOLOGY_FILE,
+next to the uploads, and takes precedence over the configured location.
+
+Uploads also increment a generation counter shared through the cache
+backend, Redis in production, which web workers poll to load an upload
+made by another worker. The generation of a loaded ontology is that
+counter together with a digest of the content read, so cache keys and ETags
+including it are shared by processes holding the same graph and never by
+processes holding different graphs, whichever upload or version of a remote
+file they read.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import urllib.request
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Project root, three levels above backend/app/services
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, 'data', 'uploads')
+
+# Record of the uploaded ontology replacing the configured one
+CURRENT_ONTOLOGY_FILE = os.path.join(UPLOAD_FOLDER, 'current.json')
+
+# Ontology loaded when ONTOLOGY_URL is not set, relative to PROJECT_ROOT
+DEFAULT_ONTOLOGY = 'data/feinschmecker.nt'
+
+# Number of hex digits of the content digest kept in the generation
+GENERATION_LENGTH = 16
+
+# Cache key of the shared generation counter, incremented by every upload
+GENERATION_KEY = 'ontology:generation'
+
+
+def is_remote(location: str) -> bool:
+    """Check whether an ontology location is a URL rather than a file path."""
+    return location.startswith('http://') or location.startswith('https://')
+
+
+def ontology_location(configured: Optional[str] = None) -> str:
+    """
+    Get the location of the ontology to load.
+
+    Args:
+        configured: Configured ONTOLOGY_URL, a URL or a path relative to
+            PROJECT_ROOT, or None for DEFAULT_ONTOLOGY
+
+    Returns:
+        Absolute path of the current upload if there is one, otherwise the
+        configured URL or absolute path
+    """
+    uploaded = current_upload()
+    if uploaded is not None:
+        return uploaded
+
+    location = configured or DEFAULT_ONTOLOGY
+    if is_remote(location):
+        return location
+    return str((PROJECT_ROOT / location).resolve())
+
+
+def ontology_uri(location: str) -> str:
+    """Get the URI owlready2 loads an ontology location from."""
+    return location if is_remote(location) else Path(location).as_uri()
+
+
+def read_ontology(location: str) -> Tuple[io.BytesIO, str]:
+    """
+    Read the content of the ontology at a location.
+
+    The ontology is then loaded from the content read, so the digest is
+    that of the loaded graph even if the file or URL changes meanwhile.
+
+    Args:
+        location: URL or absolute path of the ontology
+
+    Returns:
+        Tuple of (content to load, hex digest of the content)
+    """
+    if is_remote(location):
+        with urllib.request.urlopen(location) as response:
+            content = response.read()
+    else:
+        with open(location, 'rb') as f:
+            content = f.read()
+    return io.BytesIO(content), hashlib.sha256(content).hexdigest()[:GENERATION_LENGTH]
+
+
+def ontology_generation(counter: int, digest: str) -> str:
+    """
+    Get the generation of a loaded ontology.
+
+    Args:
+        counter: Shared generation counter the ontology was loaded at
+        digest: Digest of the ontology's content, see read_ontology
+
+    Returns:
+        Generation string used in cache keys and ETags
+    """
+    return f"{counter}-{digest}"
+
+
+def shared_generation(store: Any) -> int:
+    """
+    Get the shared generation counter.
+
+    Args:
+        store: Flask-Caching cache shared by the web workers
+
+    Returns:
+        The counter, 0 if no ontology was uploaded or the store is unreachable
+    """
+    try:
+        return int(store.get(GENERATION_KEY) or 0)
+    except Exception as e:
+        logger.warning(f"Failed to read the ontology generation: {e}")
+        return 0
+
+
+def bump_generation(store: Any) -> int:
+    """
+    Increment the shared generation counter after an upload.
+
+    Redis increments it atomically, so concurrent uploads get distinct
+    counters.
+
+    Args:
+        store: Flask-Caching cache shared by the web workers
+
+    Returns:
+        The incremented counter
+    """
+    return int(store.cache.inc(GENERATION_KEY) or 0)
+
+
+def record_upload(path: str):
+    """
+    Record an uploaded ontology as the one every process loads.
+
+    The record is replaced atomically, so readers see either the previous
+    upload or this one.
+
+    Args:
+        path: Path of the uploaded file, inside UPLOAD_FOLDER
+    """
+    fd, temporary = tempfile.mkstemp(dir=UPLOAD_FOLDER, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'file': os.path.basename(path)}, f)
+        os.replace(temporary, CURRENT_ONTOLOGY_FILE)
+    except Exception:
+        os.unlink(temporary)
+        raise
+
+
+def current_upload() -> Optional[str]:
+    """
+    Get the uploaded ontology every process loads.
+
+    Returns:
+        Absolute path of the recorded upload, or None if there is none or
+        its file is gone
+    """
+    try:
+        with open(CURRENT_ONTOLOGY_FILE) as f:
+            path = os.path.join(UPLOAD_FOLDER, json.load(f)['file'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def upload_stamp() -> Optional[Tuple[int, int]]:
+    """
+    Get a stamp of the upload record, changing with every upload.
+
+    Returns:
+        Tuple of the record's modification time and size, or None if no
+        ontology was uploaded
+    """
+    try:
+        stat = os.stat(CURRENT_ONTOLOGY_FILE)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
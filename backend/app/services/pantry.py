@@ -0,0 +1,98 @@
+"""
+Pantry-coverage ranking for "what can I make with what I have" searches.
+
+Given the ingredients a user has on hand, every recipe is scored by coverage
+(the fraction of its ingredients the pantry covers) and by the number of
+ingredients still missing. Recipes are ranked by highest coverage, then
+fewest missing items, then name; recipes using none of the pantry items are
+left out.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from backend.app.services.ingredient_index import normalize_ingredient
+
+
+class PantryOrder:
+    """Ranking of recipes by pantry coverage, usable in place of a SortOrder."""
+
+    def __init__(self, terms: List[str]):
+        """
+        Initialize the ranking.
+
+        Args:
+            terms: Pantry items, each matched as a case-insensitive substring
+                of the recipes' ingredient names
+        """
+        self.terms = [normalize_ingredient(term) for term in terms]
+        self.columns: Dict[str, np.ndarray] = {}
+        self.page: List[Tuple[int, int]] = []
+
+    def bind(self, matched: np.ndarray, totals: np.ndarray):
+        """
+        Attach the coverage counts of the recipes to rank.
+
+        Args:
+            matched: Covered ingredients per candidate
+            totals: Total ingredients per candidate
+        """
+        self.columns = {'pantry_matched': matched, 'pantry_total': totals}
+
+    def count(self, ingredient_names: Iterable[str]) -> Tuple[int, int]:
+        """
+        Count the ingredients of one recipe covered by the pantry.
+
+        Args:
+            ingredient_names: The recipe's ingredient names
+
+        Returns:
+            Tuple of (covered ingredients, total ingredients)
+        """
+        names = {normalize_ingredient(name) for name in ingredient_names}
+        matched = sum(1 for name in names if any(term in name for term in self.terms))
+        return matched, len(names)
+
+    def keys(self, values: Callable[[str], np.ndarray]) -> np.ndarray:
+        """
+        Evaluate the ranking keys of every candidate.
+
+        Args:
+            values: Callable returning the values of a column per candidate
+
+        Returns:
+            2-D array of key columns (negated coverage, missing ingredients),
+            ascending in result order
+        """
+        matched = np.asarray(values('pantry_matched'), dtype=np.float64)
+        totals = np.asarray(values('pantry_total'), dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            coverage = np.where(totals > 0, matched / totals, 0.0)
+        return np.vstack([-coverage, totals - matched])
+
+    def select(self, positions: np.ndarray):
+        """
+        Remember the coverage counts of the recipes of a page.
+
+        Args:
+            positions: Positions of the page's recipes into the bound columns
+        """
+        matched = self.columns['pantry_matched'][positions]
+        totals = self.columns['pantry_total'][positions]
+        self.page = [(int(m), int(t)) for m, t in zip(matched, totals)]
+
+    def annotate(self, recipes: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Add the pantry coverage and missing count to the recipes of a page.
+
+        Args:
+            recipes: Recipe dictionaries of the selected page, in page order
+
+        Yields:
+            Each recipe, with 'coverage' and 'missing' set
+        """
+        for recipe, (matched, total) in zip(recipes, self.page):
+            recipe['coverage'] = matched / total if total else 0.0
+            recipe['missing'] = total - matched
+            yield recipe
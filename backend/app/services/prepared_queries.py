@@ -0,0 +1,132 @@
+"""
+Cache of prepared SPARQL queries keyed by filter shape.
+
+owlready2 parses a SPARQL query and translates it to SQL before running it.
+Since RecipeQueryBuilder emits filter values as parameters, every filter set
+with the same shape shares one query text, which is prepared once here and
+then executed with the values of each request bound as parameters.
+
+Searches run in two phases: a match query per filter shape finds the
+matching recipes, and a hydration query per batch size and projection reads
+the fields of a page of them.
+
+Queries are prepared against the world of an ontology and only used with
+that world, so a reloaded ontology, loaded into a world of its own, never
+runs a query prepared for the previous one.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from backend.app.services.query_builder import (
+    build_hydration_query,
+    build_match_query,
+    hydrated_fields,
+    query_parameters,
+)
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of distinct filter shapes kept prepared
+PREPARED_QUERY_CACHE_SIZE = 128
+
+
+class PreparedQueryCache:
+    """Bounded LRU cache of owlready2 prepared queries."""
+
+    def __init__(self, maxsize: int = PREPARED_QUERY_CACHE_SIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of prepared queries to keep
+        """
+        self.maxsize = maxsize
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_query(self, world: Any, filters: Dict[str, Any]) -> Tuple[Any, List[Any]]:
+        """
+        Get the prepared match query for a filter set.
+
+        Args:
+            world: owlready2 World the query runs in
+            filters: Dictionary of filter parameters
+
+        Returns:
+            Tuple of (prepared query, parameter values to execute it with)
+        """
+        params = query_parameters(filters)
+        prepared = self._prepare(world, tuple(params), lambda: build_match_query(filters)[0])
+        return prepared, list(params.values())
+
+    def get_hydration_query(
+        self,
+        world: Any,
+        recipes: List[Any],
+        fields: Optional[List[str]] = None
+    ) -> Tuple[Any, List[Any]]:
+        """
+        Get the prepared hydration query for a batch of recipes.
+
+        Batches are padded to the next power of two by repeating their last
+        recipe, so a handful of batch sizes share prepared queries.
+
+        Args:
+            world: owlready2 World the query runs in
+            recipes: Recipe individuals to hydrate, at least one
+            fields: Requested result fields, or None for all of them
+
+        Returns:
+            Tuple of (prepared query, parameter values to execute it with)
+        """
+        count = 1 << (len(recipes) - 1).bit_length()
+        shape = ('hydrate', count, tuple(hydrated_fields(fields)))
+        prepared = self._prepare(world, shape, lambda: build_hydration_query(count, fields))
+        return prepared, list(recipes) + [recipes[-1]] * (count - len(recipes))
+
+    def _prepare(self, world: Any, shape: Tuple, build) -> Any:
+        """
+        Get a prepared query, preparing and caching it on first use.
+
+        Args:
+            world: owlready2 World the query runs in
+            shape: Cache key of the query
+            build: Callable returning the query text
+
+        Returns:
+            Prepared query
+        """
+        prepared = None
+        with self._lock:
+            entry = self._queries.get(shape)
+            if entry is not None and entry[0] is world:
+                prepared = entry[1]
+                self._queries.move_to_end(shape)
+
+        if prepared is None:
+            prepared = world.prepare_sparql(build())
+            logger.debug(f"Prepared SPARQL query for shape {shape}")
+
+            with self._lock:
+                self._queries[shape] = (world, prepared)
+                self._queries.move_to_end(shape)
+                while len(self._queries) > self.maxsize:
+                    self._queries.popitem(last=False)
+
+        return prepared
+
+    def clear(self):
+        """Drop all prepared queries, e.g. after the ontology was reloaded."""
+        with self._lock:
+            self._queries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of prepared queries held."""
+        return len(self._queries)
+
+
+# Shared cache used by RecipeService
+prepared_queries = PreparedQueryCache()
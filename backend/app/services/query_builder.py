@@ -3,13 +3,126 @@ SPARQL query builder for recipe filtering.
 
 This module constructs SPARQL queries dynamically based on filter parameters,
 supporting nutritional values, dietary restrictions, ingredients, and more.
+Filter values are never interpolated into the query text; they are emitted as
+owlready2 ``??N`` parameters, so the text only depends on the filter shape.
 """
 
-from typing import Dict, Any, Optional
+import re
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+NUTRIENTS = ['calories', 'protein', 'fat', 'carbohydrates']
+
+# Result fields and the query variables selecting them, in result order
+FIELD_VARIABLES = {
+    'name': '?name',
+    'link': '?link',
+    'image_link': '?image_link',
+    'instructions': '?instructions',
+    'ingredients': '(GROUP_CONCAT(?ing_name ; separator = "#" ) AS ?ingredients)',
+    'vegan': '?vegan',
+    'vegetarian': '?vegetarian',
+    'meal_type': '?type_name',
+    'time': '?time_amount',
+    'difficulty': '?difficulty_amount',
+    **{nutrient: f'?{nutrient}_amount' for nutrient in NUTRIENTS},
+    'author': '?author_name',
+    'source_name': '?source_name',
+    'source_link': '?source_link',
+}
+
+# Fields every query selects: they are cheap, single-valued, and needed to
+# order, rank and count results whatever a client asked for
+KEY_FIELDS = ['name', 'vegan', 'vegetarian', 'meal_type', 'time', 'difficulty'] + NUTRIENTS
+
+# Triple patterns of the name and remaining fields; fields sharing a pattern group are
+# selected together
+FIELD_PATTERNS = [
+    (['link'], "?res feinschmecker:has_link ?link . \n"),
+    (['image_link'], "?res feinschmecker:has_image_link ?image_link . \n"),
+    (['name'], "?res feinschmecker:has_recipe_name ?name . \n"),
+    (['instructions'], "?res feinschmecker:has_instructions ?instructions . \n"),
+    (['ingredients'], (
+        "?res feinschmecker:has_ingredient ?ing . \n"
+        "?ing feinschmecker:has_ingredient_with_amount_name ?ing_name . \n"
+    )),
+    (['author', 'source_name', 'source_link'], (
+        "?res feinschmecker:authored_by ?author . \n"
+        "?author feinschmecker:has_author_name ?author_name . \n"
+        "?author feinschmecker:is_author_of ?source . \n"
+        "?source feinschmecker:has_source_name ?source_name . \n"
+        "?source feinschmecker:is_website ?source_link . \n"
+    )),
+]
+
+
+def selected_fields(fields: Optional[List[str]] = None) -> List[str]:
+    """
+    Get the fields a query selects for a projection.
+    
+    Args:
+        fields: Requested result fields, or None for all of them
+    
+    Returns:
+        Selected fields in result order: the requested ones plus KEY_FIELDS
+    """
+    if fields is None:
+        return list(FIELD_VARIABLES)
+    wanted = set(fields) | set(KEY_FIELDS)
+    return [field for field in FIELD_VARIABLES if field in wanted]
+
+
+def query_parameters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Collect the filter values bound as query parameters.
+    
+    Keys name the parameter slots and values are the bound values, in the
+    order the builder emits them. Ingredient terms are escaped so they are
+    matched literally by ``FILTER regex``; canonical ingredient ids are bound
+    as the IRI suffix they match.
+    
+    Args:
+        filters: Dictionary of filter parameters
+    
+    Returns:
+        Ordered dictionary of slot name to parameter value
+    """
+    params = {}
+    
+    for i, ingredient in enumerate(filters.get("ingredients", [])):
+        params[f"ingredient_{i}"] = re.escape(ingredient)
+    
+    for i, ingredient in enumerate(filters.get("ingredient_ids", [])):
+        params[f"ingredient_id_{i}"] = "/" + ingredient
+    
+    for flag in ("vegan", "vegetarian"):
+        if flag in filters:
+            params[flag] = bool(filters[flag])
+    
+    if "meal_type" in filters:
+        params["meal_type"] = str(filters["meal_type"])
+    
+    if "time" in filters:
+        params["time"] = filters["time"]
+    
+    if "difficulty" in filters:
+        params["difficulty"] = filters["difficulty"]
+    
+    # Support both old naming (bigger/smaller) and new naming (min/max)
+    for nutrient in NUTRIENTS:
+        for bound, old_key, new_key in (
+            ("min", f"{nutrient}_bigger", f"{nutrient}_min"),
+            ("max", f"{nutrient}_smaller", f"{nutrient}_max"),
+        ):
+            if old_key in filters:
+                params[f"{nutrient}_{bound}"] = filters[old_key]
+            elif new_key in filters:
+                params[f"{nutrient}_{bound}"] = filters[new_key]
+    
+    return params
+
 
 class RecipeQueryBuilder:
     """Builder class for constructing SPARQL queries for recipe filtering."""
@@ -19,20 +132,40 @@ class RecipeQueryBuilder:
         self.header = ""
         self.body = ""
         self.filters = {}
+        self.params = {}
+        self.fields = list(FIELD_VARIABLES)
+        self.with_recipe = False
     
-    def build_query(self, filters: Dict[str, Any], limit: Optional[int] = None, offset: Optional[int] = None) -> str:
+    def build_query(
+        self,
+        filters: Dict[str, Any],
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+        with_recipe: bool = False
+    ) -> str:
         """
         Build a complete SPARQL query from filter parameters.
         
+        The values to bind are left in ``self.params``, in parameter order,
+        and the selected fields in ``self.fields``, in column order. Fields
+        outside the projection are neither selected nor joined; recipes are
+        only required to have them, as with the full query.
+        
         Args:
             filters: Dictionary of filter parameters
             limit: Maximum number of results to return
             offset: Number of results to skip (for pagination)
+            fields: Result fields to select, or None for all of them
+            with_recipe: Whether to select and group by the recipe
+                individual ``?res`` ahead of the fields
         
         Returns:
-            Complete SPARQL query string
+            Complete SPARQL query string with ``??N`` parameters
         """
-        self.filters = filters
+        self.fields = selected_fields(fields)
+        self.with_recipe = with_recipe
+        self._bind(filters)
         self._build_header()
         self._build_body()
         
@@ -40,20 +173,28 @@ class RecipeQueryBuilder:
         
         # Add LIMIT and OFFSET for pagination
         if limit is not None:
-            query += f" LIMIT {limit}"
+            self.params["limit"] = limit
+            query += f" LIMIT {self._param('limit')}"
         if offset is not None:
-            query += f" OFFSET {offset}"
+            self.params["offset"] = offset
+            query += f" OFFSET {self._param('offset')}"
         
         logger.debug(f"Built SPARQL query: {query}")
         return query
     
+    def _bind(self, filters: Dict[str, Any]):
+        """Set the filters and the parameter values they bind."""
+        self.filters = filters
+        self.params = query_parameters(filters)
+    
+    def _param(self, slot: str) -> str:
+        """Get the ``??N`` placeholder for a parameter slot."""
+        return f"??{list(self.params).index(slot) + 1}"
+    
     def _build_header(self):
         """Build the SELECT clause of the query."""
-        self.header = (
-            "SELECT ?name ?link ?image_link ?instructions "
-            "(GROUP_CONCAT(?ing_name ; separator = \"#\" ) AS ?ingredients) "
-            "?vegan ?vegetarian ?type_name ?time_amount ?difficulty_amount "
-        )
+        variables = (["?res"] if self.with_recipe else []) + [FIELD_VARIABLES[field] for field in self.fields]
+        self.header = "SELECT " + " ".join(variables)
     
     def _build_body(self):
         """Build the WHERE clause and filters of the query."""
@@ -62,6 +203,8 @@ class RecipeQueryBuilder:
         # Add ingredient filters
         if "ingredients" in self.filters:
             self._add_ingredient_filters(self.filters["ingredients"])
+        if "ingredient_ids" in self.filters:
+            self._add_ingredient_id_filters(self.filters["ingredient_ids"])
         
         # Add vegan/vegetarian filters
         self._add_dietary_filters()
@@ -93,26 +236,37 @@ class RecipeQueryBuilder:
             self.body += f"?res feinschmecker:has_ingredient ?ext_ing{appendum} . \n"
             self.body += f"?ext_ing{appendum} feinschmecker:type_of_ingredient ?ing{appendum} . \n"
             self.body += f"?ing{appendum} feinschmecker:has_ingredient_name ?ing_name{appendum} . \n"
-            self.body += f"FILTER regex(?ing_name{appendum}, \"{ingredient}\", \"i\") . \n"
+            self.body += f"FILTER regex(?ing_name{appendum}, {self._param(f'ingredient_{i}')}, \"i\") . \n"
             appendum += "a"
     
+    def _add_ingredient_id_filters(self, ingredient_ids: list):
+        """
+        Add exact ingredient filtering by canonical ingredient id to the query.
+        
+        Args:
+            ingredient_ids: List of ingredient ids, the local names of the
+                ingredients' IRIs
+        """
+        for i, _ in enumerate(ingredient_ids):
+            self.body += f"?res feinschmecker:has_ingredient ?ext_ing_id{i} . \n"
+            self.body += f"?ext_ing_id{i} feinschmecker:type_of_ingredient ?ing_id{i} . \n"
+            self.body += f"FILTER(STRENDS(STR(?ing_id{i}), {self._param(f'ingredient_id_{i}')})) . \n"
+    
     def _add_dietary_filters(self):
         """Add vegan and vegetarian filtering to the query."""
         if "vegan" in self.filters:
-            vegan_value = "true" if self.filters["vegan"] else "false"
-            self.body += f"?res feinschmecker:is_vegan {vegan_value} . \n"
+            self.body += f"?res feinschmecker:is_vegan {self._param('vegan')} . \n"
         self.body += "?res feinschmecker:is_vegan ?vegan . \n"
         
         if "vegetarian" in self.filters:
-            vegetarian_value = "true" if self.filters["vegetarian"] else "false"
-            self.body += f"?res feinschmecker:is_vegetarian {vegetarian_value} . \n"
+            self.body += f"?res feinschmecker:is_vegetarian {self._param('vegetarian')} . \n"
         self.body += "?res feinschmecker:is_vegetarian ?vegetarian . \n"
     
     def _add_meal_type_filter(self):
         """Add meal type filtering to the query."""
         if "meal_type" in self.filters:
             self.body += "?res feinschmecker:is_meal_type ?type . \n"
-            self.body += f"?type feinschmecker:has_meal_type_name \"{self.filters['meal_type']}\" . \n"
+            self.body += f"?type feinschmecker:has_meal_type_name {self._param('meal_type')} . \n"
             self.body += "?type feinschmecker:has_meal_type_name ?type_name . \n"
         else:
             self.body += "OPTIONAL {?res feinschmecker:is_meal_type ?type . \n"
@@ -124,19 +278,17 @@ class RecipeQueryBuilder:
         self.body += "?res feinschmecker:requires_time ?time . \n"
         self.body += "?time feinschmecker:amount_of_time ?time_amount . \n"
         if "time" in self.filters:
-            self.body += f"FILTER (?time_amount < {self.filters['time']}) . \n"
+            self.body += f"FILTER (?time_amount < {self._param('time')}) . \n"
         
         # Difficulty filter
         self.body += "?res feinschmecker:has_difficulty ?difficulty . \n"
         self.body += "?difficulty feinschmecker:has_numeric_difficulty ?difficulty_amount . \n"
         if "difficulty" in self.filters:
-            self.body += f"FILTER (?difficulty_amount = {self.filters['difficulty']}) . \n"
+            self.body += f"FILTER (?difficulty_amount = {self._param('difficulty')}) . \n"
     
     def _add_nutrient_filters(self):
         """Add nutrient filtering to the query."""
-        nutrients = ['calories', 'protein', 'fat', 'carbohydrates']
-        
-        for nutrient in nutrients:
+        for nutrient in NUTRIENTS:
             self._add_nutrient_filter(nutrient)
     
     def _add_nutrient_filter(self, nutrient: str):
@@ -146,79 +298,158 @@ class RecipeQueryBuilder:
         Args:
             nutrient: Name of the nutrient (e.g., 'calories', 'protein')
         """
-        self.header += f"?{nutrient}_amount "
         self.body += f"?res feinschmecker:has_{nutrient} ?{nutrient} . \n"
         self.body += f"?{nutrient} feinschmecker:amount_of_{nutrient} ?{nutrient}_amount . \n"
         
-        # Support both old naming (bigger/smaller) and new naming (min/max)
-        bigger_key = f"{nutrient}_bigger"
-        min_key = f"{nutrient}_min"
-        smaller_key = f"{nutrient}_smaller"
-        max_key = f"{nutrient}_max"
-        
-        # Min/bigger filter
-        if bigger_key in self.filters:
-            self.body += f"FILTER (?{nutrient}_amount > {self.filters[bigger_key]}) . \n"
-        elif min_key in self.filters:
-            self.body += f"FILTER (?{nutrient}_amount > {self.filters[min_key]}) . \n"
-        
-        # Max/smaller filter
-        if smaller_key in self.filters:
-            self.body += f"FILTER (?{nutrient}_amount < {self.filters[smaller_key]}) . \n"
-        elif max_key in self.filters:
-            self.body += f"FILTER (?{nutrient}_amount < {self.filters[max_key]}) . \n"
+        # Min/bigger and max/smaller bounds are resolved by query_parameters
+        if f"{nutrient}_min" in self.params:
+            self.body += f"FILTER (?{nutrient}_amount > {self._param(f'{nutrient}_min')}) . \n"
+        if f"{nutrient}_max" in self.params:
+            self.body += f"FILTER (?{nutrient}_amount < {self._param(f'{nutrient}_max')}) . \n"
     
     def _add_required_fields(self):
-        """Add required recipe fields to the query."""
-        self.body += "?res feinschmecker:has_link ?link . \n"
-        self.body += "?res feinschmecker:has_image_link ?image_link . \n"
-        self.body += "?res feinschmecker:has_recipe_name ?name . \n"
-        self.body += "?res feinschmecker:has_instructions ?instructions . \n"
-        self.body += "?res feinschmecker:has_ingredient ?ing . \n"
-        self.body += "?ing feinschmecker:has_ingredient_with_amount_name ?ing_name . \n"
-        
-        # Author and source information
-        self.header += " ?author_name ?source_name ?source_link"
-        self.body += "?res feinschmecker:authored_by ?author . \n"
-        self.body += "?author feinschmecker:has_author_name ?author_name . \n"
-        self.body += "?author feinschmecker:is_author_of ?source . \n"
-        self.body += "?source feinschmecker:has_source_name ?source_name . \n"
-        self.body += "?source feinschmecker:is_website ?source_link . \n"
+        """
+        Add the patterns of the remaining recipe fields to the query.
+        
+        Selected fields are joined; the others are only required to exist,
+        so a projection never changes which recipes match, and multi-valued
+        fields such as ingredients do not multiply the rows to group.
+        """
+        required = ""
+        for fields, patterns in FIELD_PATTERNS:
+            if any(field in self.fields for field in fields):
+                self.body += patterns
+            else:
+                required += patterns
+        if required:
+            self.body += "FILTER EXISTS { \n" + required + "} \n"
     
     def _build_group_by(self) -> str:
-        """Build the GROUP BY clause."""
-        return (
-            "GROUP BY ?name ?link ?image_link ?instructions ?vegan ?vegetarian "
-            "?type_name ?time_amount ?difficulty_amount ?calories_amount "
-            "?protein_amount ?fat_amount ?carbohydrates_amount "
-            "?author_name ?source_name ?source_link"
-        )
+        """Build the GROUP BY clause over every selected non-aggregate field."""
+        variables = (["?res"] if self.with_recipe else []) + [
+            FIELD_VARIABLES[field] for field in self.fields if field != 'ingredients'
+        ]
+        return "GROUP BY " + " ".join(variables)
+
+
+def build_index_query() -> str:
+    """
+    Build an unfiltered SPARQL query returning every recipe with its IRI.
+    
+    Used once per ontology load to materialize the in-memory recipe index.
+    The selected columns follow the main query, prefixed by ``?res``.
+    
+    Returns:
+        SPARQL query string
+    """
+    # Select and group by the recipe resource so rows map back to individuals
+    query = RecipeQueryBuilder().build_query({}, with_recipe=True)
+    
+    logger.debug(f"Built index query: {query}")
+    return query
 
 
-def build_count_query(filters: Dict[str, Any]) -> str:
+def build_match_query(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
     """
-    Build a SPARQL query to count total matching recipes (for pagination).
+    Build the first phase of a two-phase search: the matching recipes.
+    
+    Only ``?res`` and KEY_FIELDS are selected, enough to count, order and
+    rank the matches; no ingredients are aggregated and every other field
+    is only required to exist. The page is then hydrated with
+    build_hydration_query.
     
     Args:
         filters: Dictionary of filter parameters
     
     Returns:
-        SPARQL COUNT query string
+        Tuple of (SPARQL query string, parameter values)
     """
-    # Build a query similar to the main query but only count results
     builder = RecipeQueryBuilder()
-    builder.filters = filters
+    query = builder.build_query(filters, fields=[], with_recipe=True)
+    return query, list(builder.params.values())
+
+
+def hydrated_fields(fields: Optional[List[str]] = None) -> List[str]:
+    """
+    Get the fields of a projection that are not KEY_FIELDS.
     
-    # Use COUNT with DISTINCT
-    count_header = "SELECT (COUNT(DISTINCT ?res) AS ?count) "
+    Args:
+        fields: Requested result fields, or None for all of them
     
-    # Build body without grouping
-    builder._build_body()
+    Returns:
+        Fields a hydration query selects, in result order
+    """
+    return [field for field in selected_fields(fields) if field not in KEY_FIELDS]
+
+
+def build_hydration_query(count: int, fields: Optional[List[str]] = None) -> str:
+    """
+    Build the second phase of a two-phase search: the fields of a page.
     
-    # Remove the GROUP BY clause from the body
-    body = builder.body.split("GROUP BY")[0]
+    The recipes are bound as the ``??1`` to ``??count`` parameters. Only the
+    hydrated fields of the projection are selected, so the ingredient
+    aggregation only runs over the recipes of the page.
     
-    query = count_header + body
-    logger.debug(f"Built count query: {query}")
+    Args:
+        count: Number of recipe parameters
+        fields: Requested result fields, or None for all of them
+    
+    Returns:
+        SPARQL query string selecting ``?res`` and the hydrated fields
+    """
+    hydrated = hydrated_fields(fields)
+    recipes = ", ".join(f"??{i + 1}" for i in range(count))
+    
+    query = "SELECT ?res " + " ".join(FIELD_VARIABLES[field] for field in hydrated)
+    query += " {FILTER(?res IN (" + recipes + ")) . \n"
+    for group, patterns in FIELD_PATTERNS:
+        if any(field in hydrated for field in group):
+            query += patterns
+    query += "}GROUP BY ?res " + " ".join(
+        FIELD_VARIABLES[field] for field in hydrated if field != 'ingredients'
+    )
+    
+    logger.debug(f"Built hydration query: {query}")
     return query
 
+
+def build_ingredient_index_query() -> str:
+    """
+    Build a SPARQL query returning (recipe, ingredient name) pairs.
+    
+    Used once per ontology load to build the inverted ingredient index.
+    
+    Returns:
+        SPARQL query string
+    """
+    query = (
+        "SELECT ?res ?ing_name {?res rdf:type feinschmecker:Recipe . \n"
+        "?res feinschmecker:has_ingredient ?ext_ing . \n"
+        "?ext_ing feinschmecker:type_of_ingredient ?ing . \n"
+        "?ing feinschmecker:has_ingredient_name ?ing_name . \n"
+        "}"
+    )
+    logger.debug(f"Built ingredient index query: {query}")
+    return query
+
+
+def build_pantry_query() -> str:
+    """
+    Build a SPARQL query returning (recipe name, ingredient name) pairs.
+    
+    Used to score pantry coverage when no recipe index is available, since
+    the main query only returns ingredients with their amounts.
+    
+    Returns:
+        SPARQL query string
+    """
+    query = (
+        "SELECT ?name ?ing_name {?res rdf:type feinschmecker:Recipe . \n"
+        "?res feinschmecker:has_recipe_name ?name . \n"
+        "?res feinschmecker:has_ingredient ?ext_ing . \n"
+        "?ext_ing feinschmecker:type_of_ingredient ?ing . \n"
+        "?ing feinschmecker:has_ingredient_name ?ing_name . \n"
+        "}"
+    )
+    logger.debug(f"Built pantry query: {query}")
+    return query
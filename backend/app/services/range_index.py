@@ -0,0 +1,76 @@
+"""
+Sorted range indexes over numeric recipe attributes.
+
+This module keeps, per numeric attribute (nutrients and time), the recipe ids
+sorted by attribute value. A bound becomes a binary search into the sorted
+values, so a range filter costs O(log n + k) for k matching recipes instead
+of a scan over every recipe, and its exact cardinality is known up front.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class RangeIndex:
+    """Recipe ids sorted by the value of one numeric attribute."""
+
+    def __init__(self, values: np.ndarray):
+        """
+        Build the index from attribute values.
+
+        Args:
+            values: Attribute value per recipe id, NaN where it is missing
+        """
+        # Recipes without a value never match a bound, so they are left out
+        present = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[present], kind='stable')
+        self.ids = present[order]
+        self.values = values[self.ids]
+
+    def __len__(self) -> int:
+        """Return the number of recipes with a value."""
+        return len(self.ids)
+
+    def bounds(self, lower: Optional[float] = None, upper: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Find the slice of sorted values inside exclusive bounds.
+
+        Args:
+            lower: Exclusive lower bound, or None
+            upper: Exclusive upper bound, or None
+
+        Returns:
+            Tuple of (start, end) positions into the sorted values
+        """
+        start = 0 if lower is None else int(np.searchsorted(self.values, lower, side='right'))
+        end = len(self.values) if upper is None else int(np.searchsorted(self.values, upper, side='left'))
+        return start, max(start, end)
+
+    def count(self, lower: Optional[float] = None, upper: Optional[float] = None) -> int:
+        """
+        Count the recipes with a value inside exclusive bounds.
+
+        Args:
+            lower: Exclusive lower bound, or None
+            upper: Exclusive upper bound, or None
+
+        Returns:
+            Exact number of matching recipes
+        """
+        start, end = self.bounds(lower, upper)
+        return end - start
+
+    def lookup(self, lower: Optional[float] = None, upper: Optional[float] = None) -> np.ndarray:
+        """
+        Find the recipes with a value inside exclusive bounds.
+
+        Args:
+            lower: Exclusive lower bound, or None
+            upper: Exclusive upper bound, or None
+
+        Returns:
+            Sorted array of matching recipe ids
+        """
+        start, end = self.bounds(lower, upper)
+        return np.sort(self.ids[start:end])
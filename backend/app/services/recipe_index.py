@@ -0,0 +1,566 @@
+"""
+In-memory columnar index over the recipes of the loaded ontology.
+
+This module loads the filterable recipe attributes of the materialized
+RecipeView into NumPy arrays once per ontology load, so standard searches can
+be answered with vectorized boolean masks instead of walking the triple store
+on every request.
+"""
+
+import bisect
+import logging
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.app.services.facets import FACETS, FacetBitsets
+from backend.app.services.ingredient_index import IngredientIndex
+from backend.app.services.range_index import RangeIndex
+from backend.app.services.recipe_view import RecipeView, recipe_slug
+from backend.app.services.similarity import SimilarityTable
+from backend.app.services.statistics import RecipeStatistics
+
+logger = logging.getLogger(__name__)
+
+NUTRIENTS = ['calories', 'protein', 'fat', 'carbohydrates']
+
+# Filter keys the index can evaluate without falling back to SPARQL
+INDEXED_FILTERS = {'ingredients', 'ingredient_ids', 'vegan', 'vegetarian', 'meal_type', 'time', 'difficulty'} | {
+    f"{nutrient}_{suffix}"
+    for nutrient in NUTRIENTS
+    for suffix in ('bigger', 'min', 'smaller', 'max')
+}
+
+# Columns of the materialized view loaded into the index
+INDEX_COLUMNS = ['iri', 'name', 'vegan', 'vegetarian', 'meal_type', 'time', 'difficulty'] + NUTRIENTS
+
+
+def _to_float(value: Any) -> float:
+    """Convert a column value into a float, using NaN for missing values."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return float('nan')
+
+
+class RecipeIndex:
+    """
+    Read-only columnar snapshot of the recipes in an ontology.
+
+    Recipes are addressed by the dense integer ids of the RecipeView they
+    are loaded from, assigned in recipe name order. Numeric attributes and
+    dietary flags are held as NumPy arrays; display fields stay in the view
+    and are only fetched for the recipes of the requested page. Ingredient
+    filters are answered by an inverted IngredientIndex over the same ids.
+    """
+
+    def __init__(
+        self,
+        iris: List[str],
+        names: List[str],
+        columns: Dict[str, List[Any]],
+        ingredient_pairs: Iterable[Tuple[int, str]] = (),
+        previous: Optional['RecipeIndex'] = None
+    ):
+        """
+        Initialize the index from recipe columns.
+
+        Args:
+            iris: Recipe IRIs, one per dense recipe id
+            names: Recipe names, one per dense recipe id
+            columns: Filterable attribute values, one list per attribute
+            ingredient_pairs: (recipe id, ingredient name) pairs
+            previous: Index of the previously loaded ontology, whose
+                similarity table is updated rather than rebuilt
+        """
+        self.iris = iris
+        self.id_by_iri = {iri: i for i, iri in enumerate(iris)}
+
+        # Public recipe ids are the local names of the IRIs
+        self.slugs = [recipe_slug(iri) for iri in iris]
+        self.id_by_slug = {slug: i for i, slug in enumerate(self.slugs)}
+
+        # Recipe names in id order; the default sort key for pagination
+        self.names = names
+
+        self.vegan = np.array([bool(value) for value in columns['vegan']], dtype=bool)
+        self.vegetarian = np.array([bool(value) for value in columns['vegetarian']], dtype=bool)
+        self.time = np.array([_to_float(value) for value in columns['time']], dtype=np.float64)
+        self.difficulty = np.array([_to_float(value) for value in columns['difficulty']], dtype=np.float64)
+
+        self.nutrients = {
+            nutrient: np.array([_to_float(value) for value in columns[nutrient]], dtype=np.float64)
+            for nutrient in NUTRIENTS
+        }
+
+        # Meal types are dictionary-encoded; -1 marks recipes without one
+        self.meal_types = sorted(set(columns['meal_type']) - {None})
+        self.meal_type_codes = {name: code for code, name in enumerate(self.meal_types)}
+        self.meal_type = np.array(
+            [self.meal_type_codes.get(value, -1) for value in columns['meal_type']],
+            dtype=np.int16,
+        )
+
+        # Sorted range indexes answer nutrient and time bounds by binary search
+        self.ranges = {
+            attribute: RangeIndex(values)
+            for attribute, values in dict(self.nutrients, time=self.time).items()
+        }
+
+        self.ingredients = IngredientIndex(ingredient_pairs, len(iris))
+        self.statistics = RecipeStatistics(self)
+        self.facets = FacetBitsets(self)
+        self.similarity = SimilarityTable.build(
+            self, previous.similarity if previous is not None else None
+        )
+
+    @classmethod
+    def from_view(cls, view: RecipeView, previous: Optional['RecipeIndex'] = None) -> 'RecipeIndex':
+        """
+        Build the index from the materialized recipe view.
+
+        Args:
+            view: RecipeView materialized from the loaded ontology
+            previous: Index of the previously loaded ontology, if any
+
+        Returns:
+            Populated RecipeIndex
+        """
+        start_time = time.time()
+
+        rows = view.get_columns(INDEX_COLUMNS)
+        columns = {column: [row[i] for row in rows] for i, column in enumerate(INDEX_COLUMNS)}
+        index = cls(
+            columns.pop('iri'), columns.pop('name'), columns, view.get_ingredient_pairs(), previous
+        )
+
+        elapsed_time = time.time() - start_time
+        logger.info(
+            f"Built recipe index with {len(index)} recipes and "
+            f"{len(index.ingredients)} ingredients in {elapsed_time:.3f}s"
+        )
+        return index
+
+    def __len__(self) -> int:
+        """Return the number of indexed recipes."""
+        return len(self.iris)
+
+    def supports(self, filters: Dict[str, Any]) -> bool:
+        """
+        Check whether the index can answer a filter set on its own.
+
+        Args:
+            filters: Dictionary of validated filter parameters
+
+        Returns:
+            True if every filter key is handled by the index
+        """
+        return set(filters) <= INDEXED_FILTERS
+
+    def plan(self, filters: Dict[str, Any]) -> List['PlanStep']:
+        """
+        Build the evaluation plan for a filter set.
+
+        Each filter becomes a step with a cardinality estimate taken from the
+        index statistics, or the exact count of its range index for numeric
+        bounds; steps are ordered most selective first.
+
+        Args:
+            filters: Dictionary of validated filter parameters
+
+        Returns:
+            List of plan steps in evaluation order
+        """
+        stats = self.statistics
+        steps = []
+
+        for term in filters.get('ingredients', []):
+            name_ids = self.ingredients.find_names(term)
+            steps.append(PlanStep(
+                'ingredients', f"ingredient contains '{term}'", ('ingredients', term),
+                stats.estimate_ingredient(name_ids),
+                lambda ids, name_ids=name_ids: self.ingredients.recipes_for_names(name_ids)[ids],
+            ))
+
+        for ingredient in filters.get('ingredient_ids', []):
+            name_id = self.ingredients.name_by_id.get(ingredient)
+            postings = (
+                self.ingredients.name_recipes[name_id] if name_id is not None
+                else np.empty(0, dtype=np.int32)
+            )
+            steps.append(PlanStep(
+                'ingredient_ids', f"ingredient = '{ingredient}'", ('ingredient_ids', ingredient),
+                len(postings),
+                lambda ids, postings=postings: np.isin(ids, postings, assume_unique=True),
+                lambda postings=postings: postings.astype(np.intp),
+                access='index lookup',
+            ))
+
+        for flag in ('vegan', 'vegetarian'):
+            if flag in filters:
+                value = bool(filters[flag])
+                steps.append(PlanStep(
+                    flag, f"{flag} = {str(value).lower()}", (flag, value),
+                    stats.estimate_flag(flag, value),
+                    lambda ids, flag=flag, value=value: getattr(self, flag)[ids] == value,
+                ))
+
+        if 'meal_type' in filters:
+            code = self.meal_type_codes.get(filters['meal_type'], -2)
+            steps.append(PlanStep(
+                'meal_type', f"meal_type = {filters['meal_type']}",
+                ('meal_type', filters['meal_type']),
+                stats.estimate_meal_type(filters['meal_type']),
+                lambda ids, code=code: self.meal_type[ids] == code,
+            ))
+
+        if 'time' in filters:
+            upper = float(filters['time'])
+            steps.append(PlanStep(
+                'time', f"time < {upper:g}", ('time', None, upper),
+                self.ranges['time'].count(upper=upper),
+                lambda ids, upper=upper: self.time[ids] < upper,
+                lambda upper=upper: self.ranges['time'].lookup(upper=upper),
+            ))
+
+        if 'difficulty' in filters:
+            level = float(filters['difficulty'])
+            steps.append(PlanStep(
+                'difficulty', f"difficulty = {level:g}", ('difficulty', level),
+                stats.estimate_difficulty(level),
+                lambda ids, level=level: self.difficulty[ids] == level,
+            ))
+
+        for nutrient in NUTRIENTS:
+            lower = self._bound(filters, f"{nutrient}_bigger", f"{nutrient}_min")
+            upper = self._bound(filters, f"{nutrient}_smaller", f"{nutrient}_max")
+            if lower is None and upper is None:
+                continue
+            steps.append(PlanStep(
+                nutrient, self._range_condition(nutrient, lower, upper), (nutrient, lower, upper),
+                self.ranges[nutrient].count(lower, upper),
+                lambda ids, values=self.nutrients[nutrient], lower=lower, upper=upper:
+                    self._in_range(values[ids], lower, upper),
+                lambda ranges=self.ranges[nutrient], lower=lower, upper=upper:
+                    ranges.lookup(lower, upper),
+            ))
+
+        # Stable sort keeps the default order among equally selective steps
+        steps.sort(key=lambda step: step.estimated)
+        return steps
+
+    def match(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Evaluate filters over the index, most selective first.
+
+        Comparison semantics mirror RecipeQueryBuilder: nutrient and time
+        bounds are strict, difficulty and flags must match exactly, every
+        ingredient term must be a case-insensitive substring of one of the
+        recipe's ingredient names, and every canonical ingredient id must be
+        one of the recipe's ingredients. A leading range step is answered by
+        binary search in its range index; every later step only looks at the
+        recipes that survived the previous ones.
+
+        Args:
+            filters: Dictionary of validated filter parameters
+
+        Returns:
+            Sorted array of matching recipe ids
+        """
+        ids = np.arange(len(self))
+        for step in self.plan(filters):
+            if len(ids) == 0:
+                break
+            ids, _ = self._apply(step, ids)
+        return ids
+
+    def match_many(self, filter_sets: List[Dict[str, Any]]) -> List[np.ndarray]:
+        """
+        Evaluate several filter sets, sharing the predicates they have in common.
+
+        Every distinct predicate of the batch is evaluated once over all
+        recipes and kept as a mask, keyed by its exact bounds or values; each
+        filter set then intersects the masks of its plan steps, most selective
+        first.
+
+        Args:
+            filter_sets: List of dictionaries of validated filter parameters
+
+        Returns:
+            List of sorted arrays of matching recipe ids, one per filter set
+        """
+        all_ids = np.arange(len(self))
+        masks: Dict[Tuple, np.ndarray] = {}
+        results = []
+
+        for filters in filter_sets:
+            mask = None
+            for step in self.plan(filters):
+                if step.key not in masks:
+                    masks[step.key] = self._mask(step, all_ids)
+                mask = masks[step.key] if mask is None else mask & masks[step.key]
+                if not mask.any():
+                    break
+            results.append(all_ids if mask is None else np.flatnonzero(mask))
+
+        logger.debug(f"Matched {len(filter_sets)} filter sets with {len(masks)} distinct predicates")
+        return results
+
+    def facet_counts(self, filters: Dict[str, Any]) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """
+        Count the recipes matching a filter set per facet value.
+
+        Each facet is counted under all filters except its own, so every
+        option of a facet shows how many recipes selecting it would give.
+
+        Args:
+            filters: Dictionary of validated filter parameters
+
+        Returns:
+            Tuple of (number of recipes matching all filters, counts per
+            facet value for every facet)
+        """
+        variants = [filters] + [
+            {key: value for key, value in filters.items() if key != facet}
+            for facet in FACETS if facet in filters
+        ]
+        bitsets = [self.facets.pack(ids) for ids in self.match_many(variants)]
+        total = int(np.bitwise_count(bitsets[0]).sum())
+
+        counts = {}
+        variant_bitsets = iter(bitsets[1:])
+        for facet in FACETS:
+            bitset = next(variant_bitsets) if facet in filters else bitsets[0]
+            counts[facet] = self.facets.count(facet, bitset)
+        return total, counts
+
+    def explain(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Run the plan for a filter set and report every step.
+
+        Args:
+            filters: Dictionary of validated filter parameters
+
+        Returns:
+            List of steps with their estimated and actual cardinalities
+        """
+        ids = np.arange(len(self))
+        report = []
+        for step in self.plan(filters):
+            input_count = len(ids)
+            ids, access = self._apply(step, ids)
+            report.append({
+                'predicate': step.predicate,
+                'condition': step.condition,
+                'access': access,
+                'estimated': step.estimated,
+                'input': input_count,
+                'actual': len(ids),
+            })
+        return report
+
+    def sort_key(self, recipe_id: int) -> List[Any]:
+        """
+        Get the pagination sort key of a recipe.
+
+        Args:
+            recipe_id: Dense recipe id
+
+        Returns:
+            Sort key, encodable into a cursor
+        """
+        return [self.names[recipe_id]]
+
+    def seek(self, ids: np.ndarray, after: List[Any]) -> int:
+        """
+        Find where a page starting after a sort key begins.
+
+        Args:
+            ids: Sorted array of matching recipe ids
+            after: Sort key of the last recipe of the previous page
+
+        Returns:
+            Position in ids of the first recipe past the key
+        """
+        return int(np.searchsorted(ids, self.first_after(after), side='left'))
+
+    def first_after(self, after: List[Any]) -> int:
+        """
+        Find the first recipe id past a name sort key.
+
+        Args:
+            after: Sort key of a recipe
+
+        Returns:
+            Smallest recipe id whose name sorts after the key
+        """
+        return bisect.bisect_right(self.names, str(after[0])) if after else 0
+
+    def pantry_coverage(self, terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count, per recipe, the ingredients covered by a pantry.
+
+        Args:
+            terms: Pantry items, each matched as a case-insensitive substring
+
+        Returns:
+            Tuple of (covered ingredients, total ingredients), both arrays
+            by recipe id
+        """
+        return self.ingredients.coverage(terms)
+
+    def suggest_ingredients(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Suggest ingredients with a word starting with a prefix.
+
+        Args:
+            prefix: Typed prefix, matched case-insensitively
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of suggestions with the canonical ingredient 'id', normalized
+            'name' and number of 'recipes' using it, most used first
+        """
+        ingredients = self.ingredients
+        return [
+            {
+                'id': ingredients.ids[name_id],
+                'name': ingredients.names[name_id],
+                'recipes': int(ingredients.recipe_counts[name_id]),
+            }
+            for name_id in ingredients.suggest(prefix, limit)
+        ]
+
+    def similar(self, slug: str, limit: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Look up the recipes most similar to a recipe in the similarity table.
+
+        Args:
+            slug: Public recipe id
+            limit: Maximum number of similar recipes
+
+        Returns:
+            Tuple of (recipe ids, similarity scores), best first, or None if
+            no recipe has the id
+        """
+        recipe_id = self.lookup(slug)
+        if recipe_id is None:
+            return None
+        return self.similarity.similar(recipe_id, limit)
+
+    def lookup(self, slug: str) -> Optional[int]:
+        """
+        Find the dense id of a recipe by its public id.
+
+        Args:
+            slug: Public recipe id
+
+        Returns:
+            Recipe id, or None if no recipe has the public id
+        """
+        return self.id_by_slug.get(slug)
+
+    def column_values(self, field: str) -> np.ndarray:
+        """
+        Get the values of a numeric field for every recipe.
+
+        Args:
+            field: Nutrient name, 'time' or 'difficulty'
+
+        Returns:
+            Array of values by recipe id, NaN where missing
+        """
+        if field == 'time':
+            return self.time
+        if field == 'difficulty':
+            return self.difficulty
+        return self.nutrients[field]
+
+    def _apply(self, step: 'PlanStep', ids: np.ndarray) -> Tuple[np.ndarray, str]:
+        """
+        Narrow candidate recipe ids with a plan step.
+
+        Steps with a range index or posting list look up their ids directly
+        while every recipe is still a candidate; otherwise the step is checked against
+        the remaining candidates only.
+
+        Returns:
+            Tuple of (remaining ids, access method used)
+        """
+        if step.lookup is not None and len(ids) == len(self):
+            return step.lookup(), step.access
+        return ids[step.evaluate(ids)], 'filter'
+
+    def _mask(self, step: 'PlanStep', ids: np.ndarray) -> np.ndarray:
+        """Evaluate a plan step over all recipe ids as a keep mask."""
+        if step.lookup is None:
+            return step.evaluate(ids)
+        mask = np.zeros(len(self), dtype=bool)
+        mask[step.lookup()] = True
+        return mask
+
+    @staticmethod
+    def _in_range(values: np.ndarray, lower: Optional[float], upper: Optional[float]) -> np.ndarray:
+        """Check values against exclusive bounds."""
+        keep = np.ones(len(values), dtype=bool)
+        if lower is not None:
+            keep &= values > lower
+        if upper is not None:
+            keep &= values < upper
+        return keep
+
+    @staticmethod
+    def _range_condition(attribute: str, lower: Optional[float], upper: Optional[float]) -> str:
+        """Describe a range filter for plan output."""
+        if lower is not None and upper is not None:
+            return f"{lower:g} < {attribute} < {upper:g}"
+        if lower is not None:
+            return f"{attribute} > {lower:g}"
+        return f"{attribute} < {upper:g}"
+
+    @staticmethod
+    def _bound(filters: Dict[str, Any], old_key: str, new_key: str) -> Optional[float]:
+        """Read a nutrient bound, preferring the old (bigger/smaller) naming."""
+        if old_key in filters:
+            return float(filters[old_key])
+        if new_key in filters:
+            return float(filters[new_key])
+        return None
+
+
+class PlanStep:
+    """A single filter predicate of an index evaluation plan."""
+
+    def __init__(
+        self,
+        predicate: str,
+        condition: str,
+        key: Tuple,
+        estimated: int,
+        evaluate,
+        lookup=None,
+        access: str = 'range scan'
+    ):
+        """
+        Initialize a plan step.
+
+        Args:
+            predicate: Filtered attribute
+            condition: Human-readable description of the filter, for plan
+                output only
+            key: Exact predicate, e.g. (attribute, lower, upper), identifying
+                the filter; unlike condition it does not round bounds
+            estimated: Estimated number of recipes the filter keeps on its own
+            evaluate: Callable mapping an array of recipe ids to a keep mask
+            lookup: Optional callable returning the sorted ids the filter
+                keeps, answered from an index without a scan
+            access: Access method reported when the lookup is used
+        """
+        self.predicate = predicate
+        self.condition = condition
+        self.key = key
+        self.estimated = estimated
+        self.evaluate = evaluate
+        self.lookup = lookup
+        self.access = access
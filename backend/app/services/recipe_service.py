@@ -5,28 +5,86 @@ This module handles the core recipe querying logic, data transformation,
 and interaction with the ontology.
 """
 
+import bisect
+import json
 import logging
+import sys
 import time
-from typing import Dict, Any, List, Tuple
-from owlready2 import default_world
+from collections import Counter
 
-from backend.app.services.query_builder import RecipeQueryBuilder, build_count_query
+import numpy as np
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+
+from backend.app.services.facets import FACETS, facet_value
+from backend.app.services.ingredient_index import (
+    has_word_prefix,
+    ingredient_id,
+    normalize_ingredient,
+    normalize_prefix,
+)
+from backend.app.services.match_cache import match_cache
+from backend.app.services.meal_planner import MEALS, search_meal_plans
+from backend.app.services.pantry import PantryOrder
+from backend.app.services.prepared_queries import prepared_queries
+from backend.app.services.query_builder import (
+    RecipeQueryBuilder,
+    build_ingredient_index_query,
+    build_pantry_query,
+    hydrated_fields,
+    selected_fields,
+)
+from backend.app.services.recipe_index import RecipeIndex, INDEXED_FILTERS
+from backend.app.services.recipe_view import (
+    RecipeView,
+    DISPLAY_COLUMNS,
+    name_slug,
+    parse_instructions,
+)
+from backend.app.utils.pagination import encode_cursor
+from backend.app.utils.sorting import SortOrder, rank_page
 
 logger = logging.getLogger(__name__)
 
+# Number of recipes read from the view at a time when streaming
+STREAM_CHUNK_SIZE = 100
+
 
 class RecipeService:
     """Service class for recipe operations."""
     
-    def __init__(self, ontology):
+    def __init__(
+        self,
+        ontology,
+        index: Optional[RecipeIndex] = None,
+        view: Optional[RecipeView] = None
+    ):
         """
         Initialize the recipe service.
         
         Args:
             ontology: Loaded ontology instance
+            index: Optional in-memory recipe index built from the view
+            view: Optional materialized recipe view built from the ontology
         """
         self.ontology = ontology
-        self.query_builder = RecipeQueryBuilder()
+        self.index = index
+        self.view = view
+    
+    def can_use_index(self, filters: Dict[str, Any]) -> bool:
+        """
+        Check whether a search can be answered without SPARQL.
+        
+        Such searches are matched by the in-memory index, or with indexed
+        SQL over the materialized view when no index is available, and their
+        pages are read from the view.
+        
+        Args:
+            filters: Dictionary of filter parameters
+        
+        Returns:
+            True if the view is available and every filter is indexed
+        """
+        return self.view is not None and set(filters) <= INDEXED_FILTERS
     
     def get_recipes(
         self,
@@ -45,68 +103,836 @@ class RecipeService:
         Returns:
             Tuple of (list of recipe dictionaries, total count)
         """
+        recipes, total_count, _ = self.get_recipe_page(filters, page, per_page)
+        return recipes, total_count
+    
+    def get_recipe_page(
+        self,
+        filters: Dict[str, Any],
+        page: int = 1,
+        per_page: int = 20,
+        cursor: Optional[List[Any]] = None,
+        sort: Optional[str] = None,
+        pantry: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """
+        Retrieve a page of recipes, by page number or by keyset cursor.
+        
+        Recipes are ordered by name, by a sort expression or, given a
+        pantry, by pantry coverage, with ties broken by name. When a cursor
+        is given, the page starts right after the recipe it points to and
+        ``page`` is ignored.
+        
+        Args:
+            filters: Dictionary of filter parameters
+            page: Page number (1-indexed)
+            per_page: Number of items per page
+            cursor: Decoded sort key of the last recipe of the previous page
+            sort: Optional sort expression, e.g. '-protein/calories'
+            pantry: Optional ingredients on hand; only recipes using at least
+                one of them are returned, ranked by coverage
+            fields: Optional result fields to return, all of them otherwise
+        
+        Returns:
+            Tuple of (list of recipe dictionaries, total count, next cursor
+            or None on the last page)
+        """
         start_time = time.time()
         
+        recipes, total_count, next_cursor = self.iter_recipe_page(
+            filters, page, per_page, cursor, sort, pantry, fields
+        )
+        recipes = list(recipes)
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"Retrieved {len(recipes)} recipes in {elapsed_time:.3f}s")
+        
+        if elapsed_time > 1.0:
+            logger.warning(f"Slow query detected: {elapsed_time:.3f}s")
+        
+        return recipes, total_count, next_cursor
+    
+    def iter_recipe_page(
+        self,
+        filters: Dict[str, Any],
+        page: int = 1,
+        per_page: int = 20,
+        cursor: Optional[List[Any]] = None,
+        sort: Optional[str] = None,
+        pantry: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[Iterator[Dict[str, Any]], int, Optional[str]]:
+        """
+        Retrieve a page of recipes as a lazy iterator.
+        
+        The matching recipes, total count and next cursor are resolved
+        up front; the recipes of the page are read and transformed only as
+        the iterator is consumed, a chunk at a time, so large pages can be
+        streamed with bounded memory. Given fields, only those are read and
+        transformed.
+        
+        Args:
+            filters: Dictionary of filter parameters
+            page: Page number (1-indexed)
+            per_page: Number of items per page
+            cursor: Decoded sort key of the last recipe of the previous page
+            sort: Optional sort expression, e.g. '-protein/calories'
+            pantry: Optional ingredients on hand, ranking by pantry coverage
+            fields: Optional result fields to return, all of them otherwise
+        
+        Returns:
+            Tuple of (iterator of recipe dictionaries, total count, next
+            cursor or None on the last page)
+        """
         # Calculate pagination offset
         offset = (page - 1) * per_page
+        order = self._ranking(sort, pantry)
+        
+        if self.can_use_index(filters):
+            page_ids, total_count, next_cursor = self._get_page_ids_from_index(
+                filters, offset, per_page, cursor, order
+            )
+            recipes = self._iter_view_recipes(page_ids, fields)
+        else:
+            page_rows, total_count, next_cursor = self._get_page_rows_from_sparql(
+                filters, offset, per_page, cursor, order
+            )
+            recipes = self._iter_sparql_recipes(page_rows, fields)
+        
+        if isinstance(order, PantryOrder):
+            recipes = order.annotate(recipes)
+        
+        return recipes, total_count, next_cursor
+    
+    def get_recipe_pages(
+        self,
+        searches: List[Tuple[
+            Dict[str, Any], int, int, Optional[List[Any]], Optional[str],
+            Optional[List[str]], Optional[List[str]]
+        ]]
+    ) -> List[Tuple[List[Dict[str, Any]], int, Optional[str]]]:
+        """
+        Retrieve pages for several searches in one pass.
+        
+        Identical filter sets are matched only once, and not at all when
+        their matches are cached. Index searches are matched together so
+        that predicates they have in common, such as the same dietary flag
+        or time bound, are evaluated once for the batch.
+        
+        Args:
+            searches: List of (filters, page, per_page, cursor, sort, pantry,
+                fields) tuples
+        
+        Returns:
+            List of (list of recipe dictionaries, total count, next cursor)
+            tuples, in the order of searches
+        """
+        start_time = time.time()
+        
+        keys = [json.dumps(search[0], sort_keys=True) for search in searches]
+        unique_filters = dict(zip(keys, (search[0] for search in searches)))
+        indexed = {
+            key: filters for key, filters in unique_filters.items()
+            if self.can_use_index(filters)
+        }
+        
+        engine = self.index if self.index is not None else self.view
+        matches = {}
+        for key, filters in indexed.items():
+            cached = match_cache.get_ids(engine, filters)
+            if cached is not None:
+                matches[key] = cached
+        
+        missing = {key: filters for key, filters in indexed.items() if key not in matches}
+        if missing and self.index is not None:
+            matches.update(zip(missing, self.index.match_many(list(missing.values()))))
+        elif missing:
+            matches.update((key, self.view.match(filters)) for key, filters in missing.items())
+        for key, filters in missing.items():
+            match_cache.set_ids(engine, filters, matches[key])
+        
+        for key, filters in unique_filters.items():
+            if key not in indexed:
+                matches[key] = self._match_sparql(filters)
+        
+        results = []
+        for key, (filters, page, per_page, cursor, sort, pantry, fields) in zip(keys, searches):
+            offset = (page - 1) * per_page
+            order = self._ranking(sort, pantry)
+            if key in indexed:
+                page_ids, total_count, next_cursor = self._slice_page_ids(
+                    matches[key], offset, per_page, cursor, order
+                )
+                recipes = list(self._iter_view_recipes(page_ids, fields))
+            else:
+                page_rows, total_count, next_cursor = self._slice_page_rows(
+                    matches[key], offset, per_page, cursor, order
+                )
+                recipes = list(self._iter_sparql_recipes(page_rows, fields))
+            if isinstance(order, PantryOrder):
+                recipes = list(order.annotate(recipes))
+            results.append((recipes, total_count, next_cursor))
+        
+        elapsed_time = time.time() - start_time
+        logger.info(
+            f"Retrieved {len(searches)} searches ({len(unique_filters)} distinct) "
+            f"in {elapsed_time:.3f}s"
+        )
+        
+        return results
+    
+    def get_facet_counts(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Count the recipes matching a filter set per facet value.
+        
+        Each facet is counted under all filters except its own, so every
+        option shows how many recipes selecting it would give. Index
+        searches intersect precomputed facet bitsets; otherwise the recipes
+        matching each filter variant are read and counted.
+        
+        Args:
+            filters: Dictionary of filter parameters
+        
+        Returns:
+            Dictionary with the total count and the counts per facet value
+        """
+        start_time = time.time()
+        
+        if self.can_use_index(filters) and self.index is not None:
+            total_count, counts = self.index.facet_counts(filters)
+        else:
+            total_count, counts = self._count_facets(filters)
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"Counted facets of {total_count} recipes in {elapsed_time:.3f}s")
+        
+        return {'total': total_count, 'facets': counts}
+    
+    def get_meal_plans(
+        self,
+        filters: Dict[str, Any],
+        targets: Dict[str, float],
+        tolerance: float,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the meal plans closest to daily nutrient targets.
+        
+        A plan is one recipe per meal type whose nutrient totals are all
+        within the tolerance of the targets. The recipes of every meal type
+        matching the filters are searched meet-in-the-middle over their
+        nutrient arrays.
+        
+        Args:
+            filters: Dictionary of filter parameters every recipe must match
+            targets: Target total per nutrient, e.g. {'calories': 2200}
+            tolerance: Largest relative deviation from a target, e.g. 0.05
+            limit: Maximum number of plans to return
+        
+        Returns:
+            List of plans, best first, each with its recipe per meal type,
+            nutrient totals and largest relative deviation
+        """
+        start_time = time.time()
+        nutrients = list(targets)
+        
+        if self.can_use_index(filters):
+            engine = self.index if self.index is not None else self.view
+            columns = [engine.column_values(nutrient) for nutrient in nutrients]
+            meal_ids = [engine.match({**filters, 'meal_type': meal}) for meal in MEALS]
+            meals = [np.column_stack([column[ids] for column in columns]) for ids in meal_ids]
+        else:
+            meal_rows = [self._match_sparql({**filters, 'meal_type': meal}) for meal in MEALS]
+            meals = [
+                np.array([
+                    [self._parse_optional_number(row[DISPLAY_COLUMNS.index(nutrient)]) for nutrient in nutrients]
+                    for row in rows
+                ], dtype=np.float64).reshape(len(rows), len(nutrients))
+                for rows in meal_rows
+            ]
+        
+        plans = search_meal_plans(
+            meals, np.array([targets[nutrient] for nutrient in nutrients]), tolerance, limit
+        )
+        
+        if self.can_use_index(filters):
+            plan_ids = [int(ids[position]) for plan in plans for ids, position in zip(meal_ids, plan.positions)]
+            recipes = list(self._iter_view_recipes(plan_ids))
+        else:
+            recipes = list(self._iter_sparql_recipes([
+                rows[position] for plan in plans for rows, position in zip(meal_rows, plan.positions)
+            ]))
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"Found {len(plans)} meal plans in {elapsed_time:.3f}s")
+        
+        return [
+            {
+                'meals': dict(zip(MEALS, recipes[i * len(MEALS):(i + 1) * len(MEALS)])),
+                'totals': {nutrient: float(total) for nutrient, total in zip(nutrients, plan.totals)},
+                'deviation': plan.deviation,
+            }
+            for i, plan in enumerate(plans)
+        ]
+
+    def suggest_ingredients(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Suggest ingredients for a typed prefix.
+        
+        An ingredient matches if a word of its name starts with the prefix.
+        Suggestions carry the canonical ingredient id, which searches accept
+        as an exact ``ingredient_ids`` filter.
+        
+        Args:
+            prefix: Typed prefix, matched case-insensitively
+            limit: Maximum number of suggestions
+        
+        Returns:
+            List of suggestions with 'id', 'name' and the number of 'recipes'
+            using the ingredient, most used first
+        """
+        start_time = time.time()
+        
+        if self.index is not None:
+            suggestions = self.index.suggest_ingredients(prefix, limit)
+        elif self.view is not None:
+            suggestions = self.view.suggest_ingredients(prefix, limit)
+        else:
+            suggestions = self._suggest_ingredients_sparql(prefix, limit)
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"Suggested {len(suggestions)} ingredients in {elapsed_time * 1000:.2f}ms")
+        
+        return suggestions
+    
+    def get_recipe(self, recipe_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a recipe by its public id.
+        
+        The index and the view resolve public ids through a dictionary built
+        when they are loaded, so only the recipe's own row is read. Without
+        them, the recipe is searched for among all recipes with SPARQL.
+        
+        Args:
+            recipe_id: Public recipe id, the local name of the recipe's IRI
+        
+        Returns:
+            Recipe dictionary, or None if no recipe has the id
+        """
+        if self.view is not None:
+            engine = self.index if self.index is not None else self.view
+            found = engine.lookup(recipe_id)
+            if found is None:
+                return None
+            return next(self._iter_view_recipes([found]))
+        
+        for row in self._match_sparql({}):
+            if name_slug(row[0]) == recipe_id:
+                return next(self._iter_sparql_recipes([row]))
+        return None
+    
+    def get_similar_recipes(self, recipe_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Find the recipes most similar to a recipe.
+        
+        Neighbours are read from the similarity table precomputed with the
+        index, so only the returned recipes are fetched from the view.
+        
+        Args:
+            recipe_id: Public recipe id, the local name of the recipe's IRI
+            limit: Maximum number of similar recipes
+        
+        Returns:
+            List of recipe dictionaries, most similar first, each with its
+            'similarity' score; None if no recipe has the id
+        
+        Raises:
+            RuntimeError: If no recipe index is loaded
+        """
+        if self.index is None or self.view is None:
+            raise RuntimeError("Similar recipes require the recipe index")
+        
+        found = self.index.similar(recipe_id, limit)
+        if found is None:
+            return None
+        
+        ids, scores = found
+        recipes = list(self._iter_view_recipes(ids))
+        for recipe, score in zip(recipes, scores):
+            recipe['similarity'] = round(float(score), 4)
+        return recipes
+    
+    def explain(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Describe how a search would be executed.
+        
+        For index searches, every plan step is reported with its estimated
+        cardinality (from the load-time statistics) and its actual one.
+        Searches against the materialized view report their SQL and SQLite
+        query plan, SPARQL searches their parameterized query.
+        
+        Args:
+            filters: Dictionary of filter parameters
+        
+        Returns:
+            Dictionary describing the execution plan
+        """
+        if self.can_use_index(filters) and self.index is not None:
+            steps = self.index.explain(filters)
+            return {
+                'engine': 'index',
+                'recipe_count': len(self.index),
+                'total': steps[-1]['actual'] if steps else len(self.index),
+                'steps': steps,
+                'statistics': self.index.statistics.to_dict(),
+            }
+        
+        if self.can_use_index(filters):
+            return dict(
+                engine='view',
+                recipe_count=len(self.view),
+                steps=[],
+                **self.view.explain(filters),
+            )
+        
+        builder = RecipeQueryBuilder()
+        return {
+            'engine': 'sparql',
+            'query': builder.build_query(filters, fields=[], with_recipe=True),
+            'parameters': builder.params,
+            'steps': [],
+        }
+    
+    def _get_page_ids_from_index(
+        self,
+        filters: Dict[str, Any],
+        offset: int,
+        limit: int,
+        cursor: Optional[List[Any]] = None,
+        order: Optional[Union[SortOrder, PantryOrder]] = None
+    ) -> Tuple[Any, int, Optional[str]]:
+        """
+        Answer a search from the recipe index or the materialized view.
         
-        # Get total count (for pagination metadata)
-        total_count = self._get_total_count(filters)
-        logger.info(f"Found {total_count} total recipes matching filters")
+        Matching ids come from vectorized masks over the index, or from
+        indexed SQL over the view when there is no index. They are cached
+        per filter set, so later pages of the search are only sliced.
         
-        # Build and execute main query
-        query = self.query_builder.build_query(filters, limit=per_page, offset=offset)
+        Args:
+            filters: Dictionary of filter parameters
+            offset: Number of results to skip
+            limit: Maximum number of results to return
+            cursor: Decoded sort key to start after, overriding offset
+            order: Optional ranking, name order otherwise
+        
+        Returns:
+            Tuple of (recipe ids of the page, total count, next cursor)
+        """
+        return self._slice_page_ids(self._match_ids(filters), offset, limit, cursor, order)
+    
+    def _match_ids(self, filters: Dict[str, Any]):
+        """
+        Find the ids matching a filter set, from the match cache if possible.
+        
+        Args:
+            filters: Dictionary of filter parameters
+        
+        Returns:
+            Sorted array of matching recipe ids
+        """
+        engine = self.index if self.index is not None else self.view
+        
+        matching_ids = match_cache.get_ids(engine, filters)
+        if matching_ids is None:
+            matching_ids = engine.match(filters)
+            match_cache.set_ids(engine, filters, matching_ids)
+            logger.info(f"Found {len(matching_ids)} total recipes matching filters (index)")
+        return matching_ids
+    
+    def _slice_page_ids(
+        self,
+        matching_ids,
+        offset: int,
+        limit: int,
+        cursor: Optional[List[Any]] = None,
+        order: Optional[Union[SortOrder, PantryOrder]] = None
+    ) -> Tuple[Any, int, Optional[str]]:
+        """
+        Cut a page out of the ids matching a search.
+        
+        In name order, a cursor is resolved with a binary search over the
+        matching ids. With a ranking, the page is selected by top-k partial
+        selection over the ranking keys of the matching recipes; a pantry
+        ranking first drops the recipes using none of the pantry items.
+        
+        Args:
+            matching_ids: Sorted array of matching recipe ids
+            offset: Number of results to skip
+            limit: Maximum number of results to return
+            cursor: Decoded sort key to start after, overriding offset
+            order: Optional ranking, name order otherwise
+        
+        Returns:
+            Tuple of (recipe ids of the page, total count, next cursor)
+        """
+        engine = self.index if self.index is not None else self.view
+        
+        if isinstance(order, PantryOrder):
+            # One sparse matrix-vector product scores the whole catalog
+            order.bind(*engine.pantry_coverage(order.terms))
+            matching_ids = matching_ids[order.columns['pantry_matched'][matching_ids] > 0]
+        
+        total_count = len(matching_ids)
+        
+        if order is not None:
+            columns = getattr(order, 'columns', {})
+            keys = np.atleast_2d(order.keys(
+                lambda field: (columns[field] if field in columns else engine.column_values(field))[matching_ids]
+            ))
+            after = None
+            if cursor is not None:
+                after = (
+                    tuple(SortOrder.decode_key(value) for value in cursor[:-1]),
+                    engine.first_after(cursor[-1:]) - 1,
+                )
+            
+            positions, has_more = rank_page(keys, matching_ids, offset, limit, after)
+            if isinstance(order, PantryOrder):
+                order.select(matching_ids[positions])
+            
+            next_cursor = None
+            if len(positions) > 0 and has_more:
+                last = positions[-1]
+                next_cursor = encode_cursor(
+                    [SortOrder.encode_key(key) for key in keys[:, last]]
+                    + engine.sort_key(int(matching_ids[last]))
+                )
+            return matching_ids[positions], total_count, next_cursor
+        
+        if cursor is not None:
+            offset = engine.seek(matching_ids, cursor)
+        
+        page_ids = matching_ids[offset:offset + limit]
+        
+        next_cursor = None
+        if len(page_ids) > 0 and offset + limit < total_count:
+            next_cursor = encode_cursor(engine.sort_key(int(page_ids[-1])))
+        return page_ids, total_count, next_cursor
+    
+    def _iter_view_recipes(
+        self,
+        page_ids,
+        fields: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Read and transform recipes from the view, a chunk of ids at a time.
+        
+        Args:
+            page_ids: Recipe ids, in result order
+            fields: Optional result fields to read, all of them otherwise
+        
+        Yields:
+            Recipe dictionaries
+        """
+        for start in range(0, len(page_ids), STREAM_CHUNK_SIZE):
+            chunk = page_ids[start:start + STREAM_CHUNK_SIZE]
+            for row in self.view.get_rows(chunk, selected_fields(fields)):
+                yield self._transform_result(row, fields)
+    
+    def _get_page_rows_from_sparql(
+        self,
+        filters: Dict[str, Any],
+        offset: int,
+        limit: int,
+        cursor: Optional[List[Any]] = None,
+        order: Optional[Union[SortOrder, PantryOrder]] = None
+    ) -> Tuple[List[tuple], int, Optional[str]]:
+        """
+        Answer a search with a prepared SPARQL match query.
+        
+        The matching rows are computed once; the total count is their number
+        and the page is sliced from them, so count and page always agree.
+        The rows of the page still have to be hydrated.
+        
+        Args:
+            filters: Dictionary of filter parameters
+            offset: Number of results to skip
+            limit: Maximum number of results to return
+            cursor: Decoded sort key to start after, overriding offset
+            order: Optional ranking, name order otherwise
+        
+        Returns:
+            Tuple of (key rows of the page, total count, next cursor)
+        """
+        return self._slice_page_rows(self._match_sparql(filters), offset, limit, cursor, order)
+    
+    def _match_sparql(self, filters: Dict[str, Any]) -> List[tuple]:
+        """
+        Find the recipes matching a filter set with a prepared SPARQL query.
+        
+        This is the first phase of a SPARQL search: only the key fields
+        needed to count, order and rank are read, and no ingredients are
+        aggregated. Each key row holds the display columns, with the other
+        fields None until hydrated, followed by the recipe individual. The
+        rows are cached per filter set, so later pages run no query.
+        
+        Args:
+            filters: Dictionary of filter parameters
+        
+        Returns:
+            Key rows of all matching recipes, ordered by name
+        """
+        cached = match_cache.get_rows(self.ontology, filters)
+        if cached is not None:
+            return list(cached)
+        
+        prepared, params = prepared_queries.get_query(self.ontology.world, filters)
         
         try:
             with self.ontology:
-                recipe_list = list(default_world.sparql(query))
+                results = list(prepared.execute(params))
         except Exception as e:
             logger.error(f"SPARQL query failed: {str(e)}")
             raise
         
-        # Transform results to dictionaries
-        recipes = self._transform_results(recipe_list)
+        logger.info(f"Found {len(results)} total recipes matching filters")
         
-        elapsed_time = time.time() - start_time
-        logger.info(f"Retrieved {len(recipes)} recipes in {elapsed_time:.3f}s")
+        positions = [DISPLAY_COLUMNS.index(field) for field in selected_fields([])]
+        recipe_list = []
+        for result in results:
+            values = [None] * len(DISPLAY_COLUMNS) + [result[0]]
+            for position, value in zip(positions, result[1:]):
+                values[position] = value
+            recipe_list.append(tuple(values))
         
-        if elapsed_time > 1.0:
-            logger.warning(f"Slow query detected: {elapsed_time:.3f}s")
+        # Order by name, the same stable sort key the index uses
+        recipe_list.sort(key=lambda row: str(row[0]))
+        match_cache.set_rows(self.ontology, filters, recipe_list)
+        return recipe_list
+    
+    def _iter_sparql_recipes(
+        self,
+        key_rows: List[tuple],
+        fields: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Hydrate and transform SPARQL key rows, a chunk of rows at a time.
         
-        return recipes, total_count
+        Args:
+            key_rows: Key rows from _match_sparql, in result order
+            fields: Optional result fields to read, all of them otherwise
+        
+        Yields:
+            Recipe dictionaries
+        """
+        for start in range(0, len(key_rows), STREAM_CHUNK_SIZE):
+            chunk = key_rows[start:start + STREAM_CHUNK_SIZE]
+            for row in self._hydrate_rows(chunk, fields):
+                yield self._transform_result(row, fields)
     
-    def _get_total_count(self, filters: Dict[str, Any]) -> int:
+    def _hydrate_rows(self, key_rows: List[tuple], fields: Optional[List[str]] = None) -> List[tuple]:
         """
-        Get the total count of recipes matching the filters.
+        Fill in the fields of key rows outside KEY_FIELDS.
+        
+        This is the second phase of a SPARQL search: one batched query
+        reads the links, instructions, ingredients, author and source of
+        just these recipes. Projections of key fields need no query.
         
         Args:
-            filters: Dictionary of filter parameters
+            key_rows: Key rows from _match_sparql
+            fields: Optional result fields to read, all of them otherwise
         
         Returns:
-            Total number of matching recipes
+            Rows with the requested fields set, in the order of key_rows
         """
-        count_query = build_count_query(filters)
+        hydrated = hydrated_fields(fields)
+        if not hydrated or not key_rows:
+            return key_rows
         
+        prepared, params = prepared_queries.get_hydration_query(
+            self.ontology.world, [row[-1] for row in key_rows], fields
+        )
         try:
             with self.ontology:
-                result = list(default_world.sparql(count_query))
-                if result and len(result) > 0:
-                    return int(result[0][0])
-                return 0
+                results = list(prepared.execute(params))
         except Exception as e:
-            logger.error(f"Count query failed: {str(e)}")
-            # Fall back to returning 0 if count fails
-            return 0
+            logger.error(f"SPARQL hydration query failed: {str(e)}")
+            raise
+        
+        values_by_recipe = {}
+        for result in results:
+            values_by_recipe.setdefault(result[0], result[1:])
+        
+        positions = [DISPLAY_COLUMNS.index(field) for field in hydrated]
+        rows = []
+        for row in key_rows:
+            values = list(row)
+            for position, value in zip(positions, values_by_recipe.get(row[-1], ())):
+                values[position] = value
+            rows.append(tuple(values))
+        return rows
     
-    def _transform_results(self, recipe_list: List[tuple]) -> List[Dict[str, Any]]:
+    def _suggest_ingredients_sparql(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
         """
-        Transform SPARQL query results into recipe dictionaries.
+        Suggest ingredients for a typed prefix with SPARQL.
         
         Args:
-            recipe_list: List of tuples from SPARQL query
+            prefix: Typed prefix, matched case-insensitively
+            limit: Maximum number of suggestions
         
         Returns:
-            List of recipe dictionaries with proper types
+            List of suggestions, as returned by suggest_ingredients
+        """
+        prefix = normalize_prefix(prefix)
+        recipes_by_name: Dict[str, set] = {}
+        with self.ontology:
+            for recipe, ingredient_name in self.ontology.world.sparql(build_ingredient_index_query()):
+                name = normalize_ingredient(ingredient_name)
+                if prefix and has_word_prefix(name, prefix):
+                    recipes_by_name.setdefault(name, set()).add(recipe)
+        
+        names = sorted(recipes_by_name, key=lambda name: (-len(recipes_by_name[name]), name))
+        return [
+            {'id': ingredient_id(name), 'name': name, 'recipes': len(recipes_by_name[name])}
+            for name in names[:limit]
+        ]
+    
+    def _ingredient_names_sparql(self) -> Dict[str, List[str]]:
+        """
+        Look up the ingredient names of every recipe with SPARQL.
+        
+        Returns:
+            Dictionary mapping recipe names to their ingredient names
+        """
+        ingredient_names: Dict[str, List[str]] = {}
+        with self.ontology:
+            for name, ingredient_name in self.ontology.world.sparql(build_pantry_query()):
+                ingredient_names.setdefault(str(name), []).append(str(ingredient_name))
+        return ingredient_names
+    
+    def _slice_page_rows(
+        self,
+        recipe_list: List[tuple],
+        offset: int,
+        limit: int,
+        cursor: Optional[List[Any]] = None,
+        order: Optional[Union[SortOrder, PantryOrder]] = None
+    ) -> Tuple[List[tuple], int, Optional[str]]:
+        """
+        Cut a page out of the SPARQL rows matching a search.
+        
+        Args:
+            recipe_list: All matching result rows, ordered by name
+            offset: Number of results to skip
+            limit: Maximum number of results to return
+            cursor: Decoded sort key to start after, overriding offset
+            order: Optional ranking, name order otherwise
+        
+        Returns:
+            Tuple of (result rows of the page, total count, next cursor)
+        """
+        if isinstance(order, PantryOrder):
+            ingredient_names = self._ingredient_names_sparql()
+            counts = [order.count(ingredient_names.get(str(row[0]), [])) for row in recipe_list]
+            recipe_list = [row for row, (matched, _) in zip(recipe_list, counts) if matched > 0]
+            counts = [count for count in counts if count[0] > 0]
+            order.bind(
+                np.array([matched for matched, _ in counts], dtype=np.float64),
+                np.array([total for _, total in counts], dtype=np.float64),
+            )
+        
+        total_count = len(recipe_list)
+        
+        if order is not None:
+            # Row positions follow name order, so they break ties like ids do
+            names = [str(row[0]) for row in recipe_list]
+            columns = getattr(order, 'columns', {})
+            keys = np.atleast_2d(order.keys(lambda field: columns[field] if field in columns else np.array(
+                [self._parse_optional_number(row[DISPLAY_COLUMNS.index(field)]) for row in recipe_list],
+                dtype=np.float64,
+            )))
+            after = None
+            if cursor is not None:
+                after = (
+                    tuple(SortOrder.decode_key(value) for value in cursor[:-1]),
+                    bisect.bisect_right(names, str(cursor[-1])) - 1,
+                )
+            
+            positions, has_more = rank_page(keys, np.arange(total_count), offset, limit, after)
+            if isinstance(order, PantryOrder):
+                order.select(positions)
+            
+            next_cursor = None
+            if len(positions) > 0 and has_more:
+                last = positions[-1]
+                next_cursor = encode_cursor(
+                    [SortOrder.encode_key(key) for key in keys[:, last]] + [names[last]]
+                )
+            return [recipe_list[position] for position in positions], total_count, next_cursor
+        
+        if cursor is not None:
+            names = [str(row[0]) for row in recipe_list]
+            offset = bisect.bisect_right(names, str(cursor[0])) if cursor else 0
+        
+        page_rows = recipe_list[offset:offset + limit]
+        
+        next_cursor = None
+        if page_rows and offset + limit < total_count:
+            next_cursor = encode_cursor([str(page_rows[-1][0])])
+        
+        return page_rows, total_count, next_cursor
+    
+    @staticmethod
+    def _ranking(
+        sort: Optional[str],
+        pantry: Optional[List[str]]
+    ) -> Optional[Union[SortOrder, PantryOrder]]:
+        """Build the ranking of a search, or None for name order."""
+        if pantry:
+            return PantryOrder(pantry)
+        if sort:
+            return SortOrder.parse(sort)
+        return None
+    
+    def _count_facets(self, filters: Dict[str, Any]) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """
+        Count facet values by reading the recipes matching every filter variant.
+        
+        Args:
+            filters: Dictionary of filter parameters
+        
+        Returns:
+            Tuple of (total count, counts per facet value for every facet)
+        """
+        _, total_count, _ = self.iter_recipe_page(filters, 1, sys.maxsize, fields=FACETS)
+        
+        counts = {}
+        for facet in FACETS:
+            variant = {key: value for key, value in filters.items() if key != facet}
+            # Facets are key fields, so the variants need no hydration
+            recipes, _, _ = self.iter_recipe_page(variant, 1, sys.maxsize, fields=FACETS)
+            counts[facet] = dict(Counter(
+                facet_value(facet, recipe[facet])
+                for recipe in recipes
+                if recipe.get(facet) is not None
+            ))
+        return total_count, counts
+    
+    def _transform_result(self, result: tuple, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Transform a single SPARQL query result into a recipe dictionary.
+        
+        Only the requested fields are mapped, so the parsing of the others,
+        such as instructions and ingredients, is skipped. The public 'id'
+        is always set.
+        
+        Args:
+            result: Tuple from SPARQL query
+            fields: Optional result fields to keep, all of them otherwise
+        
+        Returns:
+            Recipe dictionary with proper types
         """
         field_order = [
             "name", "link", "image_link", "instructions", "ingredients",
@@ -115,21 +941,15 @@ class RecipeService:
             "author", "source_name", "source_link"
         ]
         
-        recipes = []
-        for result in recipe_list:
-            recipe = {}
-            
-            # Map result tuple to dictionary
-            for i, field in enumerate(field_order):
-                if i < len(result):
-                    recipe[field] = result[i]
-            
-            # Transform data types and formats
-            recipe = self._normalize_recipe(recipe)
-            
-            recipes.append(recipe)
+        recipe = {'id': name_slug(result[0])}
         
-        return recipes
+        # Map result tuple to dictionary
+        for i, field in enumerate(field_order):
+            if i < len(result) and (fields is None or field in fields):
+                recipe[field] = result[i]
+        
+        # Transform data types and formats
+        return self._normalize_recipe(recipe)
     
     def _normalize_recipe(self, recipe: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -141,9 +961,9 @@ class RecipeService:
         Returns:
             Normalized recipe dictionary
         """
-        # Parse instructions from string representation of list
+        # Rows from the view carry parsed steps; SPARQL rows the stored text
         if 'instructions' in recipe and isinstance(recipe['instructions'], str):
-            recipe['instructions'] = self._parse_instructions(recipe['instructions'])
+            recipe['instructions'] = parse_instructions(recipe['instructions'])
         
         # Parse ingredients from concatenated string
         if 'ingredients' in recipe and isinstance(recipe['ingredients'], str):
@@ -167,32 +987,6 @@ class RecipeService:
         
         return recipe
     
-    def _parse_instructions(self, instructions_str: str) -> List[str]:
-        """
-        Parse instructions from string representation.
-        
-        Args:
-            instructions_str: String representation of instructions list
-        
-        Returns:
-            List of instruction steps
-        """
-        # Remove outer brackets and quotes
-        cleaned = instructions_str.strip("[]'\"")
-        
-        # Split by delimiter
-        steps = cleaned.split("', '")
-        
-        # Clean up each step
-        cleaned_steps = []
-        for step in steps:
-            # Remove "step X" prefix and leading digits
-            step = step.lstrip("step ").lstrip("0123456789").strip()
-            if step:
-                cleaned_steps.append(step)
-        
-        return cleaned_steps
-    
     def _parse_boolean(self, value: Any) -> bool:
         """
         Parse a value into a boolean.
@@ -209,6 +1003,21 @@ class RecipeService:
             return value.lower() in ('true', '1', 'yes')
         return bool(value)
     
+    def _parse_optional_number(self, value: Any) -> float:
+        """
+        Parse a value into a number, keeping missing values apart.
+        
+        Args:
+            value: Value to parse
+        
+        Returns:
+            Numeric value, or NaN if the value is missing or not a number
+        """
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return float('nan')
+    
     def _parse_number(self, value: Any) -> float:
         """
         Parse a value into a number.
@@ -0,0 +1,524 @@
+"""
+Denormalized SQLite materialized view of the recipes in the ontology.
+
+Each recipe's display data is spread across many individuals in the
+ontology (author, source, time, difficulty, nutrients, ingredients). This
+module flattens it into an in-memory SQLite ``recipes`` table plus an
+``ingredients`` side table, materialized once per ontology load, with
+B-tree indexes on every filterable column so searches and page lookups
+become plain indexed SQL.
+"""
+
+import ast
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.app.services.ingredient_index import (
+    has_word_prefix,
+    ingredient_id,
+    normalize_ingredient,
+    normalize_prefix,
+)
+from backend.app.services.query_builder import (
+    build_index_query,
+    build_ingredient_index_query,
+    query_parameters,
+)
+
+logger = logging.getLogger(__name__)
+
+NUTRIENTS = ['calories', 'protein', 'fat', 'carbohydrates']
+
+# Display columns, in the field order of the main SPARQL query
+DISPLAY_COLUMNS = [
+    'name', 'link', 'image_link', 'instructions', 'ingredients',
+    'vegan', 'vegetarian', 'meal_type', 'time', 'difficulty',
+    'calories', 'protein', 'fat', 'carbohydrates',
+    'author', 'source_name', 'source_link',
+]
+
+# Numeric columns, usable as sort keys
+NUMERIC_COLUMNS = ['time', 'difficulty'] + NUTRIENTS
+
+# Label the scraper left in front of each instruction step, e.g. 'step 2'
+STEP_LABEL = re.compile(r'^\s*step\s*\d+\s*', re.IGNORECASE)
+
+# Columns that get a B-tree index
+INDEXED_COLUMNS = [
+    'name', 'vegan', 'vegetarian', 'meal_type', 'time', 'difficulty',
+] + NUTRIENTS
+
+
+def recipe_slug(iri: str) -> str:
+    """
+    Derive the public id of a recipe from its IRI.
+
+    Recipe individuals are named with onthologifyName, so the local name of
+    the IRI is a stable, URL-safe id that survives ontology reloads.
+
+    Args:
+        iri: Recipe IRI
+
+    Returns:
+        Local name of the IRI
+    """
+    return iri.rsplit('#', 1)[-1].rsplit('/', 1)[-1]
+
+
+def name_slug(name: str) -> str:
+    """
+    Derive the public id of a recipe from its name.
+
+    This applies onthologifyName to the name, so it equals recipe_slug of
+    the recipe's IRI for rows that do not carry the IRI, such as SPARQL
+    search results.
+
+    Args:
+        name: Recipe name
+
+    Returns:
+        Public recipe id
+    """
+    return str(name).lower().replace(" ", "_").replace("%", "percent").replace("&", "and")
+
+
+def parse_instructions(value: Any) -> List[str]:
+    """
+    Parse the stored instructions of a recipe into its steps.
+
+    The ontology build stores the steps as a JSON list. Ontologies built
+    before that hold the repr of the scraped Python list, with each step
+    still labelled 'step N'; it is read as a literal, so steps containing
+    quotes survive, and the labels are removed.
+
+    Args:
+        value: has_instructions value of a recipe
+
+    Returns:
+        List of instruction steps, in order
+    """
+    if value is None:
+        return []
+    text = str(value)
+    try:
+        steps = json.loads(text)
+    except ValueError:
+        try:
+            steps = [STEP_LABEL.sub('', str(step)) for step in ast.literal_eval(text)]
+        except (ValueError, SyntaxError, TypeError):
+            steps = [text]
+    if not isinstance(steps, list):
+        steps = [text]
+    return [str(step).strip() for step in steps if str(step).strip()]
+
+
+SCHEMA = """
+CREATE TABLE recipes (
+    id INTEGER PRIMARY KEY,
+    iri TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    link TEXT,
+    image_link TEXT,
+    instructions TEXT,
+    ingredients TEXT,
+    vegan INTEGER,
+    vegetarian INTEGER,
+    meal_type TEXT,
+    time REAL,
+    difficulty REAL,
+    calories REAL,
+    protein REAL,
+    fat REAL,
+    carbohydrates REAL,
+    author TEXT,
+    source_name TEXT,
+    source_link TEXT
+);
+CREATE TABLE ingredients (
+    recipe_id INTEGER NOT NULL REFERENCES recipes (id),
+    name TEXT NOT NULL,
+    ingredient_id TEXT NOT NULL
+);
+CREATE INDEX idx_ingredients_recipe_id ON ingredients (recipe_id);
+CREATE INDEX idx_ingredients_name ON ingredients (name);
+CREATE INDEX idx_ingredients_ingredient_id ON ingredients (ingredient_id);
+"""
+
+
+class RecipeView:
+    """
+    Flat SQLite copy of the recipes in an ontology.
+
+    Recipe ids are dense and assigned in recipe name order, so ``ORDER BY id``
+    is the default sort order and ids double as keys into the RecipeIndex.
+    """
+
+    def __init__(self, recipe_rows: List[tuple], ingredient_pairs: List[Tuple[int, str]]):
+        """
+        Materialize the view into an in-memory database.
+
+        Args:
+            recipe_rows: (iri, *display fields) rows, already in id order
+            ingredient_pairs: (recipe id, ingredient name) pairs
+        """
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+        # Instruction steps are parsed once here, not on every read; the
+        # table keeps them as a JSON list
+        position = 1 + DISPLAY_COLUMNS.index('instructions')
+        self.instructions = [tuple(parse_instructions(row[position])) for row in recipe_rows]
+        recipe_rows = [
+            row[:position] + (json.dumps(list(steps), ensure_ascii=False),) + row[position + 1:]
+            for row, steps in zip(recipe_rows, self.instructions)
+        ]
+
+        placeholders = ', '.join('?' * (len(DISPLAY_COLUMNS) + 2))
+        columns = ', '.join(['id', 'iri'] + DISPLAY_COLUMNS)
+        self._connection.executemany(
+            f"INSERT INTO recipes ({columns}) VALUES ({placeholders})",
+            [(recipe_id,) + tuple(row) for recipe_id, row in enumerate(recipe_rows)],
+        )
+        self._connection.executemany(
+            "INSERT INTO ingredients (recipe_id, name, ingredient_id) VALUES (?, ?, ?)",
+            [
+                (recipe_id, normalize_ingredient(name), ingredient_id(name))
+                for recipe_id, name in ingredient_pairs
+            ],
+        )
+        for column in INDEXED_COLUMNS:
+            self._connection.execute(f"CREATE INDEX idx_recipes_{column} ON recipes ({column})")
+        self._connection.commit()
+
+        self.size = len(recipe_rows)
+        # Public ids, resolved without a query
+        self.id_by_slug = {recipe_slug(row[0]): i for i, row in enumerate(recipe_rows)}
+
+    @classmethod
+    def build(cls, ontology) -> 'RecipeView':
+        """
+        Build the view by materializing every recipe of the ontology.
+
+        Args:
+            ontology: Loaded ontology instance
+
+        Returns:
+            Populated RecipeView
+        """
+        start_time = time.time()
+
+        with ontology:
+            results = list(ontology.world.sparql(build_index_query()))
+            ingredient_results = list(ontology.world.sparql(build_ingredient_index_query()))
+
+        # Dense ids follow recipe name order, matching the SPARQL result order
+        results.sort(key=lambda result: (str(result[1]), result[0].iri))
+        recipe_rows = [(result[0].iri,) + tuple(_to_sql(value) for value in result[1:]) for result in results]
+
+        # Recipes missing display fields are not materialized, so skip their ingredients
+        id_by_iri = {row[0]: i for i, row in enumerate(recipe_rows)}
+        ingredient_pairs = [
+            (id_by_iri[recipe.iri], name)
+            for recipe, name in ingredient_results
+            if recipe.iri in id_by_iri
+        ]
+        view = cls(recipe_rows, ingredient_pairs)
+
+        elapsed_time = time.time() - start_time
+        logger.info(f"Materialized recipe view with {len(view)} recipes in {elapsed_time:.3f}s")
+        return view
+
+    def __len__(self) -> int:
+        """Return the number of materialized recipes."""
+        return self.size
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """
+        Run a read query against the view.
+
+        Args:
+            sql: SQL statement
+            params: Positional parameters
+
+        Returns:
+            List of result rows
+        """
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def lookup(self, slug: str) -> Optional[int]:
+        """
+        Find the id of a recipe by its public id.
+
+        Args:
+            slug: Public recipe id
+
+        Returns:
+            Recipe id, or None if no recipe has the public id
+        """
+        return self.id_by_slug.get(slug)
+
+    def match(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Find the recipes matching a filter set with indexed SQL.
+
+        Comparison semantics mirror RecipeQueryBuilder.
+
+        Args:
+            filters: Dictionary of validated filter parameters
+
+        Returns:
+            Sorted array of matching recipe ids
+        """
+        where, params = self._where(filters)
+        rows = self.query(f"SELECT id FROM recipes WHERE {where} ORDER BY id", params)
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def explain(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Describe the SQL search for a filter set.
+
+        Args:
+            filters: Dictionary of validated filter parameters
+
+        Returns:
+            Dictionary with the SQL, its parameters and SQLite's query plan
+        """
+        where, params = self._where(filters)
+        sql = f"SELECT id FROM recipes WHERE {where} ORDER BY id"
+        plan = self.query(f"EXPLAIN QUERY PLAN {sql}", params)
+        return {
+            'sql': sql,
+            'parameters': params,
+            'plan': [row[-1] for row in plan],
+            'total': len(self.match(filters)),
+        }
+
+    def seek(self, ids: np.ndarray, after: List[Any]) -> int:
+        """
+        Find where a page starting after a sort key begins.
+
+        Args:
+            ids: Sorted array of matching recipe ids
+            after: Sort key of the last recipe of the previous page
+
+        Returns:
+            Position in ids of the first recipe past the key
+        """
+        return int(np.searchsorted(ids, self.first_after(after), side='left'))
+
+    def first_after(self, after: List[Any]) -> int:
+        """
+        Find the first recipe id past a name sort key.
+
+        Args:
+            after: Sort key of a recipe
+
+        Returns:
+            Smallest recipe id whose name sorts after the key
+        """
+        if not after:
+            return 0
+        return self.query("SELECT COUNT(*) FROM recipes WHERE name <= ?", (str(after[0]),))[0][0]
+
+    def pantry_coverage(self, terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count, per recipe, the ingredients covered by a pantry.
+
+        Args:
+            terms: Pantry items, each matched as a case-insensitive substring
+
+        Returns:
+            Tuple of (covered ingredients, total ingredients), both arrays
+            by recipe id
+        """
+        terms = [normalize_ingredient(term) for term in terms]
+        on_hand = " OR ".join("instr(name, ?) > 0" for _ in terms) or "0"
+        rows = self.query(
+            f"SELECT recipe_id, COUNT(DISTINCT CASE WHEN {on_hand} THEN name END), "
+            f"COUNT(DISTINCT name) FROM ingredients GROUP BY recipe_id",
+            terms,
+        )
+
+        matched = np.zeros(len(self), dtype=np.float64)
+        totals = np.zeros(len(self), dtype=np.float64)
+        for recipe_id, covered, total in rows:
+            matched[recipe_id] = covered
+            totals[recipe_id] = total
+        return matched, totals
+
+    def suggest_ingredients(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Suggest ingredients with a word starting with a prefix.
+
+        Args:
+            prefix: Typed prefix, matched case-insensitively
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of suggestions with the canonical ingredient 'id', normalized
+            'name' and number of 'recipes' using it, most used first
+        """
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+        rows = self.query(
+            "SELECT ingredient_id, name, COUNT(DISTINCT recipe_id) FROM ingredients "
+            "WHERE instr(name, ?) > 0 GROUP BY ingredient_id, name",
+            [prefix],
+        )
+        rows = sorted(
+            (row for row in rows if has_word_prefix(row[1], prefix)),
+            key=lambda row: (-row[2], row[1]),
+        )
+        return [{'id': row[0], 'name': row[1], 'recipes': row[2]} for row in rows[:limit]]
+
+    def column_values(self, field: str) -> np.ndarray:
+        """
+        Get the values of a numeric column for every recipe.
+
+        Args:
+            field: Nutrient name, 'time' or 'difficulty'
+
+        Returns:
+            Array of values by recipe id, NaN where missing
+        """
+        if field not in NUMERIC_COLUMNS:
+            raise ValueError(f"Unknown numeric column: {field}")
+        rows = self.query(f"SELECT {field} FROM recipes ORDER BY id")
+        return np.array([row[0] for row in rows], dtype=np.float64)
+
+    def sort_key(self, recipe_id: int) -> List[Any]:
+        """
+        Get the pagination sort key of a recipe.
+
+        Args:
+            recipe_id: Dense recipe id
+
+        Returns:
+            Sort key, encodable into a cursor
+        """
+        return [self.query("SELECT name FROM recipes WHERE id = ?", (recipe_id,))[0][0]]
+
+    def get_rows(self, ids: Sequence[int], fields: Optional[List[str]] = None) -> List[tuple]:
+        """
+        Fetch the display rows for a set of recipe ids.
+
+        Args:
+            ids: Recipe ids, typically a single page
+            fields: Columns to read, or None for all of them; the others
+                are left None
+
+        Returns:
+            List of rows in the field order of the main SPARQL query,
+            in the order of ids, with instructions as a list of steps
+        """
+        ids = [int(recipe_id) for recipe_id in ids]
+        if not ids:
+            return []
+        # Instructions come pre-parsed from memory rather than from the table
+        columns = [
+            column for column in DISPLAY_COLUMNS
+            if (fields is None or column in fields) and column != 'instructions'
+        ]
+        steps = fields is None or 'instructions' in fields
+        placeholders = ', '.join('?' * len(ids))
+        rows = self.query(
+            f"SELECT id, {', '.join(columns)} FROM recipes WHERE id IN ({placeholders})",
+            ids,
+        )
+        positions = [DISPLAY_COLUMNS.index(column) for column in columns]
+        instructions = DISPLAY_COLUMNS.index('instructions')
+        rows_by_id = {}
+        for row in rows:
+            values = [None] * len(DISPLAY_COLUMNS)
+            for position, value in zip(positions, row[1:]):
+                values[position] = value
+            if steps:
+                values[instructions] = list(self.instructions[row[0]])
+            rows_by_id[row[0]] = tuple(values)
+        return [rows_by_id[recipe_id] for recipe_id in ids]
+
+    def get_columns(self, columns: List[str]) -> List[tuple]:
+        """
+        Fetch columns of every recipe, in id order.
+
+        Args:
+            columns: Column names of the recipes table
+
+        Returns:
+            List of rows, one per recipe id
+        """
+        return self.query(f"SELECT {', '.join(columns)} FROM recipes ORDER BY id")
+
+    def get_ingredient_pairs(self) -> List[Tuple[int, str]]:
+        """
+        Fetch every (recipe id, normalized ingredient name) pair.
+
+        Returns:
+            List of pairs
+        """
+        return self.query("SELECT recipe_id, name FROM ingredients")
+
+    @staticmethod
+    def _where(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """Translate filters into a WHERE clause and its parameters."""
+        values = query_parameters(filters)
+        clauses = ["1"]
+        params = []
+
+        # Terms are compared against the normalized names as plain substrings
+        for ingredient in filters.get('ingredients', []):
+            clauses.append(
+                "id IN (SELECT recipe_id FROM ingredients WHERE instr(name, ?) > 0)"
+            )
+            params.append(normalize_ingredient(ingredient))
+
+        # Canonical ingredient ids are exact lookups in the ingredient_id index
+        for ingredient in filters.get('ingredient_ids', []):
+            clauses.append(
+                "id IN (SELECT recipe_id FROM ingredients WHERE ingredient_id = ?)"
+            )
+            params.append(ingredient)
+
+        for flag in ('vegan', 'vegetarian'):
+            if flag in values:
+                clauses.append(f"{flag} = ?")
+                params.append(int(values[flag]))
+
+        if 'meal_type' in values:
+            clauses.append("meal_type = ?")
+            params.append(values['meal_type'])
+
+        if 'time' in values:
+            clauses.append("time < ?")
+            params.append(float(values['time']))
+
+        if 'difficulty' in values:
+            clauses.append("difficulty = ?")
+            params.append(float(values['difficulty']))
+
+        for nutrient in NUTRIENTS:
+            if f"{nutrient}_min" in values:
+                clauses.append(f"{nutrient} > ?")
+                params.append(float(values[f"{nutrient}_min"]))
+            if f"{nutrient}_max" in values:
+                clauses.append(f"{nutrient} < ?")
+                params.append(float(values[f"{nutrient}_max"]))
+
+        return " AND ".join(clauses), params
+
+
+def _to_sql(value: Any) -> Any:
+    """Convert a SPARQL literal into a value SQLite can store."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
@@ -0,0 +1,471 @@
+"""
+Precomputed nearest-neighbour table for "similar recipes".
+
+Every recipe is described by a TF-IDF vector over the words of its
+ingredient names and by its standardized nutrient values. Similarity blends
+the cosine of the ingredient vectors with a nutrient distance term, and the
+best-scoring neighbours of every recipe are computed once per ontology load,
+so answering a similar-recipes request is a slice of a table row.
+
+The ingredient cosine is computed sparsely: a block of recipes is multiplied
+with the rest through the word postings, one weighted bincount per block,
+without materializing a recipe x word matrix. When the ontology is reloaded,
+the table is updated from the previous one: only the rows of changed and new
+recipes, and of the recipes that had one of them as a neighbour, are
+recomputed in full.
+"""
+
+import logging
+import math
+import re
+import time
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from backend.app.services.recipe_index import RecipeIndex
+
+logger = logging.getLogger(__name__)
+
+# Neighbours stored per recipe; an upper bound for the similar-recipes limit
+TABLE_SIZE = 32
+
+# Weight of the ingredient cosine in the blended score; the nutrient
+# similarity makes up the rest
+INGREDIENT_WEIGHT = 0.7
+
+# Largest number of (recipe, recipe) scores computed at once
+SCORE_BLOCK_CELLS = 1 << 22
+
+# Share of changed recipes since the last full build above which a reload
+# recomputes the table, and its word weights, from scratch
+REBUILD_FRACTION = 0.25
+
+_WORD = re.compile(r"[a-z]{3,}")
+
+# Preparation words that say nothing about what an ingredient is
+STOP_WORDS = {
+    'and', 'for', 'the', 'with', 'into', 'about', 'large', 'small', 'medium',
+    'chopped', 'sliced', 'diced', 'finely', 'roughly', 'thinly', 'cut',
+    'peeled', 'halved', 'optional', 'pieces', 'plus', 'extra', 'few',
+}
+
+
+def ingredient_words(name: str) -> List[str]:
+    """
+    Split an ingredient name into the words used as TF-IDF terms.
+
+    Args:
+        name: Ingredient name
+
+    Returns:
+        List of lower-case words, without stop words
+    """
+    return [word for word in _WORD.findall(str(name).lower()) if word not in STOP_WORDS]
+
+
+def _expand(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenate the ranges [start, start + count) into one index array."""
+    total = int(counts.sum())
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(total)
+
+
+class SimilarityWeights:
+    """Word IDF weights and nutrient standardization shared by table builds."""
+
+    def __init__(self, idf: Dict[str, float], mean: np.ndarray, scale: np.ndarray, recipe_count: int):
+        """
+        Initialize the weights.
+
+        Args:
+            idf: Inverse document frequency per ingredient word
+            mean: Mean value per nutrient
+            scale: Standard deviation per nutrient, 1 where there is none
+            recipe_count: Number of recipes the IDF weights were computed over
+        """
+        self.idf = idf
+        self.mean = mean
+        self.scale = scale
+        self.recipe_count = recipe_count
+
+    @staticmethod
+    def inverse_frequency(document_frequency: int, recipe_count: int) -> float:
+        """Return the smoothed IDF weight of a word used by some recipes."""
+        return math.log((1 + recipe_count) / (1 + document_frequency)) + 1
+
+    @classmethod
+    def fit(cls, documents: List[Dict[str, int]], nutrients: np.ndarray) -> 'SimilarityWeights':
+        """
+        Compute the weights of a set of recipes.
+
+        Args:
+            documents: Word counts per recipe
+            nutrients: Nutrient values, one row per recipe, NaN where missing
+
+        Returns:
+            Fitted SimilarityWeights
+        """
+        frequencies: Dict[str, int] = {}
+        for words in documents:
+            for word in words:
+                frequencies[word] = frequencies.get(word, 0) + 1
+        idf = {
+            word: cls.inverse_frequency(count, len(documents))
+            for word, count in frequencies.items()
+        }
+
+        with np.errstate(invalid='ignore'):
+            present = ~np.isnan(nutrients)
+            counts = np.maximum(present.sum(axis=0), 1)
+            mean = np.where(present, nutrients, 0).sum(axis=0) / counts
+            variance = np.where(present, (nutrients - mean) ** 2, 0).sum(axis=0) / counts
+        scale = np.sqrt(variance)
+        scale[scale == 0] = 1
+        return cls(idf, mean, scale, len(documents))
+
+    def extend(self, documents: List[Dict[str, int]]) -> 'SimilarityWeights':
+        """
+        Add weights for words these weights have not seen yet.
+
+        Words already weighted keep their weight, so the vectors of
+        unchanged recipes stay exactly as they were.
+
+        Args:
+            documents: Word counts per recipe
+
+        Returns:
+            New SimilarityWeights covering every word of the documents
+        """
+        frequencies: Dict[str, int] = {}
+        for words in documents:
+            for word in words:
+                if word not in self.idf:
+                    frequencies[word] = frequencies.get(word, 0) + 1
+        idf = dict(self.idf)
+        idf.update(
+            (word, self.inverse_frequency(count, len(documents)))
+            for word, count in frequencies.items()
+        )
+        return SimilarityWeights(idf, self.mean, self.scale, self.recipe_count)
+
+
+class SimilarityTable:
+    """
+    Top-k most similar recipes of every recipe, by dense recipe id.
+
+    Row i of ``neighbors`` holds the ids of the recipes most similar to
+    recipe i, best first, padded with -1; ``scores`` holds their blended
+    similarity in [0, 1]. Ties are broken by recipe id.
+    """
+
+    def __init__(
+        self,
+        iris: List[str],
+        documents: List[Dict[str, int]],
+        nutrients: np.ndarray,
+        weights: SimilarityWeights,
+        changed_since_fit: int = 0
+    ):
+        """
+        Initialize the recipe vectors; the table itself is filled by build.
+
+        Args:
+            iris: Recipe IRIs, one per dense recipe id
+            documents: Ingredient word counts per recipe
+            nutrients: Nutrient values, one row per recipe, NaN where missing
+            weights: Word and nutrient weights
+            changed_since_fit: Recipes changed since the weights were fitted
+        """
+        self.iris = iris
+        self.weights = weights
+        self.changed_since_fit = changed_since_fit
+        self.fingerprints = [
+            (tuple(sorted(words.items())), tuple(np.nan_to_num(values, nan=-1.0).tolist()))
+            for words, values in zip(documents, nutrients)
+        ]
+
+        count = len(documents)
+        vocabulary = {word: i for i, word in enumerate(sorted(weights.idf))}
+        rows, columns, values = [], [], []
+        for recipe_id, words in enumerate(documents):
+            for word, frequency in words.items():
+                rows.append(recipe_id)
+                columns.append(vocabulary[word])
+                values.append((1 + math.log(frequency)) * weights.idf[word])
+        rows = np.array(rows, dtype=np.int64)
+        columns = np.array(columns, dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+
+        # L2-normalized TF-IDF rows, held in both row (CSR) and word (CSC) order
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=count))
+        values = values / np.where(norms > 0, norms, 1)[rows]
+        self.row_starts = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=count))])
+        self.row_words = columns
+        self.row_values = values
+
+        order = np.argsort(columns, kind='stable')
+        self.word_starts = np.concatenate([[0], np.cumsum(np.bincount(columns, minlength=len(vocabulary)))])
+        self.word_recipes = rows[order]
+        self.word_values = values[order]
+
+        standardized = (nutrients - weights.mean) / weights.scale
+        self.standardized = np.nan_to_num(standardized, nan=0.0)
+        self.squared_norms = (self.standardized ** 2).sum(axis=1)
+
+        self.neighbors = np.full((count, min(TABLE_SIZE, max(count - 1, 0))), -1, dtype=np.int32)
+        self.scores = np.zeros(self.neighbors.shape, dtype=np.float32)
+
+    @classmethod
+    def build(
+        cls,
+        index: 'RecipeIndex',
+        previous: Optional['SimilarityTable'] = None
+    ) -> 'SimilarityTable':
+        """
+        Build the table of a recipe index, reusing a previous table if possible.
+
+        Args:
+            index: RecipeIndex whose recipes, ingredients and nutrients are
+                compared
+            previous: Table of the previously loaded ontology, if any
+
+        Returns:
+            Filled SimilarityTable
+        """
+        start_time = time.time()
+
+        documents: List[Dict[str, int]] = [{} for _ in index.iris]
+        words_by_name = [ingredient_words(name) for name in index.ingredients.names]
+        for recipe_id, name_id in zip(index.ingredients.entry_recipes, index.ingredients.entry_names):
+            words = documents[recipe_id]
+            for word in words_by_name[name_id]:
+                words[word] = words.get(word, 0) + 1
+        values = np.column_stack(list(index.nutrients.values()))
+
+        table = None
+        if previous is not None:
+            table = cls._update(index.iris, documents, values, previous)
+        if table is None:
+            table = cls(index.iris, documents, values, SimilarityWeights.fit(documents, values))
+            table._fill(np.arange(len(documents)))
+            mode = 'Built'
+        else:
+            mode = 'Updated'
+
+        elapsed_time = time.time() - start_time
+        logger.info(f"{mode} similarity table of {len(documents)} recipes in {elapsed_time:.3f}s")
+        return table
+
+    @classmethod
+    def _update(
+        cls,
+        iris: List[str],
+        documents: List[Dict[str, int]],
+        values: np.ndarray,
+        previous: 'SimilarityTable'
+    ) -> Optional['SimilarityTable']:
+        """
+        Derive the table of a reloaded ontology from the previous one.
+
+        Rows of unchanged recipes whose neighbours are all unchanged keep
+        their neighbours, merged with their scores against the changed
+        recipes; every other row is recomputed.
+
+        Args:
+            iris: Recipe IRIs, one per dense recipe id
+            documents: Ingredient word counts per recipe
+            values: Nutrient values, one row per recipe
+            previous: Table of the previously loaded ontology
+
+        Returns:
+            Updated SimilarityTable, or None if too much changed to update
+        """
+        if values.shape[1] != previous.standardized.shape[1]:
+            return None
+        previous_ids = {iri: i for i, iri in enumerate(previous.iris)}
+        candidate = cls(
+            iris, documents, values, previous.weights.extend(documents), previous.changed_since_fit
+        )
+
+        # Map previous ids of unchanged recipes to their new ids
+        new_ids = np.full(len(previous.iris) + 1, -1, dtype=np.int64)
+        for recipe_id, (iri, fingerprint) in enumerate(zip(iris, candidate.fingerprints)):
+            old_id = previous_ids.get(iri)
+            if old_id is not None and previous.fingerprints[old_id] == fingerprint:
+                new_ids[old_id] = recipe_id
+        unchanged_old = np.flatnonzero(new_ids[:-1] >= 0)
+        unchanged = new_ids[unchanged_old]
+
+        removed_count = len(set(previous.iris) - set(iris))
+        changed_count = len(iris) - len(unchanged) + removed_count
+        candidate.changed_since_fit += changed_count
+        if candidate.changed_since_fit > REBUILD_FRACTION * max(len(iris), 1):
+            return None
+
+        is_unchanged = np.zeros(len(iris), dtype=bool)
+        is_unchanged[unchanged] = True
+        changed = np.flatnonzero(~is_unchanged)
+
+        # A row keeping a dropped neighbour is stale: recipes ranked below the
+        # table width could move up into the gap
+        width = candidate.neighbors.shape[1]
+        old_rows = previous.neighbors[unchanged_old]
+        mapped = new_ids[old_rows]
+        stale = ((old_rows >= 0) & (mapped < 0)).any(axis=1)
+        if previous.neighbors.shape[1] != width:
+            stale[:] = True
+
+        recompute = np.concatenate([changed, unchanged[stale]])
+        candidate._fill(np.sort(recompute))
+
+        kept = ~stale
+        if kept.any() and len(changed) > 0:
+            rows = unchanged[kept]
+            # Scores are symmetric, so the block of the changed recipes holds
+            # every score the kept rows are missing
+            changed_scores = np.empty((len(changed), len(iris)), dtype=np.float32)
+            for block in candidate._blocks(changed):
+                changed_scores[block[0]:block[-1] + 1] = candidate._score_block(changed[block])
+            merged_ids = np.concatenate(
+                [mapped[kept], np.broadcast_to(changed, (len(rows), len(changed)))], axis=1
+            )
+            merged_scores = np.concatenate(
+                [previous.scores[unchanged_old[kept]], changed_scores[:, rows].T], axis=1
+            )
+            merged_scores[merged_ids < 0] = -1
+            candidate.neighbors[rows], candidate.scores[rows] = cls._top(merged_ids, merged_scores, width)
+        elif kept.any():
+            candidate.neighbors[unchanged[kept]] = mapped[kept]
+            candidate.scores[unchanged[kept]] = previous.scores[unchanged_old[kept]]
+
+        logger.info(
+            f"Recomputed {len(recompute)} of {len(iris)} similarity rows "
+            f"after {changed_count} recipe changes"
+        )
+        return candidate
+
+    def __len__(self) -> int:
+        """Return the number of recipes in the table."""
+        return len(self.neighbors)
+
+    def similar(self, recipe_id: int, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up the recipes most similar to a recipe.
+
+        Args:
+            recipe_id: Dense recipe id
+            limit: Maximum number of neighbours, at most TABLE_SIZE
+
+        Returns:
+            Tuple of (recipe ids, similarity scores), best first
+        """
+        ids = self.neighbors[recipe_id, :limit]
+        found = ids >= 0
+        return ids[found], self.scores[recipe_id, :limit][found]
+
+    def _blocks(self, rows: np.ndarray) -> List[np.ndarray]:
+        """Split positions into rows into blocks of bounded score cells."""
+        size = max(1, SCORE_BLOCK_CELLS // max(len(self.neighbors), 1))
+        return [np.arange(start, min(start + size, len(rows))) for start in range(0, len(rows), size)]
+
+    def _score_block(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Score a block of recipes against every recipe.
+
+        Args:
+            rows: Recipe ids of the block
+
+        Returns:
+            Blended similarity, one row per block recipe and one column per
+            recipe, as float32
+        """
+        count = len(self.neighbors)
+
+        # Sparse cosine: every word of a block recipe meets the recipes
+        # sharing that word through its postings
+        starts = self.row_starts[rows]
+        counts = self.row_starts[rows + 1] - starts
+        entries = _expand(starts, counts)
+        block_rows = np.repeat(np.arange(len(rows)), counts)
+        words = self.row_words[entries]
+
+        word_starts = self.word_starts[words]
+        word_counts = self.word_starts[words + 1] - word_starts
+        postings = _expand(word_starts, word_counts)
+        cells = np.repeat(block_rows, word_counts) * count + self.word_recipes[postings]
+        products = np.repeat(self.row_values[entries], word_counts) * self.word_values[postings]
+        cosine = np.bincount(cells, weights=products, minlength=len(rows) * count).reshape(len(rows), count)
+
+        # Nutrient distance, as root mean squared difference of standardized values
+        dims = max(self.standardized.shape[1], 1)
+        squared = (
+            self.squared_norms[rows][:, None] + self.squared_norms[None, :]
+            - 2 * self.standardized[rows] @ self.standardized.T
+        )
+        nutrient = 1 / (1 + np.sqrt(np.maximum(squared, 0) / dims))
+
+        scores = INGREDIENT_WEIGHT * np.minimum(cosine, 1) + (1 - INGREDIENT_WEIGHT) * nutrient
+        return scores.astype(np.float32)
+
+    def _fill(self, rows: np.ndarray):
+        """
+        Compute the table rows of a set of recipes from scratch.
+
+        Args:
+            rows: Sorted recipe ids whose rows are computed
+        """
+        width = self.neighbors.shape[1]
+        if width == 0:
+            return
+        ids = np.arange(len(self.neighbors))
+        for block in self._blocks(rows):
+            block_ids = rows[block]
+            scores = self._score_block(block_ids)
+            # A recipe is not its own neighbour
+            scores[np.arange(len(block_ids)), block_ids] = -1
+            self.neighbors[block_ids], self.scores[block_ids] = self._top(
+                np.broadcast_to(ids, scores.shape), scores, width
+            )
+
+    @staticmethod
+    def _top(ids: np.ndarray, scores: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Select the best-scoring candidates of every row.
+
+        Scores and ids are packed into one int64 key per candidate, so a
+        single partition ranks by score and breaks ties by id. Candidates
+        with a negative score are never selected.
+
+        Args:
+            ids: Candidate recipe ids per row, -1 for none
+            scores: Candidate float32 scores per row
+            width: Number of candidates to keep per row
+
+        Returns:
+            Tuple of (ids, scores), each of shape (rows, width), best first
+            and padded with -1 ids
+        """
+        scores = np.asarray(scores, dtype=np.float32)
+        valid = scores >= 0
+        # The bit patterns of non-negative float32 values order like the values
+        bits = np.where(valid, scores, 0).view(np.int32).astype(np.int64)
+        keys = ((np.int64(0x7FFFFFFF) - bits) << 32) | np.asarray(ids, dtype=np.int64)
+        keys[~valid] = np.iinfo(np.int64).max
+
+        if keys.shape[1] > width:
+            keys = np.partition(keys, width - 1, axis=1)[:, :width]
+        keys = np.sort(keys, axis=1)
+        missing = keys == np.iinfo(np.int64).max
+
+        top_ids = (keys & 0xFFFFFFFF).astype(np.int32)
+        top_scores = (np.int64(0x7FFFFFFF) - (keys >> 32)).astype(np.int32).view(np.float32)
+        top_ids[missing] = -1
+        top_scores[missing] = 0
+
+        if top_ids.shape[1] < width:
+            padding = width - top_ids.shape[1]
+            top_ids = np.pad(top_ids, ((0, 0), (0, padding)), constant_values=-1)
+            top_scores = np.pad(top_scores, ((0, 0), (0, padding)))
+        return top_ids, top_scores
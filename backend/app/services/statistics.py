@@ -0,0 +1,128 @@
+"""
+Cardinality statistics for recipe filter planning.
+
+This module collects per-predicate statistics from the recipe index when the
+ontology is loaded: value histograms for nutrients and time, frequencies of
+dietary flags, meal types and difficulties, and ingredient document
+frequencies. The planner uses them to estimate how many recipes a filter
+keeps, so the most selective filters are evaluated first.
+"""
+
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+# Number of equi-width buckets per numeric attribute histogram
+HISTOGRAM_BINS = 32
+
+
+class RecipeStatistics:
+    """Per-predicate statistics over the recipes of a RecipeIndex."""
+
+    def __init__(self, index):
+        """
+        Collect statistics from a recipe index.
+
+        Args:
+            index: RecipeIndex to collect statistics from
+        """
+        self.recipe_count = len(index)
+        self.ingredient_frequencies = np.array(
+            [len(recipe_ids) for recipe_ids in index.ingredients.name_recipes], dtype=np.int64
+        )
+
+        numeric = dict(index.nutrients, time=index.time)
+        self.histograms = {}
+        for attribute, values in numeric.items():
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+            self.histograms[attribute] = (counts, edges)
+
+        self.flag_counts = {
+            flag: {True: int(getattr(index, flag).sum()), False: int((~getattr(index, flag)).sum())}
+            for flag in ('vegan', 'vegetarian')
+        }
+        self.meal_type_counts = {
+            name: int((index.meal_type == code).sum())
+            for name, code in index.meal_type_codes.items()
+        }
+        levels, counts = np.unique(index.difficulty[~np.isnan(index.difficulty)], return_counts=True)
+        self.difficulty_counts = {float(level): int(count) for level, count in zip(levels, counts)}
+
+    def estimate_flag(self, flag: str, value: bool) -> int:
+        """Estimate the recipes with a dietary flag set to a value."""
+        return self.flag_counts[flag][bool(value)]
+
+    def estimate_meal_type(self, meal_type: str) -> int:
+        """Estimate the recipes of a meal type."""
+        return self.meal_type_counts.get(meal_type, 0)
+
+    def estimate_difficulty(self, difficulty: float) -> int:
+        """Estimate the recipes of a difficulty level."""
+        return self.difficulty_counts.get(float(difficulty), 0)
+
+    def estimate_range(
+        self,
+        attribute: str,
+        lower: Optional[float] = None,
+        upper: Optional[float] = None
+    ) -> int:
+        """
+        Estimate the recipes with a numeric attribute inside a range.
+
+        Values are assumed to be spread uniformly within each histogram bucket.
+
+        Args:
+            attribute: Nutrient name or 'time'
+            lower: Exclusive lower bound, or None
+            upper: Exclusive upper bound, or None
+
+        Returns:
+            Estimated number of matching recipes
+        """
+        if attribute not in self.histograms:
+            return 0
+
+        counts, edges = self.histograms[attribute]
+        low = edges[0] if lower is None else max(float(lower), edges[0])
+        high = edges[-1] if upper is None else min(float(upper), edges[-1])
+        if high < low:
+            return 0
+
+        overlap = np.clip(np.minimum(edges[1:], high) - np.maximum(edges[:-1], low), 0, None)
+        fractions = overlap / np.diff(edges)
+        return int(round(float((counts * fractions).sum())))
+
+    def estimate_ingredient(self, name_ids: List[int]) -> int:
+        """
+        Estimate the recipes using any of a set of ingredient names.
+
+        The sum of the document frequencies of the names is an upper bound,
+        capped at the number of recipes.
+        """
+        frequency = int(self.ingredient_frequencies[name_ids].sum()) if name_ids else 0
+        return min(frequency, self.recipe_count)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Summarize the statistics as a JSON-serializable dictionary.
+
+        Returns:
+            Dictionary of statistics per predicate
+        """
+        return {
+            'recipe_count': self.recipe_count,
+            'flags': {
+                flag: {str(value).lower(): count for value, count in counts.items()}
+                for flag, counts in self.flag_counts.items()
+            },
+            'meal_types': self.meal_type_counts,
+            'difficulties': {str(int(level)): count for level, count in self.difficulty_counts.items()},
+            'ranges': {
+                attribute: {'min': float(edges[0]), 'max': float(edges[-1])}
+                for attribute, (counts, edges) in self.histograms.items()
+            },
+            'ingredient_count': len(self.ingredient_frequencies),
+        }
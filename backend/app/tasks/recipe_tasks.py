@@ -7,18 +7,25 @@ Celery workers.
 """
 
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 import time
-from owlready2 import get_ontology
+from owlready2 import World, get_ontology
 from celery.exceptions import SoftTimeLimitExceeded
 from backend.celery_config import celery
 from backend.config import get_config
+from backend.app.services import ontology_source
 from backend.app.services.recipe_service import RecipeService
+from backend.app.services.recipe_index import RecipeIndex
+from backend.app.services.recipe_view import RecipeView
 
 logger = logging.getLogger(__name__)
 
 # cache na poziomie workera, żeby nie ładować ontologii przy każdym tasku
 _ontology = None
+_upload_stamp = None
+_recipe_view = None
+_recipe_index = None
+_indexed_ontology = None
 
 
 def _get_ontology_for_tasks():
@@ -27,19 +34,49 @@ def _get_ontology_for_tasks():
 
     This keeps the task stateless from the caller perspective:
     the only inputs are function arguments, ontology is read-only.
+
+    The worker loads the same ontology as the web workers, the current
+    upload if there is one, and loads it again whenever a new ontology is
+    uploaded, so its results match the generation they are keyed by.
     """
-    global _ontology
-    if _ontology is None:
+    global _ontology, _upload_stamp
+    stamp = ontology_source.upload_stamp()
+    if _ontology is None or stamp != _upload_stamp:
         config = get_config()
-        if not config.ONTOLOGY_URL:
+        if not config.ONTOLOGY_URL and stamp is None:
             raise RuntimeError("ONTOLOGY_URL is not configured")
 
-        logger.info(f"[Celery] Loading ontology from {config.ONTOLOGY_URL}")
-        _ontology = get_ontology(config.ONTOLOGY_URL).load()
+        location = ontology_source.ontology_location(config.ONTOLOGY_URL)
+        logger.info(f"[Celery] Loading ontology from {location}")
+        uri = ontology_source.ontology_uri(location)
+        # A replacement gets a world of its own, see reload_ontology
+        _ontology = (get_ontology(uri) if _ontology is None else World().get_ontology(uri)).load()
+        _upload_stamp = stamp
         logger.info("[Celery] Ontology loaded successfully in worker")
     return _ontology
 
 
+def _get_recipe_index_for_tasks(ontology):
+    """
+    Lazily build the recipe view and in-memory index in Celery worker process.
+
+    They are built again whenever the worker loads another ontology.
+
+    Returns (None, None) when they cannot be built, so tasks fall back to SPARQL.
+    """
+    global _recipe_index, _recipe_view, _indexed_ontology
+    if _indexed_ontology is not ontology:
+        try:
+            _recipe_view = RecipeView.build(ontology)
+            _recipe_index = RecipeIndex.from_view(_recipe_view, _recipe_index)
+        except Exception as exc:
+            logger.error(f"[Celery] Failed to build recipe index: {exc}", exc_info=True)
+            _recipe_view = None
+            _recipe_index = None
+        _indexed_ontology = ontology
+    return _recipe_index, _recipe_view
+
+
 # typy błędów, które traktujemy jako „chwilowe” i warto spróbować ponownie
 TRANSIENT_EXCEPTIONS = (
     TimeoutError,
@@ -58,6 +95,10 @@ def search_recipes_async(
     filters: Dict[str, Any],
     page: int,
     per_page: int,
+    cursor: Optional[List[Any]] = None,
+    sort: Optional[str] = None,
+    pantry: Optional[List[str]] = None,
+    fields: Optional[List[str]] = None,
 ) -> Dict[str, Any]:
     """
     Asynchronous recipe search task with retries and logging.
@@ -88,9 +129,11 @@ def search_recipes_async(
         
         
         ontology = _get_ontology_for_tasks()
-        service = RecipeService(ontology)
+        service = RecipeService(ontology, *_get_recipe_index_for_tasks(ontology))
 
-        recipes, total_count = service.get_recipes(filters, page, per_page)
+        recipes, total_count, next_cursor = service.get_recipe_page(
+            filters, page, per_page, cursor, sort, pantry, fields
+        )
 
         logger.info(
             "[Celery] Recipe search completed "
@@ -99,9 +142,10 @@ def search_recipes_async(
 
         return {
             "recipes": recipes,
-            "page": page,
+            "page": page if cursor is None else None,
             "per_page": per_page,
             "total": total_count,
+            "next_cursor": next_cursor,
         }
 
     except TRANSIENT_EXCEPTIONS as exc:
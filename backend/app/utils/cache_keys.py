@@ -0,0 +1,131 @@
+"""
+Canonical cache keys for validated request parameters.
+
+Requests are keyed by what they ask for, not by how they spell it: the key
+is computed from the parameters after validation, so aliases such as
+calories_min and calories_bigger, boolean spellings such as true and 1 and
+numbers such as 300 and 300.0 are already normalized. Unordered lists are
+sorted and deduplicated, defaults are filled in and parameters that do not
+change the response are dropped. The canonical form is hashed to a
+fixed-length digest, so keys stay short however long the query string is.
+
+Keys are scoped to the generation of the loaded ontology, so entries
+computed from a previous ontology are never looked up again.
+"""
+
+import hashlib
+import json
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from flask import request
+
+from backend.app import get_ontology_generation
+from backend.app.utils.validators.recipe_validator import ValidationError
+
+# Parameters holding sets of terms, whose order and repetition do not
+# change the response
+UNORDERED_PARAMETERS = ('ingredients', 'ingredient_ids', 'pantry')
+
+
+def canonical_params(
+    params: Dict[str, Any],
+    defaults: Optional[Dict[str, Any]] = None,
+    ignored: Iterable[str] = ()
+) -> Dict[str, Any]:
+    """
+    Bring validated parameters into their canonical form.
+
+    Args:
+        params: Validated and normalized request parameters
+        defaults: Values of parameters left out of the request
+        ignored: Parameters that do not change the response
+
+    Returns:
+        Canonical parameters
+    """
+    canonical = dict(defaults or {})
+    canonical.update(params)
+
+    for key in UNORDERED_PARAMETERS:
+        if key in canonical:
+            canonical[key] = sorted(set(canonical[key]))
+
+    for key in ignored:
+        canonical.pop(key, None)
+    return canonical
+
+
+def params_digest(params: Dict[str, Any]) -> str:
+    """
+    Hash parameters to a fixed-length digest.
+
+    Args:
+        params: Canonical parameters, JSON-serializable
+
+    Returns:
+        Hex SHA-256 digest of the parameters
+    """
+    payload = json.dumps(params, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def filters_key(filters: Dict[str, Any]) -> str:
+    """
+    Build the key of a filter set alone, e.g. to cache the recipes it matches.
+
+    Args:
+        filters: Validated filter parameters, without paging or sorting
+
+    Returns:
+        Digest of the canonical filters
+    """
+    return params_digest(canonical_params(filters))
+
+
+def canonical_key(
+    prefix: str,
+    params: Dict[str, Any],
+    defaults: Optional[Dict[str, Any]] = None,
+    ignored: Iterable[str] = ()
+) -> str:
+    """
+    Build the cache key of validated parameters.
+
+    Args:
+        prefix: Namespace of the key, e.g. 'recipes'
+        params: Validated and normalized request parameters
+        defaults: Values of parameters left out of the request
+        ignored: Parameters that do not change the response
+
+    Returns:
+        Cache key of the form '<prefix>:<generation>:<digest>'
+    """
+    digest = params_digest(canonical_params(params, defaults, ignored))
+    return f"{prefix}:{get_ontology_generation()}:{digest}"
+
+
+def request_cache_key(
+    prefix: str,
+    validate: Callable[[Dict[str, Any]], Dict[str, Any]],
+    defaults: Optional[Dict[str, Any]] = None,
+    ignored: Iterable[str] = ()
+) -> str:
+    """
+    Build the cache key of the current request's query parameters.
+
+    Args:
+        prefix: Namespace of the key, e.g. 'recipes'
+        validate: Validator of the endpoint's parameters
+        defaults: Values of parameters left out of the request
+        ignored: Parameters that do not change the response
+
+    Returns:
+        Canonical cache key of the request
+    """
+    params = request.args.to_dict()
+    try:
+        validated = validate(params)
+    except ValidationError:
+        # Rejected requests are keyed by their raw parameters
+        return f"{prefix}:{get_ontology_generation()}:invalid:{params_digest(params)}"
+    return canonical_key(prefix, validated, defaults, ignored)
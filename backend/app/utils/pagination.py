@@ -0,0 +1,50 @@
+"""
+Cursor utilities for keyset pagination.
+
+A cursor is an opaque, URL-safe token encoding the sort key of the last
+recipe of a page. The next page starts right after that key, so fetching
+a deep page costs the same as fetching the first one.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, List
+
+
+def encode_cursor(key: List[Any]) -> str:
+    """
+    Encode a sort key into an opaque cursor token.
+
+    Args:
+        key: Sort key of the last item of a page
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps({'after': list(key)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decode a cursor token back into a sort key.
+
+    Args:
+        cursor: Cursor string produced by encode_cursor
+
+    Returns:
+        Sort key of the last item of the previous page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError(f"Malformed cursor: {str(e)}")
+
+    if not isinstance(payload, dict) or not isinstance(payload.get('after'), list):
+        raise ValueError("Malformed cursor: missing sort key")
+    return payload['after']
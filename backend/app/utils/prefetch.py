@@ -0,0 +1,91 @@
+"""
+Background prefetching of responses ahead of the requests for them.
+
+Work is run by a small thread pool. Jobs are deduplicated by key, and
+dropped rather than queued once PREFETCH_QUEUE_SIZE jobs are pending, so
+prefetching never builds a backlog. A failing job is only logged: the
+request it anticipated computes its response as usual.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Bounded thread pool running prefetch jobs."""
+
+    def __init__(self, app=None):
+        """
+        Initialize the prefetcher, disabled until configured.
+
+        Args:
+            app: Optional Flask app to configure the prefetcher from
+        """
+        self.enabled = False
+        self.max_pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Configure the prefetcher from an app's config.
+
+        Threads are only started by the first scheduled job, so forking
+        worker processes after creating the app is safe.
+
+        Args:
+            app: Flask app with PREFETCH_NEXT_PAGE, PREFETCH_WORKERS and
+                PREFETCH_QUEUE_SIZE settings
+        """
+        self.enabled = app.config.get("PREFETCH_NEXT_PAGE", False)
+        self.max_pending = app.config.get("PREFETCH_QUEUE_SIZE", 32)
+        if self.enabled and self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=app.config.get("PREFETCH_WORKERS", 2),
+                thread_name_prefix="prefetch",
+            )
+
+    def schedule(self, key: str, job: Callable[[], None]) -> bool:
+        """
+        Run a job in the background unless it is already pending.
+
+        Args:
+            key: Key identifying the job, e.g. the cache key it fills
+            job: Callable doing the work
+
+        Returns:
+            Whether the job was scheduled
+        """
+        if not self.enabled or self._executor is None:
+            return False
+
+        with self._lock:
+            if key in self._pending or len(self._pending) >= self.max_pending:
+                return False
+            self._pending.add(key)
+
+        try:
+            self._executor.submit(self._run, key, job)
+        except RuntimeError:
+            # The pool is shutting down
+            with self._lock:
+                self._pending.discard(key)
+            return False
+        return True
+
+    def _run(self, key: str, job: Callable[[], None]):
+        """Run a job, logging its failure."""
+        try:
+            job()
+        except Exception as e:
+            logger.warning(f"Prefetch {key} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
@@ -6,7 +6,10 @@ with proper structure, pagination metadata, and error handling.
 """
 
 from typing import Any, Dict, List, Optional
-from flask import jsonify
+from flask import Response, jsonify, make_response, request
+from werkzeug.http import generate_etag
+
+from backend.app import get_ontology_generation
 import math
 
 
@@ -15,32 +18,29 @@ def success_response(
     page: Optional[int] = None,
     per_page: Optional[int] = None,
     total: Optional[int] = None,
-    message: Optional[str] = None
+    message: Optional[str] = None,
+    next_cursor: Optional[str] = None
 ) -> tuple:
     """
     Create a standardized success response.
     
     Args:
         data: The response data (list of items or single item)
-        page: Current page number (for paginated responses)
+        page: Current page number (for paginated responses), or None for
+            a page read from a cursor
         per_page: Items per page (for paginated responses)
         total: Total number of items (for paginated responses)
         message: Optional success message
+        next_cursor: Cursor for the next page (for paginated responses)
     
     Returns:
         Tuple of (response_dict, status_code)
     """
     response = {'data': data}
     
-    # Add pagination metadata if provided
-    if page is not None and per_page is not None and total is not None:
-        total_pages = math.ceil(total / per_page) if per_page > 0 else 0
-        response['meta'] = {
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': total_pages
-        }
+    # Add pagination metadata if provided; cursor pages have no page number
+    if per_page is not None and total is not None:
+        response['meta'] = pagination_meta(page, per_page, total, next_cursor)
     
     if message:
         response['message'] = message
@@ -48,6 +48,60 @@ def success_response(
     return jsonify(response), 200
 
 
+def conditional_response(response: tuple) -> Response:
+    """
+    Tag a response with a strong ETag and answer revalidations.
+    
+    The ETag is the generation of the loaded ontology followed by a hash of
+    the response body, so it changes when the content does and whenever a
+    new ontology is loaded. Caches may store the response but must
+    revalidate it; a request whose If-None-Match holds the current ETag
+    gets an empty 304 Not Modified.
+    
+    Args:
+        response: Response or (response, status_code) tuple to tag
+    
+    Returns:
+        Conditional response
+    """
+    response = make_response(response)
+    response.set_etag(f"{get_ontology_generation()}-{generate_etag(response.get_data())}")
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def pagination_meta(
+    page: Optional[int],
+    per_page: int,
+    total: int,
+    next_cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Build the pagination metadata of a paginated result.
+    
+    Args:
+        page: Current page number, or None for a page read from a cursor,
+            which has no page number and only links on by next_cursor
+        per_page: Items per page
+        total: Total number of items
+        next_cursor: Cursor for the next page
+    
+    Returns:
+        Dictionary of pagination metadata
+    """
+    total_pages = math.ceil(total / per_page) if per_page > 0 else 0
+    meta = {'total': total}
+    if page is not None:
+        meta['page'] = page
+    meta.update({
+        'per_page': per_page,
+        'total_pages': total_pages,
+        'next_cursor': next_cursor
+    })
+    return meta
+
+
 def error_response(
     message: str,
     code: str = 'ERROR',
@@ -0,0 +1,158 @@
+"""
+Sort expressions and top-k selection for ranked recipe searches.
+
+A sort expression names a numeric recipe field (``protein``), or a ratio of
+two fields (``protein/calories``), optionally prefixed with ``-`` for
+descending order. Keys are evaluated over columnar arrays, and a page of the
+best-ranked recipes is selected with a partial partition rather than by
+sorting every match.
+"""
+
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+# Fields a sort expression may refer to
+SORT_FIELDS = ['time', 'difficulty', 'calories', 'protein', 'fat', 'carbohydrates']
+
+
+class SortOrder:
+    """A parsed sort expression."""
+
+    def __init__(self, numerator: str, denominator: Optional[str] = None, descending: bool = False):
+        """
+        Initialize a sort order.
+
+        Args:
+            numerator: Sorted field
+            denominator: Optional field the numerator is divided by
+            descending: Whether larger keys come first
+        """
+        self.numerator = numerator
+        self.denominator = denominator
+        self.descending = descending
+
+    @classmethod
+    def parse(cls, expression: str) -> 'SortOrder':
+        """
+        Parse a sort expression such as ``-time`` or ``protein/calories``.
+
+        Args:
+            expression: Sort expression
+
+        Returns:
+            Parsed SortOrder
+
+        Raises:
+            ValueError: If the expression is malformed or names unknown fields
+        """
+        expression = str(expression).replace(' ', '')
+        descending = expression.startswith('-')
+        fields = expression.lstrip('-').split('/')
+
+        if len(fields) > 2 or not all(field in SORT_FIELDS for field in fields):
+            raise ValueError(
+                "sort must be one of " + ", ".join(SORT_FIELDS) +
+                " or a ratio of two of them (e.g. protein/calories), "
+                "optionally prefixed with '-' for descending order"
+            )
+        return cls(fields[0], fields[1] if len(fields) == 2 else None, descending)
+
+    def __str__(self) -> str:
+        """Return the canonical sort expression."""
+        expression = self.numerator
+        if self.denominator:
+            expression += f"/{self.denominator}"
+        return f"-{expression}" if self.descending else expression
+
+    @property
+    def fields(self) -> List[str]:
+        """Return the fields the expression refers to."""
+        return [self.numerator] + ([self.denominator] if self.denominator else [])
+
+    def keys(self, values: Callable[[str], np.ndarray]) -> np.ndarray:
+        """
+        Evaluate the sort key of every candidate.
+
+        Keys ascend in result order; candidates without a key (a missing
+        field or a zero denominator) get +inf and so rank last.
+
+        Args:
+            values: Callable returning the values of a field per candidate,
+                NaN where missing
+
+        Returns:
+            Array of sort keys, one per candidate
+        """
+        keys = np.asarray(values(self.numerator), dtype=np.float64)
+        if self.denominator:
+            denominator = np.asarray(values(self.denominator), dtype=np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                keys = np.where(denominator != 0, keys / denominator, np.nan)
+        if self.descending:
+            keys = -keys
+        return np.where(np.isnan(keys), np.inf, keys)
+
+    @staticmethod
+    def encode_key(key: float) -> Optional[float]:
+        """Convert a sort key into a JSON-encodable cursor value."""
+        return None if np.isinf(key) else float(key)
+
+    @staticmethod
+    def decode_key(value: Any) -> float:
+        """Convert a cursor value back into a sort key."""
+        return np.inf if value is None else float(value)
+
+
+def rank_page(
+    keys: np.ndarray,
+    ids: np.ndarray,
+    offset: int,
+    limit: int,
+    after: Optional[Tuple[Tuple[float, ...], int]] = None
+) -> Tuple[np.ndarray, bool]:
+    """
+    Select a page of the best-ranked candidates by partial selection.
+
+    Candidates are ranked by key, ties broken by id. Only the candidates up
+    to the end of the page are fully sorted, after an O(n) partition around
+    the primary key at that rank.
+
+    Args:
+        keys: Sort key per candidate, smaller first; or a 2-D array of key
+            columns, compared lexicographically in row order
+        ids: Unique tie-breaking id per candidate
+        offset: Number of ranked candidates to skip
+        limit: Maximum number of candidates to return
+        after: (keys, id) of the last candidate of the previous page; the
+            page starts right after it and offset is ignored
+
+    Returns:
+        Tuple of (positions of the page's candidates in rank order, whether
+        more candidates follow the page)
+    """
+    keys = np.atleast_2d(keys)
+    positions = np.arange(keys.shape[1])
+
+    if after is not None:
+        after_keys, after_id = after
+        greater = np.zeros(len(positions), dtype=bool)
+        equal = np.ones(len(positions), dtype=bool)
+        for column, value in zip(keys, after_keys):
+            greater |= equal & (column > value)
+            equal &= column == value
+        positions = positions[greater | (equal & (ids > after_id))]
+        offset = 0
+
+    end = offset + limit
+    remaining = len(positions)
+    if end < remaining:
+        # Everything ranked before the end of the page has a primary key <=
+        # the one at that rank; ties at the threshold are resolved by the sort
+        primary = keys[0][positions]
+        threshold = np.partition(primary, end - 1)[end - 1]
+        positions = positions[primary <= threshold]
+
+    # lexsort takes its primary key last
+    order = np.lexsort((ids[positions],) + tuple(column[positions] for column in keys[::-1]))
+    return positions[order][offset:end], end < remaining
@@ -0,0 +1,324 @@
+"""
+Two-tier response cache with single-flight recomputation.
+
+Responses are kept in a bounded in-process LRU (L1) in front of the
+Flask-Caching backend (L2), which is Redis when configured and then shared
+by every worker. An entry is fresh for CACHE_DEFAULT_TIMEOUT seconds and
+kept stale for CACHE_STALE_TIMEOUT seconds more.
+
+A missing or stale entry is recomputed by the one caller holding its lock,
+taken atomically in L2 so it spans workers. Meanwhile the other callers are
+served the stale entry, or wait for the fresh one when there is none, so a
+cold popular query runs once instead of once per concurrent request. A stale
+entry is recomputed in a background thread, so even the caller holding the
+lock is served the stale entry without waiting.
+
+Only successful responses are stored; errors are recomputed every time.
+"""
+
+import functools
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, NamedTuple, Optional
+
+from flask import copy_current_request_context, current_app, has_app_context, has_request_context
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of a caller waiting for another one to compute
+LOCK_POLL_INTERVAL = 0.02
+
+
+class CacheEntry(NamedTuple):
+    """A pickled cached value with its freshness and expiry times."""
+
+    fresh_until: float
+    expires_at: float
+    payload: bytes
+
+
+def is_cacheable(value: Any) -> bool:
+    """
+    Check whether a view's return value may be cached.
+
+    Args:
+        value: Response, or tuple of (response, status[, headers])
+
+    Returns:
+        Whether the status of the response is below 400
+    """
+    if isinstance(value, tuple) and len(value) > 1 and isinstance(value[1], int):
+        return value[1] < 400
+    response = value[0] if isinstance(value, tuple) else value
+    return getattr(response, "status_code", 200) < 400
+
+
+class LRUCache:
+    """Bounded in-process LRU of cache entries."""
+
+    def __init__(self, maxsize: int):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries to keep, 0 to keep none
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get the entry of a key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        """Store the entry of a key, evicting the least recently used ones."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of entries held."""
+        return len(self._entries)
+
+
+class TieredCache:
+    """L1 LRU over a Flask-Caching backend, with single-flight and stale-while-revalidate."""
+
+    def __init__(self, backend, app=None):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: Flask-Caching Cache used as the shared L2
+            app: Optional Flask app to configure the cache from
+        """
+        self.backend = backend
+        self.l1 = LRUCache(0)
+        self.timeout = 300
+        self.stale_timeout = 0
+        self.lock_timeout = 30
+        self.revalidate_workers = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Configure the cache from an app's config.
+
+        Revalidation threads are only started by the first stale entry, so
+        forking worker processes after creating the app is safe.
+
+        Args:
+            app: Flask app with CACHE_L1_SIZE, CACHE_DEFAULT_TIMEOUT,
+                CACHE_STALE_TIMEOUT, CACHE_LOCK_TIMEOUT and
+                CACHE_REVALIDATE_WORKERS settings
+        """
+        self.l1 = LRUCache(app.config.get("CACHE_L1_SIZE", 256))
+        self.timeout = app.config.get("CACHE_DEFAULT_TIMEOUT", 300)
+        self.stale_timeout = app.config.get("CACHE_STALE_TIMEOUT", 60)
+        self.lock_timeout = app.config.get("CACHE_LOCK_TIMEOUT", 30)
+        self.revalidate_workers = app.config.get("CACHE_REVALIDATE_WORKERS", 2)
+
+    def cached(self, key_prefix: Callable[[], str], unless: Optional[Callable[[], bool]] = None):
+        """
+        Decorate a view to cache its responses.
+
+        Args:
+            key_prefix: Callable returning the cache key of the request
+            unless: Optional callable returning True to bypass the cache
+
+        Returns:
+            View decorator
+        """
+        def decorator(f):
+            @functools.wraps(f)
+            def decorated_function(*args, **kwargs):
+                if unless is not None and unless():
+                    return f(*args, **kwargs)
+                return self.get_or_compute(key_prefix(), lambda: f(*args, **kwargs))
+            return decorated_function
+        return decorator
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Get the cached value of a key, computing it when missing or stale.
+
+        Args:
+            key: Cache key
+            compute: Callable computing the value
+
+        Returns:
+            The cached or freshly computed value
+        """
+        entry = self.l1.get(key)
+        if entry is not None and time.time() < entry.fresh_until:
+            return pickle.loads(entry.payload)
+
+        # Another worker may have refreshed the entry already
+        shared = self._load(key)
+        if shared is not None and (entry is None or shared.fresh_until > entry.fresh_until):
+            self.l1.set(key, shared)
+            entry = shared
+        if entry is not None and time.time() < entry.fresh_until:
+            return pickle.loads(entry.payload)
+
+        token = self._acquire(key)
+        if token is not None and entry is not None and self._revalidate(key, compute, token):
+            # Stale while this caller's lock revalidates in the background
+            return pickle.loads(entry.payload)
+        if token is None:
+            if entry is not None:
+                # Stale while another caller revalidates
+                return pickle.loads(entry.payload)
+            entry = self._wait(key)
+            if entry is not None:
+                return pickle.loads(entry.payload)
+            # The other caller failed or gave up, so compute unlocked
+            return self._compute(key, compute)
+
+        try:
+            return self._compute(key, compute)
+        finally:
+            self._release(key, token)
+
+    def clear(self):
+        """Drop the entries of this process; L2 entries expire on their own."""
+        self.l1.clear()
+
+    def _revalidate(self, key: str, compute: Callable[[], Any], token: str) -> bool:
+        """
+        Recompute a stale entry in the background, releasing its lock after.
+
+        The job runs in a copy of the current request or app context, so
+        views can be recomputed after their request has been served.
+
+        Returns:
+            Whether the job was scheduled; if not, the caller computes
+        """
+        if self.revalidate_workers <= 0:
+            return False
+        if has_request_context():
+            compute = copy_current_request_context(compute)
+        elif has_app_context():
+            app, inner = current_app._get_current_object(), compute
+
+            def compute():
+                with app.app_context():
+                    return inner()
+
+        def job():
+            try:
+                self._compute(key, compute)
+            except Exception as e:
+                logger.warning(f"Failed to revalidate cache entry {key}: {e}")
+            finally:
+                self._release(key, token)
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.revalidate_workers, thread_name_prefix="revalidate"
+                )
+        try:
+            self._executor.submit(job)
+        except RuntimeError:
+            # The pool is shutting down
+            return False
+        return True
+
+    def _compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Compute a value and store it in both tiers if it is cacheable."""
+        value = compute()
+        if not is_cacheable(value):
+            return value
+        now = time.time()
+        entry = CacheEntry(
+            now + self.timeout, now + self.timeout + self.stale_timeout, pickle.dumps(value)
+        )
+        self.l1.set(key, entry)
+        try:
+            self.backend.set(key, entry, timeout=self.timeout + self.stale_timeout)
+        except Exception as e:
+            logger.warning(f"Failed to store cache entry {key}: {e}")
+        return value
+
+    def _load(self, key: str) -> Optional[CacheEntry]:
+        """Get the L2 entry of a key, or None if it is missing or unreachable."""
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Failed to read cache entry {key}: {e}")
+            return None
+        return entry if isinstance(entry, CacheEntry) else None
+
+    def _acquire(self, key: str) -> Optional[str]:
+        """
+        Take the lock of a key.
+
+        Returns:
+            Token owning the lock, or None if another caller holds it
+        """
+        token = uuid.uuid4().hex
+        try:
+            if self.backend.add(f"lock:{key}", token, timeout=self.lock_timeout):
+                return token
+        except Exception as e:
+            # Without a reachable L2 every caller computes on its own
+            logger.warning(f"Failed to lock cache entry {key}: {e}")
+            return token
+        return None
+
+    def _release(self, key: str, token: str):
+        """Release the lock of a key if it is still owned by token."""
+        try:
+            if self.backend.get(f"lock:{key}") == token:
+                self.backend.delete(f"lock:{key}")
+        except Exception as e:
+            logger.warning(f"Failed to unlock cache entry {key}: {e}")
+
+    def _wait(self, key: str) -> Optional[CacheEntry]:
+        """
+        Wait for the caller holding the lock of a key to store its value.
+
+        Returns:
+            The stored entry, or None if the lock was released or timed out
+            without one
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = self._load(key)
+            if entry is not None:
+                self.l1.set(key, entry)
+                return entry
+            try:
+                if not self.backend.has(f"lock:{key}"):
+                    return self._load(key)
+            except Exception:
+                return None
+        return None
@@ -9,6 +9,13 @@ import json
 from typing import Dict, List, Tuple, Any, Optional
 from flask import current_app
 
+from backend.app.services.query_builder import FIELD_VARIABLES
+from backend.app.utils.pagination import decode_cursor
+from backend.app.utils.sorting import SortOrder
+
+# Longest prefix accepted by the ingredient autocomplete
+MAX_SUGGEST_PREFIX_LENGTH = 100
+
 
 class ValidationError(Exception):
     """Custom exception for validation errors."""
@@ -135,7 +142,8 @@ def validate_ingredients(value: str) -> Tuple[Optional[List[str]], Optional[str]
     Validate and parse ingredients parameter.
     
     Args:
-        value: Ingredients value (JSON string or comma-separated)
+        value: Ingredients value (JSON string, comma-separated or, from
+            JSON request bodies, a list)
     
     Returns:
         Tuple of (validated_list, error_message)
@@ -143,6 +151,14 @@ def validate_ingredients(value: str) -> Tuple[Optional[List[str]], Optional[str]
     if value is None or value == '':
         return None, None
     
+    if isinstance(value, list):
+        if not all(isinstance(i, str) for i in value):
+            return None, "all ingredients must be strings"
+        return [i.strip() for i in value if i.strip()], None
+    
+    if not isinstance(value, str):
+        return None, "ingredients must be a list"
+    
     # Try parsing as JSON first
     if value.startswith('['):
         try:
@@ -160,12 +176,109 @@ def validate_ingredients(value: str) -> Tuple[Optional[List[str]], Optional[str]
     return ingredients, None
 
 
-def validate_recipe_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+def validate_ingredient_ids(value: str) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Validate and parse the ingredient_ids parameter.
+    
+    Ingredient ids are the local names of ingredient IRIs and may contain
+    commas, e.g. 'avocado_halved,_destoned_and_chopped', so unlike
+    ingredient names they are never split on commas and must be passed as
+    a JSON list.
+    
+    Args:
+        value: Ingredient ids value (JSON string or, from JSON request
+            bodies, a list)
+    
+    Returns:
+        Tuple of (validated_list, error_message)
+    """
+    if value is None or value == '':
+        return None, None
+    
+    if isinstance(value, str) and not value.startswith('['):
+        return None, 'ingredient ids must be a JSON list, e.g. ["egg"], since ids may contain commas'
+    
+    ingredient_ids, err = validate_ingredients(value)
+    if err:
+        return None, err.replace('ingredients', 'ingredient ids', 1)
+    return [i.strip().lower() for i in ingredient_ids if i.strip()], None
+
+
+def validate_cursor(value: str) -> Tuple[Optional[List[Any]], Optional[str]]:
+    """
+    Validate and decode a pagination cursor.
+    
+    Args:
+        value: Opaque cursor string from a previous response
+    
+    Returns:
+        Tuple of (decoded sort key, error_message)
+    """
+    if value is None or value == '':
+        return None, None
+    
+    try:
+        return decode_cursor(value), None
+    except ValueError:
+        return None, "cursor is invalid or expired"
+
+
+def validate_sort(value: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Validate a sort expression.
+    
+    Args:
+        value: Sort expression, e.g. 'protein', '-time' or 'protein/calories'
+    
+    Returns:
+        Tuple of (canonical sort expression, error_message)
+    """
+    if value is None or value == '':
+        return None, None
+    
+    try:
+        return str(SortOrder.parse(value)), None
+    except ValueError as e:
+        return None, str(e)
+
+
+def validate_fields(value: str) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Validate and parse a field projection.
+    
+    Args:
+        value: Recipe fields to return (JSON string, comma-separated or,
+            from JSON request bodies, a list)
+    
+    Returns:
+        Tuple of (list of distinct fields in result order, error_message)
+    """
+    fields, err = validate_ingredients(value)
+    if err:
+        return None, err.replace('ingredients', 'fields', 1)
+    if not fields:
+        return None, None
+    
+    fields = [field.strip() for field in fields]
+    unknown = [field for field in fields if field not in FIELD_VARIABLES]
+    if unknown:
+        return None, (
+            f"unknown fields: {', '.join(unknown)}; "
+            f"must be among {', '.join(FIELD_VARIABLES)}"
+        )
+    return [field for field in FIELD_VARIABLES if field in fields], None
+
+
+def validate_recipe_filters(
+    filters: Dict[str, Any],
+    max_page_size: Optional[int] = None
+) -> Dict[str, Any]:
     """
     Validate all recipe filter parameters.
     
     Args:
         filters: Dictionary of filter parameters from request
+        max_page_size: Largest allowed per_page, defaults to MAX_PAGE_SIZE
     
     Returns:
         Dictionary of validated and normalized filters
@@ -243,6 +356,14 @@ def validate_recipe_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
         elif val is not None:
             validated['ingredients'] = val
     
+    # Validate canonical ingredient ids, as returned by /ingredients/suggest
+    if 'ingredient_ids' in filters:
+        val, err = validate_ingredient_ids(filters['ingredient_ids'])
+        if err:
+            errors['ingredient_ids'] = [err]
+        elif val is not None:
+            validated['ingredient_ids'] = val
+    
     # Validate pagination parameters
     if 'page' in filters:
         val, err = validate_integer(filters['page'], 'Page', min_val=1)
@@ -252,15 +373,190 @@ def validate_recipe_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
             validated['page'] = val
     
     if 'per_page' in filters:
-        max_page_size = current_app.config.get('MAX_PAGE_SIZE', 100)
+        if max_page_size is None:
+            max_page_size = current_app.config.get('MAX_PAGE_SIZE', 100)
         val, err = validate_integer(filters['per_page'], 'Per page', min_val=1, max_val=max_page_size)
         if err:
             errors['per_page'] = [err]
         elif val is not None:
             validated['per_page'] = val
     
+    if 'sort' in filters:
+        val, err = validate_sort(filters['sort'])
+        if err:
+            errors['sort'] = [err]
+        elif val is not None:
+            validated['sort'] = val
+    
+    # Pantry searches are ranked by coverage, so they take no sort
+    if 'pantry' in filters:
+        val, err = validate_ingredients(filters['pantry'])
+        if err:
+            errors['pantry'] = [err.replace('ingredients', 'pantry items', 1)]
+        elif val:
+            if 'sort' in filters:
+                errors['pantry'] = ["pantry cannot be combined with sort"]
+            else:
+                validated['pantry'] = val
+    
+    if 'fields' in filters:
+        val, err = validate_fields(filters['fields'])
+        if err:
+            errors['fields'] = [err]
+        elif val is not None:
+            validated['fields'] = val
+    
+    if 'cursor' in filters:
+        val, err = validate_cursor(filters['cursor'])
+        if err:
+            errors['cursor'] = [err]
+        elif val is not None:
+            # Ranked cursors carry numeric keys in front of the name
+            key_count = 2 if 'pantry' in validated else 1 if 'sort' in validated else 0
+            valid = len(val) == key_count + 1 and all(
+                key is None or isinstance(key, (int, float)) for key in val[:key_count]
+            )
+            if not valid:
+                errors['cursor'] = ["cursor is invalid or expired"]
+            else:
+                validated['cursor'] = val
+    
     if errors:
         raise ValidationError(errors)
     
     return validated
 
+
+def validate_meal_plan_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate meal plan search parameters.
+    
+    Args:
+        params: Dictionary of parameters from request
+    
+    Returns:
+        Dictionary with the validated 'targets' per nutrient, 'filters',
+        'tolerance' and 'limit'
+    
+    Raises:
+        ValidationError: If any validation fails
+    """
+    errors = {}
+    targets = {}
+    filters = {}
+    
+    for nutrient in ('calories', 'protein', 'fat', 'carbohydrates'):
+        if nutrient in params:
+            val, err = validate_positive_number(params[nutrient], nutrient.capitalize())
+            if err:
+                errors[nutrient] = [err]
+            elif val is not None:
+                targets[nutrient] = val
+    
+    if not targets and not errors:
+        errors['targets'] = ["at least one of calories, protein, fat or carbohydrates is required"]
+    
+    tolerance = current_app.config.get('MEAL_PLAN_DEFAULT_TOLERANCE', 0.05)
+    if 'tolerance' in params:
+        val, err = validate_positive_number(params['tolerance'], 'Tolerance')
+        if err:
+            errors['tolerance'] = [err]
+        elif val is not None and val >= 1:
+            errors['tolerance'] = ["Tolerance must be less than 1"]
+        elif val is not None:
+            tolerance = val
+    
+    limit = current_app.config.get('MEAL_PLAN_DEFAULT_LIMIT', 10)
+    if 'limit' in params:
+        max_limit = current_app.config.get('MAX_MEAL_PLAN_LIMIT', 50)
+        val, err = validate_integer(params['limit'], 'Limit', min_val=1, max_val=max_limit)
+        if err:
+            errors['limit'] = [err]
+        elif val is not None:
+            limit = val
+    
+    if 'time' in params:
+        val, err = validate_positive_number(params['time'], 'Time')
+        if err:
+            errors['time'] = [err]
+        elif val is not None:
+            filters['time'] = val
+    
+    for bool_field in ['vegan', 'vegetarian']:
+        if bool_field in params:
+            val, err = validate_boolean(params[bool_field], bool_field.capitalize())
+            if err:
+                errors[bool_field] = [err]
+            elif val is not None:
+                filters[bool_field] = val
+    
+    if errors:
+        raise ValidationError(errors)
+    
+    return {'targets': targets, 'filters': filters, 'tolerance': tolerance, 'limit': limit}
+
+
+def validate_similar_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate similar recipe parameters.
+    
+    Args:
+        params: Dictionary of parameters from request
+    
+    Returns:
+        Dictionary with the validated 'limit'
+    
+    Raises:
+        ValidationError: If any validation fails
+    """
+    errors = {}
+    
+    limit = current_app.config.get('SIMILAR_DEFAULT_LIMIT', 10)
+    if 'limit' in params:
+        max_limit = current_app.config.get('MAX_SIMILAR_LIMIT', 20)
+        val, err = validate_integer(params['limit'], 'Limit', min_val=1, max_val=max_limit)
+        if err:
+            errors['limit'] = [err]
+        elif val is not None:
+            limit = val
+    
+    if errors:
+        raise ValidationError(errors)
+    
+    return {'limit': limit}
+
+
+def validate_suggest_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate ingredient suggestion parameters.
+    
+    Args:
+        params: Dictionary of parameters from request
+    
+    Returns:
+        Dictionary with the validated prefix 'q' and 'limit'
+    
+    Raises:
+        ValidationError: If any validation fails
+    """
+    errors = {}
+    
+    q = str(params.get('q', '')).strip()
+    if not q:
+        errors['q'] = ["q is required"]
+    elif len(q) > MAX_SUGGEST_PREFIX_LENGTH:
+        errors['q'] = [f"q must be at most {MAX_SUGGEST_PREFIX_LENGTH} characters"]
+    
+    limit = current_app.config.get('SUGGEST_DEFAULT_LIMIT', 10)
+    if 'limit' in params:
+        max_limit = current_app.config.get('MAX_SUGGEST_LIMIT', 50)
+        val, err = validate_integer(params['limit'], 'Limit', min_val=1, max_val=max_limit)
+        if err:
+            errors['limit'] = [err]
+        elif val is not None:
+            limit = val
+    
+    if errors:
+        raise ValidationError(errors)
+    
+    return {'q': q, 'limit': limit}
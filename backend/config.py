@@ -28,6 +28,25 @@ class Config:
     # Pagination defaults
     DEFAULT_PAGE_SIZE = 20
     MAX_PAGE_SIZE = 100
+    # Page size cap for streamed (application/x-ndjson) responses, which
+    # default to DEFAULT_PAGE_SIZE like JSON ones
+    MAX_STREAM_PAGE_SIZE = int(os.getenv("MAX_STREAM_PAGE_SIZE", "10000"))
+    # Maximum number of searches in one POST /recipes/batch request
+    MAX_BATCH_SIZE = 50
+
+    # Meal plan search defaults
+    MEAL_PLAN_DEFAULT_LIMIT = 10
+    MAX_MEAL_PLAN_LIMIT = 50
+    MEAL_PLAN_DEFAULT_TOLERANCE = 0.05
+
+    # Similar recipe defaults; the limit cap must not exceed the neighbours
+    # stored per recipe in the similarity table
+    SIMILAR_DEFAULT_LIMIT = 10
+    MAX_SIMILAR_LIMIT = 20
+
+    # Ingredient autocomplete defaults
+    SUGGEST_DEFAULT_LIMIT = 10
+    MAX_SUGGEST_LIMIT = 50
 
     # Timeout settings (in seconds)
     QUERY_TIMEOUT = int(os.getenv("QUERY_TIMEOUT", "30"))
@@ -35,13 +54,26 @@ class Config:
 
     # CORS settings
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
-    CORS_METHODS = ["GET", "OPTIONS"]
+    CORS_METHODS = ["GET", "POST", "OPTIONS"]
     CORS_ALLOW_HEADERS = ["Content-Type", "Authorization"]
+    CORS_EXPOSE_HEADERS = ["X-Total-Count", "X-Next-Cursor", "ETag"]
 
     # Cache settings
     CACHE_TYPE = "SimpleCache"
     CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300"))  # 5 minutes
     CACHE_THRESHOLD = 500  # Maximum number of items the cache will store
+    CACHE_L1_SIZE = int(os.getenv("CACHE_L1_SIZE", "256"))  # In-process responses per worker
+    # Seconds an expired response is still served while one worker recomputes it
+    CACHE_STALE_TIMEOUT = int(os.getenv("CACHE_STALE_TIMEOUT", "60"))
+    # Longest a worker waits for another one computing the same response
+    CACHE_LOCK_TIMEOUT = int(os.getenv("CACHE_LOCK_TIMEOUT", "30"))
+    # Threads recomputing stale responses after they are served, 0 to recompute in the request
+    CACHE_REVALIDATE_WORKERS = int(os.getenv("CACHE_REVALIDATE_WORKERS", "2"))
+
+    # Compute the next page of a search in the background once a page is served
+    PREFETCH_NEXT_PAGE = os.getenv("PREFETCH_NEXT_PAGE", "True").lower() == "true"
+    PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+    PREFETCH_QUEUE_SIZE = int(os.getenv("PREFETCH_QUEUE_SIZE", "32"))  # Pending pages beyond which prefetches are dropped
 
     # Rate limiting
     RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "True").lower() == "true"
@@ -99,8 +131,8 @@ class ProductionConfig(Config):
     # Stricter rate limiting for production
     RATELIMIT_DEFAULT = os.getenv("RATELIMIT_DEFAULT", "60 per minute")
 
-    # Use Redis for caching in production if available
-    CACHE_TYPE = os.getenv("CACHE_TYPE", "SimpleCache")
+    # Share cached responses between workers through Redis
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "RedisCache")
     # Default to Docker service name, fallback to localhost
     CACHE_REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 
@@ -119,6 +151,8 @@ class TestingConfig(Config):
 
     # Disable caching for tests
     CACHE_TYPE = "NullCache"
+    CACHE_L1_SIZE = 0
+    PREFETCH_NEXT_PAGE = False
 
     # Use in-memory ontology for testing
     ONTOLOGY_URL = None  # Can be set to test fixtures
@@ -100,8 +100,8 @@ from .constraints import (
 
 # Individual creation
 from .individuals import (
-    onthologifyName, createIndividual, create_meal_types, create_difficulties,
-    load_recipes_from_json
+    onthologifyName, instructionSteps, createIndividual, create_meal_types,
+    create_difficulties, load_recipes_from_json
 )
 
 # Query functions
@@ -144,7 +144,7 @@ __all__ = [
     'apply_all_constraints',
     
     # Individual creation
-    'createIndividual', 'onthologifyName', 'load_recipes_from_json',
+    'createIndividual', 'onthologifyName', 'instructionSteps', 'load_recipes_from_json',
     
     # Queries
     'getRecipe', 'requiredIngredients',
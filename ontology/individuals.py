@@ -38,6 +38,24 @@ def onthologifyName(name) -> str:
     return str(name).lower().replace(" ", "_").replace("%", "percent").replace("&", "and")
 
 
+def instructionSteps(instructions) -> str:
+    """
+    Serialize scraped instruction steps for storage in has_instructions.
+    
+    The 'step N' label the scraper leaves in front of every step is removed
+    and the steps are stored as a JSON list, so they can be read back
+    without any string parsing.
+    
+    Args:
+        instructions: List of scraped instruction steps
+    
+    Returns:
+        JSON list of the instruction steps, in order
+    """
+    steps = [re.sub(r'^\s*step\s*\d+\s*', '', str(step), flags=re.IGNORECASE) for step in instructions]
+    return json.dumps([step.strip() for step in steps if step.strip()], ensure_ascii=False)
+
+
 def createIndividual(name, BaseClass, unique=False, target_kg=None) -> tuple[Thing, bool]:
     """
     Create an individual (instance) of a class or return existing one.
@@ -153,7 +171,7 @@ def load_recipes_from_json(json_path: str, target_kg=None):
         
         recipe, _ = createIndividual(json_recipe["title"], BaseClass=Recipe, unique=True, target_kg=target_kg)
         recipe.has_recipe_name.append(json_recipe["title"])
-        recipe.has_instructions.append(str(json_recipe["instructions"]))
+        recipe.has_instructions.append(instructionSteps(json_recipe["instructions"]))
 
         # Create IngredientWithAmount individuals
         for extendedIngredient in json_recipe["ingredients"]:
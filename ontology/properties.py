@@ -20,7 +20,7 @@ has_recipe_name = DataFactory("has_recipe_name", domain=[Recipe], range=[str], B
 has_recipe_name.comment = "A description of the name/title of the recipe."
 
 has_instructions = DataFactory("has_instructions", domain=[Recipe], range=[str])
-has_instructions.comment = "A description of the instructions one has to follow according to the recipe in form of a text."
+has_instructions.comment = "The instructions one has to follow according to the recipe, as a JSON list of the steps in order."
 
 has_ingredient = RelationFactory("has_ingredient", domain=[Recipe], range=[IngredientWithAmount])
 has_ingredient.comment = "A link from the recipe to one of the ingredients including their amount required for it."
@@ -5,7 +5,7 @@ const router = createRouter({
   history: createWebHistory(),
 	routes: [
 		{path: '/', name: 'Home', component: HomeView},
-		{path: '/recipe', name: 'Recipe', component: RecipeView},
+		{path: '/recipe/:id?', name: 'Recipe', component: RecipeView},
 	],
 	scrollBehavior(to) {
     if (to.hash) {